@@ -1,18 +1,138 @@
 import os
-import torch
+import json
+import atexit
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
 import folder_paths
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
 from nodes import SaveImage
+from comfy.cli_args import args
 from datetime import datetime
 
+
+class BackgroundImageWriter:
+    """
+    Bounded pool of worker threads that PNG-encode and write images so the
+    workflow does not wait on compression. Pillow releases the GIL while it
+    encodes, so several workers really do run in parallel.
+    """
+
+    def __init__(self, max_workers=None, max_pending=64):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="EnhancedSaveImage")
+        # Blocks submit() once max_pending images are waiting (backpressure)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.idle = threading.Condition()
+        self.pending = 0
+
+    @property
+    def queue_depth(self):
+        """Number of images queued or currently being encoded."""
+        with self.idle:
+            return self.pending
+
+    def submit(self, img, path, metadata, compress_level):
+        """Queue one image; returns the Future of its write."""
+        self.slots.acquire()
+        with self.idle:
+            self.pending += 1
+        future = self.executor.submit(self._write, img, path, metadata, compress_level)
+        future.add_done_callback(self._done)
+        return future
+
+    def _write(self, img, path, metadata, compress_level):
+        img.save(path, pnginfo=metadata, compress_level=compress_level)
+
+    def _done(self, future):
+        exc = future.exception()
+        if exc is not None:
+            print(f"[EnhancedSaveImage] Background save failed: {exc}")
+        self.slots.release()
+        with self.idle:
+            self.pending -= 1
+            if self.pending == 0:
+                self.idle.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued image has been written."""
+        with self.idle:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def shutdown(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_background_writer():
+    """Create the shared writer on first use and flush it when Python exits."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundImageWriter()
+            atexit.register(_writer.shutdown)
+        return _writer
+
+
+def expand_date_tokens(filename_prefix, now=None):
+    # Manually replace the %date% tokens to avoid the WinError 123
+    now = now or datetime.now()
+    filename_prefix = filename_prefix.replace("%date:yyyy%", now.strftime("%Y"))
+    filename_prefix = filename_prefix.replace("%date:yyyy-MM-dd%", now.strftime("%Y-%m-%d"))
+    filename_prefix = filename_prefix.replace("%date:yyyy-MM-dd-hhmmss%", now.strftime("%Y-%m-%d-%H%M%S"))
+    return filename_prefix
+
+
+# output_format -> (file extension, ffmpeg encoder arguments)
+CONTAINER_FORMATS = {
+    "ffv1 (mkv)": ("mkv", ["-c:v", "ffv1", "-level", "3", "-pix_fmt", "gbrp"]),
+    "x264 crf 0 (mp4)": ("mp4", ["-c:v", "libx264rgb", "-crf", "0", "-preset", "veryfast", "-pix_fmt", "rgb24",
+                                 "-movflags", "use_metadata_tags"]),
+    "animated webp": ("webp", ["-c:v", "libwebp_anim", "-lossless", "1", "-loop", "0"]),
+}
+
+
+def write_ffmetadata(tags):
+    """
+    Writes tags to a temporary ffmetadata file and returns its path. Passing a workflow
+    with -metadata would easily exceed the ~32K character Windows command line limit.
+    """
+    lines = [";FFMETADATA1"]
+    for key, value in tags.items():
+        for special in "\\=;#\n":
+            key, value = key.replace(special, "\\" + special), value.replace(special, "\\" + special)
+        lines.append(f"{key}={value}")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8", delete=False) as f:
+        f.write("\n".join(lines) + "\n")
+    return f.name
+
+
 class EnhancedSaveImage(SaveImage):
     def __init__(self):
         super().__init__()
 
     @classmethod
     def INPUT_TYPES(s):
-        return {"required": 
+        return {"required":
                     {"images": ("IMAGE", ),
                      "filename_prefix": ("STRING", {"default": "%date:yyyy%/%date:yyyy-MM-dd%/ComfyUI_%date:yyyy-MM-dd-hhmmss%"})},
+                "optional":
+                    {"async_save": ("BOOLEAN", {"default": False}),
+                     "wait_for_writes": ("BOOLEAN", {"default": False}),
+                     "compress_level": ("INT", {"default": 4, "min": 0, "max": 9}),
+                     "output_format": (["png"] + list(CONTAINER_FORMATS), {"default": "png"}),
+                     "frame_rate": ("FLOAT", {"default": 24.0, "min": 0.01, "max": 240.0, "step": 0.01})},
                 "hidden": {"prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},
                 }
 
@@ -21,21 +141,132 @@ class EnhancedSaveImage(SaveImage):
     OUTPUT_NODE = True
     CATEGORY = "image"
 
-    def save_images_enhanced(self, images, filename_prefix, prompt=None, extra_pnginfo=None):
-        # 1. Manually replace the %date% tokens to avoid the WinError 123
-        now = datetime.now()
-        filename_prefix = filename_prefix.replace("%date:yyyy%", now.strftime("%Y"))
-        filename_prefix = filename_prefix.replace("%date:yyyy-MM-dd%", now.strftime("%Y-%m-%d"))
-        filename_prefix = filename_prefix.replace("%date:yyyy-MM-dd-hhmmss%", now.strftime("%Y-%m-%d-%H%M%S"))
+    @staticmethod
+    def pending_writes():
+        """Queue depth of the background writer (0 if it was never used)."""
+        return _writer.queue_depth if _writer is not None else 0
+
+    def save_images_enhanced(self, images, filename_prefix, prompt=None, extra_pnginfo=None,
+                             async_save=False, compress_level=4, output_format="png", frame_rate=24.0,
+                             wait_for_writes=False):
+        # 1. Resolve the date tokens
+        filename_prefix = expand_date_tokens(filename_prefix)
 
         # 2. Get the official output directory
         output_dir = folder_paths.get_output_directory()
         full_path = os.path.join(output_dir, filename_prefix)
-        
+
         # 3. Ensure the directories exist before saving
         dirname = os.path.dirname(full_path)
         if not os.path.exists(dirname):
             os.makedirs(dirname, exist_ok=True)
 
-        # 4. Now that the path is "real", let the standard saver do its work
-        return self.save_images(images, filename_prefix, prompt, extra_pnginfo)
\ No newline at end of file
+        self.compress_level = compress_level
+
+        # 4. Container mode: the whole batch goes into one video/animation file
+        if output_format in CONTAINER_FORMATS:
+            return self.save_container(images, filename_prefix, output_format, frame_rate, prompt, extra_pnginfo)
+
+        # 5. Now that the path is "real", let the standard saver do its work
+        if not async_save:
+            return self.save_images(images, filename_prefix, prompt, extra_pnginfo)
+
+        # 6. Async mode: hand the encoding to the background writer and return
+        return self.save_images_async(images, filename_prefix, prompt, extra_pnginfo, wait_for_writes)
+
+    def save_images_async(self, images, filename_prefix, prompt=None, extra_pnginfo=None, wait_for_writes=False):
+        writer = get_background_writer()
+        filename_prefix += self.prefix_append
+        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(
+            filename_prefix, self.output_dir, images[0].shape[1], images[0].shape[0])
+
+        metadata = None
+        if not args.disable_metadata:
+            metadata = PngInfo()
+            if prompt is not None:
+                metadata.add_text("prompt", json.dumps(prompt))
+            if extra_pnginfo is not None:
+                for x in extra_pnginfo:
+                    metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+
+        # Filenames (and the counter) are assigned here, in batch order, so the
+        # output sequence is the same no matter which worker finishes first.
+        results = list()
+        futures = list()
+        for batch_number, image in enumerate(images):
+            i = 255. * image.cpu().numpy()
+            img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
+            filename_with_batch_num = filename.replace("%batch_num%", str(batch_number))
+            file = f"{filename_with_batch_num}_{counter:05}_.png"
+            futures.append(writer.submit(img, os.path.join(full_output_folder, file), metadata, self.compress_level))
+            results.append({"filename": file, "subfolder": subfolder, "type": self.type})
+            counter += 1
+
+        pending = writer.queue_depth # Sampled now; the writes finish after the node returns
+        if not wait_for_writes:
+            # The files may not be on disk yet, so they are not handed to the UI as
+            # previews; "queued_images" lets a frontend load them once they are.
+            print(f"[EnhancedSaveImage] Queued {len(results)} image(s), {pending} pending")
+            return {"ui": {"queued_images": results, "pending_writes": [pending]}}
+
+        # Opt-in: block until this batch is on disk so the UI can preview it right away
+        wait(futures)
+        failed = [f for f in futures if f.exception() is not None]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(futures)} image(s) could not be saved: {failed[0].exception()}")
+        print(f"[EnhancedSaveImage] Wrote {len(results)} image(s) in parallel")
+        return {"ui": {"images": results, "pending_writes": [pending]}}
+
+    def save_container(self, images, filename_prefix, output_format, frame_rate, prompt=None, extra_pnginfo=None):
+        """
+        Streams the raw frames into an ffmpeg pipe, so no intermediate PNGs
+        are written no matter how long the batch is.
+        """
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg was not found on PATH, it is needed for the container output formats")
+
+        extension, codec_args = CONTAINER_FORMATS[output_format]
+        height, width = images.shape[1], images.shape[2]
+        filename_prefix += self.prefix_append
+        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(
+            filename_prefix, self.output_dir, width, height)
+        file = f"{filename.replace('%batch_num%', '0')}_{counter:05}_.{extension}"
+
+        cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(frame_rate),
+               "-i", "-"]
+        # Same metadata as the PNG text chunks: the prompt (as comment) and the workflow
+        tags = {}
+        if not args.disable_metadata:
+            if prompt is not None:
+                tags["comment"] = json.dumps(prompt)
+            for x in extra_pnginfo or {}:
+                tags[x] = json.dumps(extra_pnginfo[x])
+        metadata_path = write_ffmetadata(tags) if tags else None
+        if metadata_path is not None:
+            cmd += ["-f", "ffmetadata", "-i", metadata_path, "-map", "0:v", "-map_metadata", "1"]
+        cmd += codec_args + [os.path.join(full_output_folder, file)]
+
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                for image in images:
+                    i = 255. * image.cpu().numpy()
+                    process.stdin.write(np.clip(i, 0, 255).astype(np.uint8).tobytes())
+            except BrokenPipeError:
+                pass  # ffmpeg quit early, the error text is reported below
+            finally:
+                process.stdin.close()
+            stderr = process.stderr.read().decode(errors="replace")
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed to write {file}: {stderr.strip()}")
+        finally:
+            if metadata_path is not None:
+                os.remove(metadata_path)
+
+        print(f"[EnhancedSaveImage] Wrote {len(images)} frame(s) to {file}")
+        result = {"filename": file, "subfolder": subfolder, "type": self.type}
+        if extension == "webp":
+            return {"ui": {"images": [result], "animated": (True,)}}
+        return {"ui": {"text": [os.path.join(subfolder, file)]}}
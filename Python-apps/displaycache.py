@@ -0,0 +1,57 @@
+from PIL import Image
+
+# Milliseconds between canvas redraws while the window is being resized
+RESIZE_THROTTLE_MS = 50
+
+def fit_size(image_width, image_height, canvas_width, canvas_height):
+    """Largest size with the image's aspect ratio that fits the canvas (unscaled if that would be tiny)."""
+    img_aspect = image_width / image_height
+    canvas_aspect = canvas_width / canvas_height
+
+    if img_aspect > canvas_aspect:
+        new_width = canvas_width
+        new_height = int(new_width / img_aspect)
+    else:
+        new_height = canvas_height
+        new_width = int(new_height * img_aspect)
+
+    # Prevent extremely small resize if canvas is tiny
+    if new_width < 10 or new_height < 10:
+        return image_width, image_height
+    return max(1, new_width), max(1, new_height)
+
+class DisplayPyramid:
+    """
+    Mip pyramid of one processed image for on-screen display. Each level halves the previous
+    one (Image.reduce, a fast box filter) and levels are built on first use, so fitting the
+    image to a new canvas size only resamples from the nearest level that is still at least
+    as large as the target -- never the full-resolution image again.
+    """
+
+    def __init__(self, pil_image):
+        self.source = pil_image
+        self.levels = [pil_image]
+        self.last_size = None
+        self.last_fitted = None
+
+    def level_for(self, width, height):
+        """Smallest level that is at least width x height (the source when upscaling)."""
+        while True:
+            level = self.levels[-1]
+            if level.width // 2 < max(1, width) or level.height // 2 < max(1, height):
+                break
+            self.levels.append(level.reduce(2))
+        for level in reversed(self.levels):
+            if level.width >= width and level.height >= height:
+                return level
+        return self.source
+
+    def fit(self, canvas_width, canvas_height):
+        """Returns the image scaled to fit the canvas; repeated calls for the same size are free."""
+        size = fit_size(self.source.width, self.source.height, canvas_width, canvas_height)
+        if size != self.last_size:
+            level = self.level_for(*size)
+            # The level is less than twice the target size, so LANCZOS from here is cheap
+            self.last_fitted = level if level.size == size else level.resize(size, Image.LANCZOS)
+            self.last_size = size
+        return self.last_fitted
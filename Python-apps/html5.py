@@ -7,16 +7,25 @@
 import sys
 import os
 import re
+import time
+import json
+import codecs
+import zlib
+import hashlib
+import tempfile
+import difflib
+import heapq
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QSplitter, QPushButton, QLineEdit, QLabel, QListWidget,
-    QTextEdit, QFileDialog, QMessageBox, QCheckBox, QStatusBar,
-    QToolBar, QMenu, QSlider, QComboBox
+    QTextEdit, QFileDialog, QMessageBox, QCheckBox, QStatusBar, QListWidgetItem,
+    QToolBar, QMenu, QSlider, QComboBox, QProgressBar
 )
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 # Corrected import: remove 'Signal', add 'pyqtSignal'
-from PyQt6.QtCore import Qt, QUrl, QRegularExpression, QEvent, pyqtSignal
+from PyQt6.QtCore import Qt, QUrl, QRegularExpression, QEvent, QPoint, QTimer, QThread, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QColor, QTextCharFormat, QTextCursor, QTextDocument, QFont, QSyntaxHighlighter, QWheelEvent
 
 # --- Custom QTextEdit for Mouse Wheel Event ---
@@ -43,41 +52,135 @@ class ZoomableTextEdit(QTextEdit):
             super().wheelEvent(event)
 
 # --- QSyntaxHighlighter Class for HTML ---
+# Highlighting rules as (group name, pattern, format key), in priority order: all rules are
+# merged into one alternation, so at any position the first rule that matches wins and each
+# block is scanned in a single pass. Patterns must not contain capturing groups of their own.
+HTML_HIGHLIGHT_RULES = [
+    # HTML Comments (an unterminated one runs to the end of the line and on into the next blocks)
+    ("comment", r'<!--.*?(?:-->|$)', "comment"),
+    # DOCTYPE
+    ("doctype", r'<!DOCTYPE.*?>', "doctype"),
+    # Basic highlighting for script/style tag blocks (highlights the whole block, across lines)
+    ("script_block", r'<script\b[^>]*>.*?(?:</script>|$)', "script_tag"),
+    ("style_block", r'<style\b[^>]*>.*?(?:</style>|$)', "style_tag"),
+    # HTML Tags: "<div", "</div", "< span" (the tag name itself, not attributes within it)
+    ("tag_open", r'<\s*/?\s*[\w:]+\b', "tag"),
+    ("tag_self_close", r'\b[\w:]+\s*/>', "tag"), # Matches "div/>"
+    # Attributes: the name only, e.g. href in href="..."
+    ("attribute", r'\b[a-zA-Z_][\w\-:]*(?=\s*=)', "attribute"),
+    # String values inside attributes (e.g., "value", 'value')
+    ("string_double", r'"[^"]*"', "string"),
+    ("string_single", r"'[^']*'", "string"),
+    # HTML Entities (&amp;, &nbsp;, &#123;)
+    ("entity", r'&[a-zA-Z0-9#]+;', "entity"),
+    ("tag_close", r'/?>', "tag"), # The closing angle bracket (with the slash of "<br/>")
+]
+
+HTML_HIGHLIGHT_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in HTML_HIGHLIGHT_RULES))
+
+def utf16_offsets(text: str):
+    """
+    Maps str indices to the UTF-16 positions Qt uses, or returns None when they are the same
+    (no characters outside the Basic Multilingual Plane, i.e. almost always).
+    """
+    if text.isascii() or len(text.encode("utf-16-le")) == 2 * len(text):
+        return None
+    offsets, position = [], 0
+    for char in text:
+        offsets.append(position)
+        position += 2 if ord(char) > 0xFFFF else 1
+    offsets.append(position)
+    return offsets
+
+# Block states carried from line to line (QSyntaxHighlighter.setCurrentBlockState)
+STATE_NORMAL, STATE_COMMENT, STATE_SCRIPT, STATE_STYLE = 0, 1, 2, 3
+STATE_PENDING = 0x100 # Flag: only the state of this block was scanned, its formats are still to do
+
+# Multi-line spans: state -> (rule that opens it, text that ends it)
+HTML_SPANS = {
+    STATE_COMMENT: ("comment", "-->"),
+    STATE_SCRIPT: ("script_block", "</script>"),
+    STATE_STYLE: ("style_block", "</style>"),
+}
+HTML_SPAN_OPENERS = {HTML_HIGHLIGHT_PATTERN.groupindex[rule]: state for state, (rule, _) in HTML_SPANS.items()}
+HTML_SPAN_MARKER_PATTERN = re.compile(r'<!--|-->|<script\b[^>]*>|</script>|<style\b[^>]*>|</style>')
+
+def tokenize_html_line(text: str, state: int = STATE_NORMAL):
+    """
+    Tokenizes one line in a single regex pass, continuing a comment/script/style span if the
+    previous line left one open. Returns ([(start, length, group index), ...], end state).
+    """
+    tokens = []
+    position = 0
+    if state in HTML_SPANS:
+        rule, terminator = HTML_SPANS[state]
+        end = text.find(terminator)
+        group_index = HTML_HIGHLIGHT_PATTERN.groupindex[rule]
+        if end == -1:
+            return ([(0, len(text), group_index)] if text else []), state # The whole line is inside the span
+        position = end + len(terminator)
+        tokens.append((0, position, group_index))
+
+    state = STATE_NORMAL
+    for match in HTML_HIGHLIGHT_PATTERN.finditer(text, position):
+        tokens.append((match.start(), match.end() - match.start(), match.lastindex))
+        opened = HTML_SPAN_OPENERS.get(match.lastindex)
+        if opened is not None and not match.group().endswith(HTML_SPANS[opened][1]):
+            state = opened # Only possible for the last token: unterminated spans run to the end of the line
+
+    offsets = utf16_offsets(text)
+    if offsets is not None:
+        tokens = [(offsets[start], offsets[start + length] - offsets[start], group_index)
+                  for start, length, group_index in tokens]
+    return tokens, state
+
+def scan_html_line_state(text: str, state: int = STATE_NORMAL):
+    """
+    Cheap stand-in for tokenize_html_line used on off-screen blocks: only follows the span
+    markers to get the end state. Lines without any marker cost a few substring checks.
+    """
+    if state in HTML_SPANS:
+        if HTML_SPANS[state][1] not in text:
+            return state
+    elif "<!--" not in text and "<s" not in text:
+        return state
+    for marker in HTML_SPAN_MARKER_PATTERN.finditer(text):
+        token = marker.group()
+        if state == STATE_NORMAL:
+            if token == "<!--":
+                state = STATE_COMMENT
+            elif token.startswith("<script"):
+                state = STATE_SCRIPT
+            elif token.startswith("<style"):
+                state = STATE_STYLE
+        elif token == HTML_SPANS[state][1]:
+            state = STATE_NORMAL
+    return state
+
+LAZY_HIGHLIGHT_MARGIN = 100      # Blocks above/below the viewport that are formatted right away
+LAZY_IDLE_CHUNK_BLOCKS = 200     # Off-screen blocks formatted per idle step
+LAZY_IDLE_SLICE_SECONDS = 0.01   # Time budget of one idle step, so typing/scrolling stay responsive
+
 class HtmlHighlighter(QSyntaxHighlighter):
     def __init__(self, parent: QTextDocument):
         super().__init__(parent)
         self.formats = {} # This will be populated by set_theme_colors
-        self.rules = []
-        self._init_rules() # Initialize rules once
-
-    def _init_rules(self):
-        # HTML Comments: (handles multi-line comments by matching the whole block)
-        self.rules.append((r'', "comment"))
-
-        # DOCTYPE
-        self.rules.append((r'<!DOCTYPE.*?>', "doctype"))
-
-        # HTML Tags (e.g., <div>, <p>, <span>, <br/>, </head>)
-        # This matches the tag name itself, not attributes within it.
-        # It covers opening tags, closing tags, and self-closing tags.
-        self.rules.append((r'<\s*[/]?\s*[\w:]+\b', "tag")) # Matches "<div", "</div", "< span"
-        self.rules.append((r'\b[\w:]+\s*/>', "tag")) # Matches "div/>"
-        self.rules.append((r'>', "tag")) # Matches the closing angle bracket
-
-        # Attributes (e.g., href="...", class="...")
-        # This focuses on the attribute name itself, not the value.
-        self.rules.append((r'\b([a-zA-Z_][\w\-\:]*)\s*=', "attribute", 1)) # attr=
-
-        # String values inside attributes (e.g., "value", 'value')
-        self.rules.append((r'"[^"]*"', "string")) # double quoted strings
-        self.rules.append((r"'[^']*'", "string")) # single quoted strings
-
-        # HTML Entities (&amp;, &nbsp;, &#123;)
-        self.rules.append((r'&[a-zA-Z0-9#]+;', "entity"))
-
-        # Basic highlighting for script/style tag blocks (highlights the whole block)
-        self.rules.append((r'<script\b[^>]*>[\s\S]*?</script>', "script_tag"))
-        self.rules.append((r'<style\b[^>]*>[\s\S]*?</style>', "style_tag"))
+        self.group_formats = [None] # Format per regex group index (lastindex), rebuilt on theme change
+        self.rules = HTML_HIGHLIGHT_RULES # Compiled once into HTML_HIGHLIGHT_PATTERN
+
+        # Viewport-lazy highlighting (only once a view is attached, see attach_view): blocks
+        # in visible_blocks are formatted immediately, the others only get their span state
+        # and are marked STATE_PENDING until an idle-time step formats them.
+        self.view = None
+        self.visible_blocks = (0, LAZY_HIGHLIGHT_MARGIN)
+        self._idle_blocks = (-1, -1)   # Extra range being formatted by the current idle step
+        self._idle_position = 0        # Block number the idle steps continue from
+        self._idle_restyle = False     # True while the idle steps re-format every block (theme change)
+        self._idle_found_pending = False
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setInterval(0) # Runs whenever the event loop has nothing else to do
+        self._idle_timer.timeout.connect(self._highlight_idle_step)
 
     def create_format(self, color: QColor, font_weight: QFont.Weight = QFont.Weight.Normal, font_italic: bool = False):
         fmt = QTextCharFormat()
@@ -109,26 +212,699 @@ class HtmlHighlighter(QSyntaxHighlighter):
                 "script_tag": self.create_format(QColor("#4EC9B0"), QFont.Weight.Bold), # Teal for script tags
                 "style_tag": self.create_format(QColor("#C586C0"), QFont.Weight.Bold), # Pink/purple for style tags
             }
-        self.rehighlight() # Force re-highlight of the entire document with new colors
+        self.group_formats = [None] + [self.formats[format_key] for _, _, format_key in self.rules]
+        if self.view is None:
+            self.rehighlight() # Force re-highlight of the entire document with new colors
+        else:
+            # Re-color what is on screen now, the rest of the document at idle time
+            self.highlight_viewport(restyle=True)
+            self._idle_restyle = True
+            self._idle_position = 0
+            self._idle_timer.start()
+
+    def attach_view(self, text_edit: QTextEdit):
+        """Enables viewport-lazy highlighting for the document shown in text_edit."""
+        self.view = text_edit
+        scroll_bar = text_edit.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self.highlight_viewport)
+        scroll_bar.rangeChanged.connect(self.highlight_viewport) # Document loaded / resized / font changed
+        self.highlight_viewport()
+
+    def highlight_viewport(self, *args, restyle=False):
+        """Formats the pending blocks in and around the viewport (every block there if restyle)."""
+        if self.view is None:
+            return
+        viewport = self.view.viewport()
+        first = self.view.cursorForPosition(QPoint(0, 0)).blockNumber()
+        last = self.view.cursorForPosition(QPoint(0, viewport.height())).blockNumber()
+        self.visible_blocks = (max(0, first - LAZY_HIGHLIGHT_MARGIN), last + LAZY_HIGHLIGHT_MARGIN)
+
+        block = self.document().findBlockByNumber(self.visible_blocks[0])
+        while block.isValid() and block.blockNumber() <= self.visible_blocks[1]:
+            if restyle or self._is_pending(block):
+                self.rehighlightBlock(block)
+            block = block.next()
+
+    @staticmethod
+    def _is_pending(block):
+        state = block.userState()
+        return state != -1 and state & STATE_PENDING
+
+    def _highlight_idle_step(self):
+        """Formats the next off-screen blocks within a small time budget; stops once nothing is pending."""
+        deadline = time.perf_counter() + LAZY_IDLE_SLICE_SECONDS
+        block = self.document().findBlockByNumber(self._idle_position)
+        while time.perf_counter() < deadline:
+            if not block.isValid():
+                # End of the document: sweep again if this pass still found work, otherwise done
+                if not (self._idle_found_pending or self._idle_restyle):
+                    self._idle_timer.stop()
+                    return
+                self._idle_found_pending = self._idle_restyle = False
+                block = self.document().firstBlock()
+                continue
+            if self._idle_restyle or self._is_pending(block):
+                self._idle_found_pending = True
+                number = block.blockNumber()
+                self._idle_blocks = (number, number + LAZY_IDLE_CHUNK_BLOCKS)
+                try:
+                    # Formatting a block changes its state (the pending flag goes away), so Qt
+                    # carries on through the following blocks until the end of the idle range
+                    self.rehighlightBlock(block)
+                    if self._idle_restyle:
+                        for _ in range(LAZY_IDLE_CHUNK_BLOCKS): # States are unchanged here, so step explicitly
+                            block = block.next()
+                            if not block.isValid():
+                                break
+                            self.rehighlightBlock(block)
+                finally:
+                    self._idle_blocks = (-1, -1)
+                # A restyle step covered the whole range; a pending cascade may have stopped early
+                next_number = number + LAZY_IDLE_CHUNK_BLOCKS + 1 if self._idle_restyle else number + 1
+                block = self.document().findBlockByNumber(next_number)
+            else:
+                block = block.next()
+        self._idle_position = block.blockNumber() if block.isValid() else 0
 
     def highlightBlock(self, text: str):
-        self.setCurrentBlockState(0)
+        previous_state = self.previousBlockState()
+        state = STATE_NORMAL if previous_state == -1 else previous_state & ~STATE_PENDING
+
+        if self.view is not None:
+            number = self.currentBlock().blockNumber()
+            if not (self.visible_blocks[0] <= number <= self.visible_blocks[1]
+                    or self._idle_blocks[0] <= number <= self._idle_blocks[1]):
+                # Off-screen: carry the span state on and leave the formats to an idle step
+                self.setCurrentBlockState(scan_html_line_state(text, state) | STATE_PENDING)
+                if not self._idle_timer.isActive():
+                    self._idle_timer.start()
+                return
+
+        tokens, end_state = tokenize_html_line(text, state)
+        group_formats = self.group_formats
+        for start, length, group_index in tokens:
+            self.setFormat(start, length, group_formats[group_index])
+        self.setCurrentBlockState(end_state)
+
+# --- Version Store ---
+VERSION_STORE_SUFFIX = ".versions"  # History of page.html lives in page.html.versions/
+VERSION_SNAPSHOT_INTERVAL = 32      # Full copy every N revisions, so a checkout applies at most N-1 deltas
+VERSION_COMPRESS_LEVEL = 9
+
+def atomic_write(path, data: bytes):
+    """Writes data to a temporary file next to path, then renames it over path: readers never see a partial file."""
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def make_line_delta(old_lines, new_lines):
+    """Line diff as [[start, end, replacement lines], ...] against old_lines; the unchanged runs are left out."""
+    # Block updates change one region, so strip the common head and tail before running difflib
+    limit = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+
+    old_middle = old_lines[prefix:len(old_lines) - suffix]
+    new_middle = new_lines[prefix:len(new_lines) - suffix]
+    matcher = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    return [[prefix + i1, prefix + i2, new_middle[j1:j2]]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+def apply_line_delta(old_lines, delta):
+    lines = []
+    position = 0
+    for start, end, replacement in delta:
+        lines.extend(old_lines[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(old_lines[position:])
+    return lines
+
+def text_digest(text: str):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class VersionStore:
+    """
+    Revision history of one HTML file, kept next to it in page.html.versions/. Revision 0 is
+    the base file; every VERSION_SNAPSHOT_INTERVAL-th revision is a compressed full copy and
+    the others are compressed line deltas against the revision before. Each file is written
+    atomically and index.json last, so an interrupted save leaves the old history intact.
+    """
+
+    def __init__(self, html_path):
+        self.html_path = html_path
+        self.directory = html_path + VERSION_STORE_SUFFIX
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.revisions = [] # {'revision', 'kind', 'file', 'sha1', 'size', 'time', 'message'} per revision
+        self._cache = None  # (revision, lines) of the last revision built, the usual base of the next delta
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.revisions = json.load(f)["revisions"]
+
+    @property
+    def head(self):
+        return len(self.revisions) - 1
+
+    @property
+    def stored_bytes(self):
+        return sum(entry["size"] for entry in self.revisions)
+
+    def find(self, text):
+        """Number of the newest revision with exactly this text, or -1."""
+        digest = text_digest(text)
+        for entry in reversed(self.revisions):
+            if entry["sha1"] == digest:
+                return entry["revision"]
+        return -1
+
+    def commit(self, text, message=""):
+        """Stores text as a new revision (nothing is written if it equals the head). Returns its number."""
+        digest = text_digest(text)
+        if self.revisions and self.revisions[-1]["sha1"] == digest:
+            return self.head
+
+        number = len(self.revisions)
+        lines = text.splitlines(keepends=True)
+        if number % VERSION_SNAPSHOT_INTERVAL == 0:
+            kind, payload = "snapshot", text
+        else:
+            kind, payload = "delta", make_line_delta(self.lines(number - 1), lines)
+        data = zlib.compress(json.dumps(payload).encode('utf-8'), VERSION_COMPRESS_LEVEL)
+
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"r{number:05}.{kind}"
+        atomic_write(os.path.join(self.directory, file_name), data)
+        self.revisions.append({
+            "revision": number, "kind": kind, "file": file_name, "sha1": digest, "size": len(data),
+            "time": datetime.now().isoformat(timespec='seconds'), "message": message,
+        })
+        try:
+            atomic_write(self.index_path, json.dumps({"revisions": self.revisions}, indent=1).encode('utf-8'))
+        except BaseException:
+            self.revisions.pop()
+            raise
+        self._cache = (number, lines)
+        return number
+
+    def lines(self, revision):
+        """Lines (with their line breaks) of a revision: nearest snapshot or cached revision plus the deltas after it."""
+        if self._cache is not None and self._cache[0] == revision:
+            return self._cache[1]
+
+        base = revision
+        while self.revisions[base]["kind"] != "snapshot":
+            base -= 1
+        if self._cache is not None and base < self._cache[0] < revision:
+            number, lines = self._cache
+        else:
+            number, lines = base, self._read(base).splitlines(keepends=True)
+        for number in range(number + 1, revision + 1):
+            lines = apply_line_delta(lines, self._read(number))
+
+        self._cache = (revision, lines)
+        return lines
+
+    def text(self, revision):
+        text = "".join(self.lines(revision))
+        if text_digest(text) != self.revisions[revision]["sha1"]:
+            self._cache = None
+            raise ValueError(f"Revision {revision} in '{self.directory}' is damaged (checksum mismatch)")
+        return text
+
+    def export(self, revision):
+        """Writes a revision as a standalone numbered copy (page-<revision>.html) and returns its path."""
+        base_path, ext = os.path.splitext(self.html_path)
+        export_path = f"{base_path}-{revision}{ext}"
+        atomic_write(export_path, self.text(revision).replace("\n", os.linesep).encode('utf-8')) # As a text-mode write would
+        return export_path
+
+    def _read(self, revision):
+        with open(os.path.join(self.directory, self.revisions[revision]["file"]), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+
+def open_file_history(file_path, disk_text):
+    """
+    Opens the history of file_path (read only) and picks the text to edit: the newest revision
+    while the file on disk is still one of its revisions, else the disk text with revision -1.
+    The disk text is only recorded once an update is committed, see record_base_revision.
+    Returns (store, revision, text).
+    """
+    store = VersionStore(file_path)
+    if store.find(disk_text) == -1:
+        return store, -1, disk_text
+    return store, store.head, store.text(store.head)
+
+def record_base_revision(store, disk_text):
+    """Commits the disk text an edit started from, if the history does not have it yet."""
+    if store.find(disk_text) == -1:
+        store.commit(disk_text, "Base file" if not store.revisions else "Changed on disk")
+
+# --- Data URI Folding ---
+DATA_URI_FOLD_MIN_CHARS = 1024 # Shorter data: URIs stay in the editor as they are
+DATA_URI_PATTERN = re.compile(
+    r'(data:[\w.+-]*/?[\w.+-]*(?:;[\w.+-]+(?:=[\w.+-]+)?)*,)([A-Za-z0-9+/=%%_.~-]{%d,})' % DATA_URI_FOLD_MIN_CHARS)
+FOLDED_DATA_URI_PATTERN = re.compile(r'\[\[folded-data #(\d+): [^\]]*\]\]')
+
+def format_size(byte_count):
+    if byte_count < 1024 * 1024:
+        return f"{byte_count / 1024:.1f} KB"
+    return f"{byte_count / (1024 * 1024):.1f} MB"
+
+class DataUriFolder:
+    """
+    Swaps long data: URI payloads (embedded images/audio) for short [[folded-data #N: size]]
+    tokens, so the editor, highlighter and section index never see megabyte-long lines, and
+    puts them back whenever text leaves the editor (saving, preview, clipboard).
+    Identical payloads share one token.
+    """
 
-        for pattern_str, format_key, *group_index in self.rules:
-            pattern = QRegularExpression(pattern_str)
-            
-            it = pattern.globalMatch(text)
-            while it.hasNext():
-                match = it.next()
-                if group_index:
-                    start = match.capturedStart(group_index[0])
-                    length = match.capturedLength(group_index[0])
-                    if start != -1 and length > 0:
-                        self.setFormat(start, length, self.formats[format_key])
-                else:
-                    start = match.capturedStart()
-                    length = match.capturedLength()
-                    self.setFormat(start, length, self.formats[format_key])
+    def __init__(self):
+        self.payloads = []  # Token number -> payload
+        self._numbers = {}  # Payload -> token number
+
+    def fold(self, text):
+        def replace(match):
+            payload = match.group(2)
+            number = self._numbers.get(payload)
+            if number is None:
+                number = self._numbers[payload] = len(self.payloads)
+                self.payloads.append(payload)
+            return f"{match.group(1)}[[folded-data #{number}: {format_size(len(payload))}]]"
+        return DATA_URI_PATTERN.sub(replace, text)
+
+    def expand(self, text):
+        if not self.payloads or "[[folded-data #" not in text:
+            return text
+        def replace(match):
+            number = int(match.group(1))
+            return self.payloads[number] if number < len(self.payloads) else match.group(0)
+        return FOLDED_DATA_URI_PATTERN.sub(replace, text)
+
+# --- Disk Change Watching ---
+FILE_WATCH_DEBOUNCE_MS = 300 # Editors often save in several steps: wait for the writes to settle
+
+def apply_line_delta_to_document(document, delta):
+    """
+    Applies a make_line_delta() delta (over the document's blocks) in place, last range first
+    so the earlier block numbers stay valid. Untouched blocks keep their formats and states,
+    and cursors elsewhere in the document keep their positions.
+    """
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    for start, end, replacement in reversed(delta):
+        block_count = document.blockCount()
+        if start == end: # Pure insertion before line start
+            if start < block_count:
+                cursor.setPosition(document.findBlockByNumber(start).position())
+                cursor.insertText("\n".join(replacement) + "\n")
+            else:
+                cursor.movePosition(QTextCursor.MoveOperation.End)
+                cursor.insertText("\n" + "\n".join(replacement))
+            continue
+
+        first_block = document.findBlockByNumber(start)
+        last_block = document.findBlockByNumber(end - 1)
+        selection_start = first_block.position()
+        selection_end = last_block.position() + last_block.length() - 1
+        if not replacement: # Deletion: take one line break along
+            if end < block_count:
+                selection_end += 1
+            elif start > 0:
+                selection_start -= 1
+        cursor.setPosition(selection_start)
+        cursor.setPosition(selection_end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText("\n".join(replacement))
+    cursor.endEditBlock()
+
+# --- Background File Loading ---
+LOAD_READ_CHUNK_BYTES = 1024 * 1024   # File is read (and progress reported) in pieces of this size
+LOAD_INSERT_CHUNK_CHARS = 256 * 1024  # Text put into the editor per event loop turn
+
+class HtmlFileLoader(QThread):
+    """Reads and decodes a file, opens its version history and folds its data: URIs off the UI thread."""
+    progress = pyqtSignal(int, int) # Bytes read, file size
+    loaded = pyqtSignal(object)     # Dict: store, revision, text, folded, folder, message, disk_digest
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.cancelled = False
+
+    def run(self):
+        try:
+            size = os.path.getsize(self.file_path)
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            parts = []
+            done = 0
+            with open(self.file_path, 'rb') as f:
+                while not self.cancelled:
+                    chunk = f.read(LOAD_READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    parts.append(decoder.decode(chunk))
+                    done += len(chunk)
+                    self.progress.emit(done, size)
+            if self.cancelled:
+                return
+            parts.append(decoder.decode(b"", final=True))
+            disk_text = "".join(parts).replace("\r\n", "\n").replace("\r", "\n") # Universal newlines, as text mode reads
+
+            name = os.path.basename(self.file_path)
+            message = f"'{name}' loaded successfully."
+            try:
+                store, revision, text = open_file_history(self.file_path, disk_text)
+                if revision > 0:
+                    message = (f"'{name}' loaded at revision {revision} of its history "
+                               f"({store.stored_bytes / 1024:.1f} KB stored).")
+            except (OSError, ValueError) as e:
+                store, revision, text = None, -1, disk_text
+                message += f" Warning: version history unavailable ({e})."
+
+            folder = DataUriFolder()
+            folded = folder.fold(text)
+            if folder.payloads:
+                message += f" {len(folder.payloads)} embedded data URI(s) folded."
+            if not self.cancelled:
+                self.loaded.emit({"store": store, "revision": revision, "text": text, "folded": folded,
+                                  "folder": folder, "message": message, "disk_digest": text_digest(disk_text)})
+        except Exception as e:
+            if not self.cancelled:
+                self.failed.emit(str(e))
+
+# --- Section Index ---
+# Support both // START and ## START
+SECTION_START_PATTERN = re.compile(r'(//|##)\s*START\s+(.+)')
+SECTION_END_PATTERN = re.compile(r'(//|##)\s*END\s+(.+)')
+
+def scan_section_markers(lines, first_line=0):
+    """Returns (line number, 'start'/'end', section name) for every marker in lines, numbered from first_line (0-based)."""
+    markers = []
+    for i, line in enumerate(lines, first_line):
+        if "START" not in line and "END" not in line:
+            continue # Cheap pre-check, almost every line of a large file stops here
+        start_match = SECTION_START_PATTERN.search(line)
+        if start_match:
+            markers.append((i, 'start', start_match.group(2).strip()))
+            continue
+        end_match = SECTION_END_PATTERN.search(line)
+        if end_match:
+            markers.append((i, 'end', end_match.group(2).strip()))
+    return markers
+
+class SectionIndex:
+    """
+    Interval map of the // START ... // END sections of a document, updated one changed line
+    range at a time. Only the marker lines are stored, so an edit re-scans the changed lines,
+    shifts the markers below them and re-pairs the (few) markers; other text is never read.
+    """
+
+    def __init__(self):
+        self.marker_lines = [] # Sorted 0-based line numbers of the marker lines
+        self.markers = []      # ('start'/'end', name) for each entry of marker_lines
+        self.line_count = 1    # An empty QTextDocument still has one block
+        self.sections = {}     # name -> {'start_line', 'end_line'}, 1-based marker lines
+        self.order = []        # Section names in list order
+        self.warnings = []
+
+    def replace_lines(self, first, old_last, new_lines):
+        """Lines first..old_last (0-based, inclusive) were replaced by new_lines. Returns True if the sections changed."""
+        lo = bisect_left(self.marker_lines, first)
+        hi = bisect_right(self.marker_lines, old_last)
+        shift = len(new_lines) - (old_last - first + 1)
+        scanned = scan_section_markers(new_lines, first)
+
+        tail = self.marker_lines[hi:]
+        if shift:
+            tail = [line + shift for line in tail]
+        self.marker_lines[lo:] = [line for line, _, _ in scanned] + tail
+        self.markers[lo:hi] = [(kind, name) for _, kind, name in scanned]
+        self.line_count += shift
+        return self._pair()
+
+    def is_marker(self, line):
+        i = bisect_left(self.marker_lines, line)
+        return i < len(self.marker_lines) and self.marker_lines[i] == line
+
+    def _pair(self):
+        sections, order, warnings = {}, [], []
+        current_section_name = None
+        section_start_line = -1
+        for line, (kind, name) in zip(self.marker_lines, self.markers):
+            if kind == 'start':
+                if current_section_name:
+                    warnings.append(
+                        f"Warning: Nested or unclosed section detected before '{name}' at line {line+1}. This section will be ignored.")
+                current_section_name = name
+                section_start_line = line + 1
+            elif current_section_name and current_section_name == name:
+                sections[current_section_name] = {'start_line': section_start_line, 'end_line': line + 1}
+                order.append(current_section_name)
+                current_section_name = None
+                section_start_line = -1
+            else:
+                warnings.append(f"Warning: Mismatched or unstarted END marker for '{name}' at line {line+1}. Ignoring.")
+
+        if current_section_name:
+            warnings.append(
+                f"Warning: Section '{current_section_name}' started at line {section_start_line} but no END marker found.")
+
+        changed = sections != self.sections or order != self.order
+        self.sections, self.order, self.warnings = sections, order, warnings
+        return changed
+
+# --- Project Search Index ---
+PROJECT_FILE_EXTENSIONS = ('.html', '.htm', '.js')
+PROJECT_SKIP_DIRECTORIES = {'node_modules', '__pycache__'} # Besides hidden folders and version stores
+PROJECT_INDEX_FILE = ".html5-project-index.json" # Cache of the index, kept in the project folder
+PROJECT_SEARCH_LIMIT = 100
+PROJECT_REFRESH_SECONDS = 5 # Searching re-checks file times at most this often
+FUNCTION_DEFINITION_PATTERN = re.compile(
+    r'\bfunction\b\s*\*?\s*([A-Za-z_$][\w$]*)\s*\(' # function name(
+    r'|([A-Za-z_$][\w$]*)\s*[:=]\s*(?:async\s+)?(?:function\b|\([^()]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)') # name = function / (...) =>
+
+def same_path(first, second):
+    return bool(first) and bool(second) and os.path.normcase(os.path.abspath(first)) == os.path.normcase(os.path.abspath(second))
+
+def scan_function_definitions(lines):
+    """Yields (name, 1-based line) for the function definitions in lines."""
+    for number, line in enumerate(lines, 1):
+        if "function" not in line and "=>" not in line:
+            continue
+        for match in FUNCTION_DEFINITION_PATTERN.finditer(line):
+            yield match.group(1) or match.group(2), number
+
+def scan_project_file(path):
+    """Sections and function definitions of one file as [kind, name, 1-based line]."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = f.read().split("\n") # Same line numbers as the editor's blocks
+    sections = SectionIndex()
+    sections.replace_lines(0, 0, lines)
+    items = [['section', name, data['start_line']] for name, data in sections.sections.items()]
+    items.extend(['function', name, line] for name, line in scan_function_definitions(lines))
+    return items
+
+def fuzzy_score(query, text):
+    """Score of query as a case-insensitive subsequence of text (higher is better), None if it is not one."""
+    query, lowered = query.lower(), text.lower()
+    at = lowered.find(query)
+    if at != -1:
+        return 1000 + (500 if at == 0 else 0) - at - len(text)
+
+    score = 0
+    previous = -1
+    for ch in query:
+        position = lowered.find(ch, previous + 1)
+        if position == -1:
+            return None
+        if position == previous + 1:
+            score += 15 # Runs of consecutive characters
+        elif position == 0 or not text[position - 1].isalnum() or (text[position].isupper() and text[position - 1].islower()):
+            score += 10 # Word starts and camelCase humps
+        score -= min(position - previous - 1, 10)
+        previous = position
+    return score - len(text)
+
+class ProjectIndex:
+    """
+    Sections and function definitions of every HTML/JS file under a folder, for searching
+    across files without opening them. The entries are cached in PROJECT_INDEX_FILE and
+    refresh() only re-scans files whose modification time or size changed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.cache_path = os.path.join(root, PROJECT_INDEX_FILE)
+        self.files = {} # Path relative to root -> {'mtime', 'size', 'items'}
+        self.refreshed_at = 0.0
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def refresh(self):
+        """
+        Re-scans new and changed files and drops deleted ones; returns how many files were
+        scanned. The new table replaces self.files in one assignment, so it can run on a
+        worker thread while the UI keeps searching the old one.
+        """
+        files = {}
+        scanned = 0
+        for directory, subdirectories, names in os.walk(self.root):
+            subdirectories[:] = sorted(d for d in subdirectories if not d.startswith('.')
+                                       and not d.endswith(VERSION_STORE_SUFFIX) and d not in PROJECT_SKIP_DIRECTORIES)
+            for name in sorted(names):
+                if not name.lower().endswith(PROJECT_FILE_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root)
+                try:
+                    stat = os.stat(path)
+                    entry = self.files.get(relative)
+                    if entry is None or entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+                        entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'items': scan_project_file(path)}
+                        scanned += 1
+                except OSError:
+                    continue # Vanished or unreadable, leave it out
+                files[relative] = entry
+
+        changed = scanned > 0 or files.keys() != self.files.keys()
+        self.files = files
+        self.refreshed_at = time.monotonic()
+        if changed:
+            try:
+                atomic_write(self.cache_path, json.dumps({"files": files}).encode('utf-8'))
+            except OSError:
+                pass # Read-only folder: the index just is not cached
+        return scanned
+
+    def search(self, query, limit=PROJECT_SEARCH_LIMIT):
+        """Best fuzzy matches for query as (score, relative path, kind, name, line), best first."""
+        query = query.strip()
+        if not query:
+            return []
+        results = []
+        for relative, entry in self.files.items():
+            for kind, name, line in entry['items']:
+                score = fuzzy_score(query, name)
+                if score is not None:
+                    results.append((score + (5 if kind == 'section' else 0), relative, kind, name, line))
+        return heapq.nlargest(limit, results)
+
+class ProjectIndexScanner(QThread):
+    """Runs ProjectIndex.refresh() off the UI thread."""
+    scanned = pyqtSignal(int) # Number of files re-scanned
+    failed = pyqtSignal(str)
+
+    def __init__(self, project_index, parent=None):
+        super().__init__(parent)
+        self.project_index = project_index
+
+    def run(self):
+        try:
+            self.scanned.emit(self.project_index.refresh())
+        except Exception as e:
+            self.failed.emit(str(e))
+
+# --- Hot Section Reload ---
+# A changed section inside a classic <script> is re-evaluated in the page's global scope:
+# top-level function and var declarations simply replace the old globals. Only sections made
+# of declarations can be run twice safely (see hot_reloadable_functions); anything else, and
+# a script error during the eval, falls back to a full reload.
+HOT_RELOAD_SCRIPT_JS = """(function (code) {
+    try { (0, eval)(code); return "ok"; }
+    catch (error) { return "error: " + error; }
+})(%s);"""
+# A changed section inside a <style> is swapped in the text of the style element that holds it
+HOT_RELOAD_STYLE_JS = """(function (oldCss, newCss) {
+    for (const style of document.querySelectorAll("style")) {
+        const text = style.textContent;
+        const at = text.indexOf(oldCss);
+        if (at !== -1) {
+            style.textContent = text.slice(0, at) + newCss + text.slice(at + oldCss.length);
+            return "ok";
+        }
+    }
+    return "error: section not found in the page";
+})(%s, %s);"""
+SCRIPT_OPEN_TAG_PATTERN = re.compile(r'<script\b[^>]*>', re.IGNORECASE)
+SCRIPT_TYPE_PATTERN = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+FUNCTION_DECLARATION_PATTERN = re.compile(r'(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)\s*\(')
+# var x = ..., x = ..., a.b.c = ... (let/const/class declared by eval would only live inside the eval)
+ASSIGNMENT_PATTERN = re.compile(r'(?:var\s+)?[A-Za-z_$][\w$]*(?:\s*\.\s*[A-Za-z_$][\w$]*)*\s*=(?![=>])\s*(.*)', re.DOTALL)
+FUNCTION_VALUE_PATTERN = re.compile(r'(?:async\s+)?(?:function\b|(?:\([^()]*\)|[A-Za-z_$][\w$]*)\s*=>)')
+
+def top_level_statements(code, indent):
+    """
+    Splits script code into its top-level statements: each line indented like `indent` starts
+    one, deeper lines and closing brackets continue it. Blank and comment lines are left out.
+    """
+    statements = []
+    for line in code.split("\n"):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("//", "/*", "*")):
+            continue
+        line_indent = line[:len(line) - len(line.lstrip())]
+        if statements and (len(line_indent) > len(indent) or stripped[0] in "}])"):
+            statements[-1] += "\n" + line
+        else:
+            statements.append(line)
+    return statements
+
+def referenced_by_value(name, text):
+    """True if name occurs in text other than in a call or its declaration, e.g. addEventListener("click", name)."""
+    for match in re.finditer(r'(?<![\w$.])' + re.escape(name) + r'(?![\w$])', text):
+        if re.match(r'\s*\(', text[match.end():]):
+            continue
+        if re.search(r'function\s*\*?\s*$', text[max(0, match.start() - 40):match.start()]):
+            continue
+        return True
+    return False
+
+def hot_reloadable_functions(code, indent):
+    """
+    (name, statement) of the functions a script section declares, or None if evaluating it again
+    would do more than redefine things: a top-level call (addEventListener, setInterval,
+    requestAnimationFrame(loop), ...) would run a second time next to the first one. Allowed
+    are function declarations and var/assignment statements with function or call-free values.
+    """
+    names = []
+    for statement in top_level_statements(code, indent):
+        text = statement.strip()
+        declaration = FUNCTION_DECLARATION_PATTERN.match(text)
+        if declaration:
+            names.append((declaration.group(1), statement))
+            continue
+        assignment = ASSIGNMENT_PATTERN.match(text)
+        if assignment is None:
+            return None
+        value = assignment.group(1)
+        if FUNCTION_VALUE_PATTERN.match(value):
+            if value.startswith("function") and text.rstrip("; ").endswith(")"):
+                return None # Immediately invoked
+        elif "(" in value:
+            return None
+    return names
+
+def block_start_state(block):
+    """Highlighter span state (STATE_*) at the start of a block, taken from the block before it."""
+    previous = block.previous()
+    if not previous.isValid() or previous.userState() == -1:
+        return STATE_NORMAL
+    return previous.userState() & ~STATE_PENDING
 
 # --- Main Application Class ---
 class HTMLHelperApp(QMainWindow):
@@ -139,18 +915,46 @@ class HTMLHelperApp(QMainWindow):
 
         self.current_html_path = ""
         self.current_html_content = ""
+        self.version_store = None # History of the loaded file, see VersionStore
+        self.current_revision = -1
+        self.unrecorded_text = None # Text loaded from disk that is not in the history yet
         self.sections = {}
         self.auto_refresh_enabled = True
+        self.hot_reload_enabled = True
+        self.browser_content = None # Document text the preview page currently represents
+        self.data_uri_folder = DataUriFolder() # Payloads of the data: URIs folded in the editor
+        self.file_loader = None # Running HtmlFileLoader
+        self.insert_job = None  # Text still being put into the editor, see insert_document_text
+        self.insert_timer = QTimer(self)
+        self.insert_timer.setInterval(0)
+        self.insert_timer.timeout.connect(self._insert_next_chunk)
+        self.project_index = None      # ProjectIndex of the folder searched by the project search box
+        self.project_folder_chosen = False # True once picked with "Folder...", else it follows the loaded file
+        self.project_scanner = None    # Running ProjectIndexScanner
+        self.pending_search_target = None # (path, kind, name, line) to show once that file is loaded
+        self.disk_digest = None        # text_digest() of the loaded file as last read from disk
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_watched_file_changed)
+        self.file_watcher.directoryChanged.connect(self.on_watched_directory_changed)
+        self.file_watch_timer = QTimer(self)
+        self.file_watch_timer.setSingleShot(True)
+        self.file_watch_timer.setInterval(FILE_WATCH_DEBOUNCE_MS)
+        self.file_watch_timer.timeout.connect(self.apply_disk_changes)
         
         # --- Initialize QTextEdit elements and their related formats/highlighters FIRST ---
         self.full_html_text = ZoomableTextEdit() # Use our custom ZoomableTextEdit
         self.full_html_text_format = QTextCharFormat() # Used for the current selection highlight
 
         self.html_syntax_highlighter = HtmlHighlighter(self.full_html_text.document())
+        self.html_syntax_highlighter.attach_view(self.full_html_text) # Highlight the viewport first, the rest when idle
 
         self.code_block_text = QTextEdit()
         self.section_listbox = QListWidget() # Needs to be initialized before apply_stylesheet for the guard
 
+        # Sections are re-indexed from each document change (loads, block updates and typing alike)
+        self.section_index = SectionIndex()
+        self.full_html_text.document().contentsChange.connect(self.on_document_contents_change)
+
 
         # --- Font and Theme Initialization ---
         self.current_theme = "dark" # Start in dark mode by default
@@ -164,6 +968,10 @@ class HTMLHelperApp(QMainWindow):
         # Status Bar
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
+        self.load_progress_bar = QProgressBar()
+        self.load_progress_bar.setMaximumWidth(220)
+        self.load_progress_bar.hide()
+        self.statusBar.addPermanentWidget(self.load_progress_bar)
         self.update_status("Application started.")
 
         # Set up the central widget and main layout
@@ -207,6 +1015,24 @@ class HTMLHelperApp(QMainWindow):
         left_layout.addWidget(QLabel("HTML Sections:"))
         self.section_listbox.itemSelectionChanged.connect(self.display_selected_section)
         left_layout.addWidget(self.section_listbox)
+
+        left_layout.addWidget(QLabel("Project Search:"))
+        project_search_row = QWidget()
+        project_search_layout = QHBoxLayout(project_search_row)
+        project_search_layout.setContentsMargins(0, 0, 0, 0)
+        self.project_search_entry = QLineEdit()
+        self.project_search_entry.setPlaceholderText("Section or function name...")
+        self.project_search_entry.textChanged.connect(self.search_project)
+        self.project_search_entry.returnPressed.connect(self.jump_to_first_search_result)
+        project_search_layout.addWidget(self.project_search_entry, 1)
+        project_folder_button = QPushButton("Folder...")
+        project_folder_button.clicked.connect(self.choose_project_folder)
+        project_search_layout.addWidget(project_folder_button)
+        left_layout.addWidget(project_search_row)
+
+        self.project_results_list = QListWidget()
+        self.project_results_list.itemActivated.connect(self.jump_to_search_result)
+        left_layout.addWidget(self.project_results_list)
         main_splitter.addWidget(left_frame)
 
         # --- Middle Pane: HTML Display & Code Block Editor ---
@@ -281,6 +1107,17 @@ class HTMLHelperApp(QMainWindow):
         self.update_block_button.clicked.connect(self.update_selected_block)
         self.update_block_button.setEnabled(False)
         block_buttons_layout.addWidget(self.update_block_button)
+
+        block_buttons_layout.addWidget(QLabel("Revision:"))
+        self.revision_combobox = QComboBox()
+        self.revision_combobox.setMinimumWidth(260)
+        self.revision_combobox.activated.connect(self.checkout_revision) # User picks only, not refresh_revision_list
+        block_buttons_layout.addWidget(self.revision_combobox)
+
+        self.export_copy_button = QPushButton("Export Copy")
+        self.export_copy_button.clicked.connect(self.export_revision_copy)
+        self.export_copy_button.setEnabled(False)
+        block_buttons_layout.addWidget(self.export_copy_button)
         
         block_buttons_layout.addStretch(1)
 
@@ -309,6 +1146,13 @@ class HTMLHelperApp(QMainWindow):
         self.auto_refresh_checkbox.stateChanged.connect(self.toggle_auto_refresh)
         refresh_controls_layout.addWidget(self.auto_refresh_checkbox)
 
+        self.hot_reload_checkbox = QCheckBox("Hot Reload Sections")
+        self.hot_reload_checkbox.setToolTip("Send only an updated <script>/<style> section into the running page "
+                                            "instead of reloading it (falls back to a full reload when that fails)")
+        self.hot_reload_checkbox.setChecked(self.hot_reload_enabled)
+        self.hot_reload_checkbox.stateChanged.connect(self.toggle_hot_reload)
+        refresh_controls_layout.addWidget(self.hot_reload_checkbox)
+
         refresh_controls_layout.addStretch(1)
 
         right_layout.addWidget(refresh_controls_frame)
@@ -529,6 +1373,10 @@ class HTMLHelperApp(QMainWindow):
         self.auto_refresh_enabled = (state == Qt.CheckState.Checked.value)
         self.update_status(f"Auto refresh set to: {self.auto_refresh_enabled}")
 
+    def toggle_hot_reload(self, state):
+        self.hot_reload_enabled = (state == Qt.CheckState.Checked.value)
+        self.update_status(f"Hot reload set to: {self.hot_reload_enabled}")
+
     def browse_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open HTML File", "", "HTML files (*.html);;All files (*.*)")
         if file_path:
@@ -545,76 +1393,367 @@ class HTMLHelperApp(QMainWindow):
             self.update_block_button.setEnabled(False)
             return
 
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.current_html_content = f.read()
+        # Reading, decoding and folding run on a worker thread; the text then goes into the
+        # editor in chunks, so the window stays responsive for files of any size
+        self.cancel_file_load()
+        self.update_block_button.setEnabled(False)
+        self.full_html_text.setReadOnly(True) # Until all of the text is in
+        self.show_load_progress("Reading %p%", 0)
+        self.update_status(f"Loading '{os.path.basename(file_path)}'...")
+
+        loader = HtmlFileLoader(file_path, self)
+        loader.progress.connect(lambda done, total: self.show_load_progress("Reading %p%", done * 100 // max(1, total)))
+        loader.loaded.connect(lambda result: self.on_file_loaded(loader, result))
+        loader.failed.connect(lambda message: self.on_file_load_failed(loader, message))
+        loader.finished.connect(loader.deleteLater)
+        self.file_loader = loader
+        loader.start()
+
+    def on_file_loaded(self, loader, result):
+        if loader is not self.file_loader:
+            return # A newer load replaced this one
+        self.file_loader = None
+        self.version_store = result["store"]
+        self.current_revision = result["revision"]
+        self.current_html_content = result["text"]
+        self.unrecorded_text = result["text"] if result["revision"] == -1 else None
+        self.data_uri_folder = result["folder"]
+        self.disk_digest = result["disk_digest"]
+        self.watch_file(self.current_html_path)
+        self.refresh_revision_list()
+        if not self.project_folder_chosen:
+            self.set_project_folder(os.path.dirname(os.path.abspath(self.current_html_path)))
+        self.insert_document_text(result["folded"], result["message"], refresh=True)
+
+    def on_file_load_failed(self, loader, message):
+        if loader is not self.file_loader:
+            return
+        self.file_loader = None
+        self.pending_search_target = None
+        self.load_progress_bar.hide()
+        self.update_status(f"Error loading file: {message}")
+        self.current_html_content = ""
+        self.full_html_text.setPlainText("") # Also empties the section index and list
+        self.full_html_text.setReadOnly(False)
+        self.update_block_button.setEnabled(False)
 
-            self.full_html_text.setPlainText(self.current_html_content)
-            self.parse_sections()
-            self.update_block_button.setEnabled(True)
-            self.update_status(f"'{os.path.basename(file_path)}' loaded successfully.")
+    def cancel_file_load(self):
+        if self.file_loader is not None:
+            self.file_loader.cancelled = True
+            self.file_loader = None
+        if self.insert_job is not None:
+            self.insert_timer.stop()
+            self.insert_job = None
+            self.full_html_text.document().setUndoRedoEnabled(True)
+
+    def show_load_progress(self, label, percent):
+        self.load_progress_bar.setFormat(label)
+        self.load_progress_bar.setValue(percent)
+        self.load_progress_bar.show()
+
+    def insert_document_text(self, text, done_message, refresh):
+        """Replaces the editor text a chunk of lines per event loop turn (see _insert_next_chunk)."""
+        self.insert_timer.stop()
+        self.full_html_text.setReadOnly(True)
+        self.full_html_text.document().setUndoRedoEnabled(False) # Also drops the old undo history
+        self.full_html_text.clear()
+        self.insert_job = {"text": text, "position": 0, "message": done_message, "refresh": refresh}
+        self.show_load_progress("Inserting %p%", 0)
+        self.insert_timer.start()
+
+    def _insert_next_chunk(self):
+        job = self.insert_job
+        if job is None:
+            self.insert_timer.stop()
+            return
+        text, position = job["text"], job["position"]
+        end = min(len(text), position + LOAD_INSERT_CHUNK_CHARS)
+        if end < len(text): # Whole lines only
+            line_end = text.find("\n", end)
+            end = len(text) if line_end == -1 else line_end + 1
+
+        cursor = QTextCursor(self.full_html_text.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text[position:end]) # The section index follows through contentsChange
+        job["position"] = end
+        if position == 0:
+            self.html_syntax_highlighter.highlight_viewport() # The first screen is in, format it now
+
+        if end < len(text):
+            self.show_load_progress("Inserting %p%", end * 100 // len(text))
+            return
 
+        self.insert_timer.stop()
+        self.insert_job = None
+        self.full_html_text.document().setUndoRedoEnabled(True)
+        self.full_html_text.setReadOnly(False)
+        self.load_progress_bar.hide()
+        self.update_block_button.setEnabled(True)
+        self.update_status(job["message"])
+        if job["refresh"]:
             self.refresh_browser()
 
-        except Exception as e:
-            self.update_status(f"Error loading file: {e}")
-            self.current_html_content = ""
-            self.full_html_text.setPlainText("")
-            self.sections.clear()
-            self.section_listbox.clear()
-            self.update_block_button.setEnabled(False)
+        target, self.pending_search_target = self.pending_search_target, None
+        if target is not None and same_path(target[0], self.current_html_path):
+            self.go_to_search_target(*target[1:])
 
-    def parse_sections(self):
-        self.sections.clear()
-        self.section_listbox.clear()
-
-        lines = self.full_html_text.toPlainText().splitlines()
-        current_section_name = None
-        section_start_line = -1
-        section_content_lines = []
-
-        # Support both // START and ## START
-        start_pattern = re.compile(r'(//|##)\s*START\s+(.+)')
-        end_pattern = re.compile(r'(//|##)\s*END\s+(.+)')
+    def watch_file(self, file_path):
+        """
+        Watches only file_path for changes made by other programs. Its folder is watched
+        too, so the file is picked up again after a save that deletes or renames it.
+        """
+        watched = self.file_watcher.files() + self.file_watcher.directories()
+        if watched:
+            self.file_watcher.removePaths(watched)
+        self.file_watch_timer.stop()
+        self.file_watcher.addPath(file_path)
+        self.file_watcher.addPath(os.path.dirname(os.path.abspath(file_path)))
+
+    def on_watched_file_changed(self, file_path):
+        if not same_path(file_path, self.current_html_path):
+            return
+        self.file_watch_timer.start() # Restarts the wait on every change
 
-        for i, line in enumerate(lines):
-            start_match = start_pattern.search(line)
-            end_match = end_pattern.search(line)
+    def on_watched_directory_changed(self, directory):
+        # Only matters while the file itself dropped out of the watcher (deleted or replaced)
+        file_path = self.current_html_path
+        if file_path and file_path not in self.file_watcher.files() and os.path.exists(file_path):
+            self.file_watch_timer.start()
 
-            if start_match:
-                if current_section_name:
-                    self.update_status(
-                        f"Warning: Nested or unclosed section detected before '{start_match.group(2)}' at line {i+1}. This section will be ignored.")
-                    current_section_name = None
-                    section_start_line = -1
-                    section_content_lines = []
-
-                current_section_name = start_match.group(2).strip()
-                section_start_line = i + 1
-                section_content_lines = []
-
-            elif end_match:
-                end_section_name = end_match.group(2).strip()
-                if current_section_name and current_section_name == end_section_name:
-                    self.sections[current_section_name] = {
-                        'start_line': section_start_line,
-                        'end_line': i + 1,
-                        'content': "\n".join(section_content_lines)
-                    }
-                    self.section_listbox.addItem(current_section_name)
-                    current_section_name = None
-                    section_start_line = -1
-                    section_content_lines = []
-                else:
-                    self.update_status(
-                        f"Warning: Mismatched or unstarted END marker for '{end_section_name}' at line {i+1}. Ignoring.")
-            elif current_section_name:
-                section_content_lines.append(line)
+    def apply_disk_changes(self):
+        """Brings the editor up to the file on disk by applying only the changed lines."""
+        file_path = self.current_html_path
+        if self.file_loader is not None or self.insert_job is not None:
+            self.file_watch_timer.start() # Still loading, try again shortly
+            return
+        if not os.path.exists(file_path):
+            self.update_status(f"Warning: '{os.path.basename(file_path)}' was deleted or renamed on disk.")
+            return
+        # Saving by delete-then-create or by renaming a new file drops the path from the watcher
+        if file_path not in self.file_watcher.files():
+            self.file_watcher.addPath(file_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                disk_text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            self.update_status(f"Warning: Could not read the changed file: {e}")
+            return
+        digest = text_digest(disk_text)
+        if digest == self.disk_digest:
+            return # Touched or rewritten with the same text
+        self.disk_digest = digest
+
+        buffer_text = self.full_html_text.toPlainText()
+        if self.data_uri_folder.expand(buffer_text) != self.current_html_content:
+            answer = QMessageBox.question(
+                self, "File Changed on Disk",
+                f"'{os.path.basename(file_path)}' was changed by another program, and the editor has changes "
+                f"that were not saved with Update Block.\n\nReplace them with the text from disk?")
+            if answer != QMessageBox.StandardButton.Yes:
+                self.update_status("Kept the editor text; the file on disk differs.")
+                return
+
+        delta = make_line_delta(buffer_text.split("\n"), self.data_uri_folder.fold(disk_text).split("\n"))
+        apply_line_delta_to_document(self.full_html_text.document(), delta)
+        self.current_html_content = disk_text
+        status = f"Applied {len(delta)} changed range(s) from disk."
+        if self.version_store is not None and not self.version_store.revisions:
+            self.unrecorded_text = disk_text # No history yet, nothing to record it in
+            self.current_revision = -1
+        elif self.version_store is not None:
+            try:
+                self.current_revision = self.version_store.commit(disk_text, "Changed on disk")
+                self.unrecorded_text = None
+                self.refresh_revision_list()
+                status += f" Saved as revision {self.current_revision}."
+            except OSError as e:
+                status += f" Warning: could not save a revision ({e})."
+
+        if self.auto_refresh_enabled:
+            self.refresh_browser()
+        self.update_status(status)
 
-        if current_section_name:
-            self.update_status(
-                f"Warning: Section '{current_section_name}' started at line {section_start_line} but no END marker found.")
+    def set_project_folder(self, folder):
+        if self.project_index is not None and same_path(self.project_index.root, folder):
+            self.refresh_project_index()
+            return
+        self.project_index = ProjectIndex(folder)
+        self.project_scanner = None # A scan of the previous folder no longer matters
+        self.refresh_project_index()
+
+    def choose_project_folder(self):
+        start = self.project_index.root if self.project_index is not None else ""
+        folder = QFileDialog.getExistingDirectory(self, "Project Folder to Search", start)
+        if folder:
+            self.project_folder_chosen = True
+            self.set_project_folder(folder)
+
+    def refresh_project_index(self):
+        """Re-scans changed files of the project folder in the background (once at a time)."""
+        if self.project_index is None or self.project_scanner is not None:
+            return
+        scanner = ProjectIndexScanner(self.project_index, self)
+        scanner.scanned.connect(lambda count: self.on_project_index_scanned(scanner, count))
+        scanner.failed.connect(lambda message: self.on_project_index_scanned(scanner, -1, message))
+        scanner.finished.connect(scanner.deleteLater)
+        self.project_scanner = scanner
+        scanner.start()
+
+    def on_project_index_scanned(self, scanner, count, error=None):
+        if scanner is not self.project_scanner:
+            return
+        self.project_scanner = None
+        if error is not None:
+            self.update_status(f"Warning: Project index scan failed: {error}")
+        elif count:
+            self.search_project(self.project_search_entry.text()) # Results may have changed
+            self.update_status(f"Project index: {count} file(s) scanned in "
+                               f"'{self.project_index.root}' ({len(self.project_index.files)} indexed).")
+
+    def search_project(self, query):
+        self.project_results_list.clear()
+        if self.project_index is None:
+            return
+        if time.monotonic() - self.project_index.refreshed_at > PROJECT_REFRESH_SECONDS:
+            self.refresh_project_index() # Picks up edited files; the results update when it is done
+        for _, relative, kind, name, line in self.project_index.search(query):
+            item = QListWidgetItem(f"{name}  [{kind}]  {relative}:{line}")
+            item.setData(Qt.ItemDataRole.UserRole, (relative, kind, name, line))
+            self.project_results_list.addItem(item)
+
+    def jump_to_first_search_result(self):
+        if self.project_results_list.count():
+            self.jump_to_search_result(self.project_results_list.item(0))
+
+    def jump_to_search_result(self, item):
+        relative, kind, name, line = item.data(Qt.ItemDataRole.UserRole)
+        path = os.path.normpath(os.path.join(self.project_index.root, relative))
+        if same_path(path, self.current_html_path) and self.file_loader is None and self.insert_job is None:
+            self.go_to_search_target(kind, name, line)
+            return
+        # Only the chosen file is loaded; the jump happens once its text is in the editor
+        self.pending_search_target = (path, kind, name, line)
+        self.path_entry.setText(path)
+        self.current_html_path = path
+        self.load_html_file()
+
+    def go_to_search_target(self, kind, name, line):
+        """Shows a section (by name) or a function definition in the loaded file."""
+        if kind == 'section':
+            matches = self.section_listbox.findItems(name, Qt.MatchFlag.MatchExactly)
+            if matches:
+                self.section_listbox.setCurrentItem(matches[0]) # Selects and highlights the block
+                return
+        else:
+            # The editor may show a newer revision than the indexed file: use the definition
+            # of that name closest to the indexed line
+            lines = self.full_html_text.toPlainText().split("\n")
+            found = [number for found_name, number in scan_function_definitions(lines) if found_name == name]
+            if found:
+                line = min(found, key=lambda number: abs(number - line))
+
+        block = self.full_html_text.document().findBlockByNumber(max(0, line - 1))
+        cursor = self.full_html_text.textCursor()
+        cursor.setPosition(block.position())
+        self.full_html_text.setTextCursor(cursor)
+        self.full_html_text.ensureCursorVisible()
+        self.update_status(f"{kind.capitalize()} '{name}' at line {line}.")
+
+    def refresh_revision_list(self):
+        self.revision_combobox.clear()
+        if self.version_store is not None:
+            for entry in reversed(self.version_store.revisions): # Newest first
+                self.revision_combobox.addItem(
+                    f"r{entry['revision']}  {entry['time'].replace('T', ' ')}  {entry['message']}", entry['revision'])
+            self.revision_combobox.setCurrentIndex(self.revision_combobox.findData(self.current_revision))
+        self.export_copy_button.setEnabled(self.version_store is not None and self.current_revision >= 0)
+
+    def checkout_revision(self, index):
+        revision = self.revision_combobox.itemData(index)
+        if self.version_store is None or revision is None or revision == self.current_revision:
+            return
+        try:
+            self.current_html_content = self.version_store.text(revision)
+        except (OSError, ValueError) as e:
+            self.update_status(f"Error reading revision {revision}: {e}")
+            self.revision_combobox.setCurrentIndex(self.revision_combobox.findData(self.current_revision))
+            return
+        self.cancel_file_load()
+        self.current_revision = revision
+        self.update_block_button.setEnabled(False)
+        self.insert_document_text(self.data_uri_folder.fold(self.current_html_content),
+                                  f"Showing revision {revision}. Updating a block saves on top of the newest revision.",
+                                  refresh=self.auto_refresh_enabled)
 
+    def export_revision_copy(self):
+        if self.version_store is None or self.current_revision < 0:
+            self.update_status("Warning: No revision to export.")
+            return
+        try:
+            export_path = self.version_store.export(self.current_revision)
+            self.update_status(f"Revision {self.current_revision} exported as '{os.path.basename(export_path)}'")
+        except (OSError, ValueError) as e:
+            self.update_status(f"Error exporting revision {self.current_revision}: {e}")
+
+    def on_document_contents_change(self, position, chars_removed, chars_added):
+        document = self.full_html_text.document()
+        first_block = document.findBlock(position)
+        last_block = document.findBlock(min(position + chars_added, document.characterCount() - 1))
+        first = first_block.blockNumber() if first_block.isValid() else 0
+        last = last_block.blockNumber() if last_block.isValid() else document.blockCount() - 1
+        # Lines added/removed by this change tell where the changed range ended before it
+        old_last = last - (document.blockCount() - self.section_index.line_count)
+        self.parse_sections(first, old_last, last)
+
+    def parse_sections(self, first=0, old_last=None, last=None):
+        """
+        Re-scans document lines first..last, which replaced lines first..old_last of the indexed
+        text (0-based; the whole document by default), and applies the result to the list.
+        """
+        document = self.full_html_text.document()
+        if old_last is None:
+            old_last = self.section_index.line_count - 1
+        if last is None:
+            last = document.blockCount() - 1
+
+        lines = []
+        block = document.findBlockByNumber(first)
+        for _ in range(last - first + 1):
+            lines.append(block.text())
+            block = block.next()
+
+        previous_warnings = self.section_index.warnings
+        if self.section_index.replace_lines(first, old_last, lines):
+            self.sections = self.section_index.sections
+            self.sync_section_list()
+        if self.section_index.warnings and self.section_index.warnings != previous_warnings:
+            self.update_status(self.section_index.warnings[-1])
+
+    def sync_section_list(self):
+        """Applies only the difference between the listed and the indexed section names, so the selection survives."""
+        listed = [self.section_listbox.item(row).text() for row in range(self.section_listbox.count())]
+        indexed = self.section_index.order
+        matcher = difflib.SequenceMatcher(a=listed, b=indexed, autojunk=False)
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                continue
+            for row in range(i2 - 1, i1 - 1, -1):
+                self.section_listbox.takeItem(row)
+            for offset, name in enumerate(indexed[j1:j2]):
+                self.section_listbox.insertItem(i1 + offset, name)
+
+    def section_content(self, section_name):
+        """Lines between a section's START and END markers (stray END markers inside are left out)."""
+        section_data = self.sections[section_name]
+        lines = []
+        line = section_data['start_line'] # 0-based number of the first line after START
+        block = self.full_html_text.document().findBlockByNumber(line)
+        while block.isValid() and line < section_data['end_line'] - 1:
+            if not self.section_index.is_marker(line):
+                lines.append(block.text())
+            block = block.next()
+            line += 1
+        return "\n".join(lines)
 
     def display_selected_section(self):
         current_extra_selections = list(self.full_html_text.extraSelections())
@@ -635,7 +1774,7 @@ class HTMLHelperApp(QMainWindow):
 
         if section_name in self.sections:
             section_data = self.sections[section_name]
-            self.code_block_text.setPlainText(section_data['content'])
+            self.code_block_text.setPlainText(self.section_content(section_name))
 
             cursor = self.full_html_text.textCursor()
             
@@ -664,7 +1803,7 @@ class HTMLHelperApp(QMainWindow):
     def copy_selected_block(self):
         selected_text = self.code_block_text.toPlainText().strip()
         if selected_text:
-            QApplication.clipboard().setText(selected_text)
+            QApplication.clipboard().setText(self.data_uri_folder.expand(selected_text))
             self.update_status("Selected code block copied to clipboard!")
         else:
             self.update_status("Warning: No code block selected or content is empty to copy.")
@@ -683,53 +1822,136 @@ class HTMLHelperApp(QMainWindow):
 
         new_block_content = self.code_block_text.toPlainText()
         old_section_data = self.sections[section_name]
-
-        lines = self.full_html_text.toPlainText().splitlines()
-        
-        new_full_content_lines = []
-        new_full_content_lines.extend(lines[:old_section_data['start_line'] - 1])
-        new_full_content_lines.append(lines[old_section_data['start_line'] - 1])
-        new_full_content_lines.extend(new_block_content.splitlines())
-        new_full_content_lines.append(lines[old_section_data['end_line'] - 1])
-        new_full_content_lines.extend(lines[old_section_data['end_line']:])
-
-        updated_html_content = "\n".join(new_full_content_lines)
-
-        base_path, ext = os.path.splitext(self.current_html_path)
-        
-        match = re.search(r'(-\d+)$', base_path)
-        if match:
-            num = int(match.group(1)[1:])
-            new_num = num + 1
-            new_base_name = base_path[:match.start()]
-        else:
-            new_num = 1
-            new_base_name = base_path
-
-        new_file_name = f"{new_base_name}-{new_num}{ext}"
+        previous_content = self.full_html_text.toPlainText() # Folded, like browser_content
+        reload_context = self.section_reload_context(old_section_data, new_block_content)
+        old_section_text = self.section_text(old_section_data) # START through END, as the page has it
+
+        # Replace only the lines between the START and END lines, in place: the section index
+        # then re-scans just this range instead of the whole document
+        document = self.full_html_text.document()
+        start_block = document.findBlockByNumber(old_section_data['start_line'] - 1)
+        end_block = document.findBlockByNumber(old_section_data['end_line'] - 1)
+        cursor = QTextCursor(document)
+        cursor.setPosition(start_block.position() + start_block.length() - 1) # End of the START line
+        cursor.setPosition(end_block.position() - 1, QTextCursor.MoveMode.KeepAnchor) # Up to the line break before END
+        cursor.beginEditBlock()
+        cursor.insertText("".join("\n" + line for line in new_block_content.splitlines()))
+        cursor.endEditBlock()
+        new_section_text = self.section_text(self.sections.get(section_name, old_section_data))
+
+        folded_content = self.full_html_text.toPlainText()
+        updated_html_content = self.data_uri_folder.expand(folded_content) # What gets saved
+
+        if self.version_store is None:
+            self.update_status("Error: Version history is unavailable for this file, the update was not saved.")
+            return
 
         try:
-            with open(new_file_name, 'w', encoding='utf-8') as f:
-                f.write(updated_html_content)
+            # The history folder is only created by the first update, opening a file writes nothing
+            if self.unrecorded_text is not None:
+                record_base_revision(self.version_store, self.unrecorded_text)
+                self.unrecorded_text = None
+            # Stored as a compressed line delta next to the base file instead of a full numbered copy
+            revision = self.version_store.commit(updated_html_content, f"Update '{section_name}'")
 
-            self.full_html_text.setPlainText(updated_html_content)
-            
             self.current_html_content = updated_html_content
-            self.current_html_path = new_file_name
-            self.path_entry.setText(new_file_name)
-
-            self.parse_sections() 
+            self.current_revision = revision
+            self.refresh_revision_list()
 
             if self.auto_refresh_enabled:
-                self.refresh_browser()
+                # Hot reload only while the page shows exactly the text this update started from
+                if (self.hot_reload_enabled and reload_context is not None
+                        and self.browser_content == previous_content):
+                    self.hot_reload_section(section_name, reload_context, old_section_text,
+                                            new_section_text, new_block_content, folded_content)
+                else:
+                    self.refresh_browser()
 
-            self.update_status(f"File updated and saved as '{os.path.basename(new_file_name)}'")
+            self.update_status(f"Block '{section_name}' saved as revision {revision} "
+                               f"({self.version_store.revisions[revision]['size']} bytes stored)")
 
         except Exception as e:
             self.update_status(f"Error saving updated file: {e}")
 
+    def section_text(self, section_data):
+        """Lines of a section from its START line through its END line."""
+        lines = []
+        block = self.full_html_text.document().findBlockByNumber(section_data['start_line'] - 1)
+        for _ in range(section_data['end_line'] - section_data['start_line'] + 1):
+            lines.append(block.text())
+            block = block.next()
+        return "\n".join(lines)
+
+    def section_reload_context(self, section_data, new_block_content):
+        """
+        'script' or 'style' when a section (before and after the update) lies inside a single
+        classic <script> or <style> element and so can be hot reloaded, else None.
+        """
+        document = self.full_html_text.document()
+        start_block = document.findBlockByNumber(section_data['start_line'] - 1)
+        end_block = document.findBlockByNumber(section_data['end_line'] - 1)
+        state = block_start_state(start_block)
+        if state not in (STATE_SCRIPT, STATE_STYLE) or block_start_state(end_block) != state:
+            return None
+        # The section must not close or open an element itself
+        tag = "script" if state == STATE_SCRIPT else "style"
+        for text in (self.section_text(section_data), new_block_content):
+            lowered = text.lower()
+            if f"<{tag}" in lowered or f"</{tag}" in lowered:
+                return None
+        if state == STATE_STYLE:
+            return 'style'
+
+        # Walk back to the line that opened the <script> and check that it is a classic script
+        opener = start_block
+        while opener.isValid() and block_start_state(opener) == STATE_SCRIPT:
+            opener = opener.previous()
+        open_tags = SCRIPT_OPEN_TAG_PATTERN.findall(opener.text()) if opener.isValid() else []
+        if not open_tags:
+            return None
+        type_match = SCRIPT_TYPE_PATTERN.search(open_tags[-1])
+        if type_match and "javascript" not in type_match.group(1).lower():
+            return None # Modules (own scope), templates, JSON data, ...
+
+        # Lines indented like the START marker are the section's top level
+        marker_line = start_block.text()
+        indent = marker_line[:len(marker_line) - len(marker_line.lstrip())]
+        functions = hot_reloadable_functions(new_block_content, indent)
+        if functions is None:
+            return None
+        # A function handed over by reference elsewhere (a listener, a timer callback) keeps
+        # running its old version; calls by name and the section's own assignments get the new one
+        if functions:
+            lines = self.full_html_text.toPlainText().split("\n")
+            outside = "\n".join(lines[:section_data['start_line'] - 1] + lines[section_data['end_line']:])
+            for name, own_statement in functions:
+                others = "\n".join(statement for _, statement in functions if statement is not own_statement)
+                if referenced_by_value(name, outside + "\n" + others):
+                    return None
+        return 'script'
+
+    def hot_reload_section(self, section_name, reload_context, old_section_text, new_section_text,
+                           new_block_content, folded_content):
+        """Sends one updated section into the running page; a failed attempt falls back to a full reload."""
+        expand = self.data_uri_folder.expand
+        if reload_context == 'script':
+            script = HOT_RELOAD_SCRIPT_JS % json.dumps(expand(new_block_content))
+        else:
+            script = HOT_RELOAD_STYLE_JS % (json.dumps(expand(old_section_text)), json.dumps(expand(new_section_text)))
+
+        def on_result(result):
+            if result == "ok":
+                self.update_status(f"Hot reloaded section '{section_name}' ({reload_context}).")
+            else:
+                self.refresh_browser()
+                self.update_status(f"Hot reload of '{section_name}' failed ({result}), page fully reloaded.")
+
+        self.browser_content = folded_content # What the page will show once the script ran
+        self.browser_view.page().runJavaScript(script, on_result)
+
     def refresh_browser(self):
-        current_content_for_browser = self.full_html_text.toPlainText()
+        self.browser_content = self.full_html_text.toPlainText()
+        current_content_for_browser = self.data_uri_folder.expand(self.browser_content)
 
         if current_content_for_browser:
             base_url = QUrl.fromLocalFile(os.path.dirname(self.current_html_path) + os.sep)
@@ -739,8 +1961,83 @@ class HTMLHelperApp(QMainWindow):
             self.browser_view.setHtml("<h1>No HTML Loaded</h1><p>Load an HTML file to preview it here.</p>")
             self.update_status("Browser content cleared (no file loaded).")
 
+# --- Highlighter Benchmark ---
+def make_benchmark_html(target_bytes=4 * 1024 * 1024, seed_path=None):
+    """Builds a multi-megabyte HTML string by repeating seed_path (or a built-in sample with a base64 image)."""
+    if seed_path:
+        with open(seed_path, 'r', encoding='utf-8') as f:
+            seed = f.read()
+    else:
+        seed = "\n".join([
+            '<!DOCTYPE html>',
+            '<!-- Benchmark page -->',
+            '<div class="window" id="main" style="left: 10px; top: 20px;">',
+            '  <p title=\'tip\'>Caf&eacute; &amp; r&#233;sum&eacute;</p><br/>',
+            '  <img alt="icon" src="data:image/png;base64,' + "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ" * 200 + '">',
+            '  <style>.window { border: 2px solid #000; }</style>',
+            '  <script>window.onload = function () { start("win95"); };</script>',
+            '</div>',
+        ])
+    return (seed + "\n") * max(1, target_bytes // (len(seed) + 1))
+
+def benchmark_highlighter(seed_path=None, target_bytes=4 * 1024 * 1024):
+    """
+    Times tokenizing and fully highlighting a multi-megabyte HTML document with the combined
+    pattern, against the old approach of compiling every rule's QRegularExpression per block.
+    Run with: python html5.py --benchmark [file.html]
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # No window is shown
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    html = make_benchmark_html(target_bytes, seed_path)
+    lines = html.splitlines()
+    print(f"Benchmark document: {len(html) / 2**20:.1f} MB, {len(lines)} lines")
+
+    start = time.perf_counter()
+    token_count, state = 0, STATE_NORMAL
+    for line in lines:
+        tokens, state = tokenize_html_line(line, state)
+        token_count += len(tokens)
+    print(f"Tokenize (combined pattern): {time.perf_counter() - start:.2f}s, {token_count} tokens")
+
+    start = time.perf_counter()
+    legacy_count = 0
+    for line in lines:
+        for _, pattern_str, _ in HTML_HIGHLIGHT_RULES:
+            it = QRegularExpression(pattern_str).globalMatch(line) # Old behaviour: compile per rule per block
+            while it.hasNext():
+                it.next()
+                legacy_count += 1
+    print(f"Tokenize (per-block QRegularExpression per rule): {time.perf_counter() - start:.2f}s, {legacy_count} matches")
+
+    document = QTextDocument()
+    document.setPlainText(html)
+    start = time.perf_counter()
+    highlighter = HtmlHighlighter(document)
+    highlighter.set_theme_colors("dark") # Highlights the whole document
+    print(f"Full highlight: {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    highlighter.set_theme_colors("light")
+    print(f"Theme switch: {time.perf_counter() - start:.2f}s")
+
+    # Viewport-lazy: only the blocks around the viewport are formatted before control returns
+    editor = QTextEdit()
+    editor.resize(800, 600)
+    lazy_highlighter = HtmlHighlighter(editor.document())
+    lazy_highlighter.attach_view(editor)
+    start = time.perf_counter()
+    editor.setPlainText(html)
+    lazy_highlighter.highlight_viewport()
+    print(f"Lazy load (viewport only): {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    lazy_highlighter.set_theme_colors("light")
+    print(f"Lazy theme switch (viewport only): {time.perf_counter() - start:.2f}s")
+    return 0
+
 # --- Main Application Execution ---
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        sys.exit(benchmark_highlighter(sys.argv[2] if len(sys.argv) > 2 else None))
+
     app = QApplication(sys.argv)
     window = HTMLHelperApp()
     window.show()
@@ -3,17 +3,19 @@ from tkinter import filedialog, messagebox, PhotoImage, ttk
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import cv2
 import numpy as np
-import seam_carving as sc
+from seamcarve import get_seam_carver, SeamCarvingCancelled
+from displaycache import DisplayPyramid, RESIZE_THROTTLE_MS
 import sys
 import subprocess
 import os # Import os module for path manipulation
+import threading
+import queue
 
 # --- Package Installation Check ---
 REQUIRED_PACKAGES_MAP = {
     "opencv-python": "cv2",
     "numpy": "numpy",
-    "Pillow": "PIL",
-    "seam_carving": "seam_carving"
+    "Pillow": "PIL"
 }
 
 def check_and_install_packages(packages_map):
@@ -52,21 +54,14 @@ def check_and_install_packages(packages_map):
         return True
 
 # --- Seam Carving Logic ---
-def perform_seam_carving(image_np, target_width, target_height):
-    current_height, current_width, _ = image_np.shape
-
-    # Apply width adjustment
-    if target_width != current_width:
-        print(f"Seam Carving: Adjusting width from {current_width} to {target_width}...")
-        image_np = sc.resize(image_np, size=(target_width, current_height), energy_mode="backward", order="width-first")
-        current_height, current_width, _ = image_np.shape
+RESIZE_POLL_MS = 50 # How often the Tk thread checks on the background resize
 
-    # Apply height adjustment
-    if target_height != current_height:
-        print(f"Seam Carving: Adjusting height from {current_height} to {target_height}...")
-        image_np = sc.resize(image_np, size=(target_width, target_height), energy_mode="backward", order="height-first")
-    
-    return image_np
+def perform_seam_carving(image_np, target_width, target_height, progress_callback=None, cancel_event=None):
+    # The seam order of each image is computed once and cached (see seamcarve.SeamCarver),
+    # so trying another target size only costs a mask-and-compact
+    current_height, current_width, _ = image_np.shape
+    print(f"Seam Carving: {current_width}x{current_height} -> {target_width}x{target_height}...")
+    return get_seam_carver(image_np).resize(target_width, target_height, progress_callback, cancel_event)
 
 class ImageResizerApp:
     def __init__(self, master):
@@ -76,6 +71,9 @@ class ImageResizerApp:
         self.original_image_pil = None
         self.display_image_pil = None
         self.original_image_np = None
+        self.display_pyramid = None # Mip pyramid of the image currently on the canvas
+        self.resize_after_id = None # Pending throttled redraw after a <Configure> event
+        self.resize_job = None # State of the running background resize (see apply_resize)
 
         self.width_trace_id = None
         self.height_trace_id = None
@@ -127,6 +125,16 @@ class ImageResizerApp:
         self.apply_button.grid(row=5, column=0, columnspan=2, pady=10)
         self.apply_button.config(state=tk.DISABLED)
 
+        self.cancel_button = ttk.Button(control_frame, text="Cancel", command=self.cancel_resize)
+        self.cancel_button.grid(row=5, column=2, pady=10, padx=10)
+        self.cancel_button.config(state=tk.DISABLED)
+
+        # Seam-by-seam progress of the background resize
+        self.progress_bar = ttk.Progressbar(control_frame, orient=tk.HORIZONTAL, length=200, mode="determinate")
+        self.progress_bar.grid(row=6, column=0, columnspan=3, sticky=tk.W + tk.E, pady=2)
+        self.status_label = ttk.Label(control_frame, text="")
+        self.status_label.grid(row=7, column=0, columnspan=4, sticky=tk.W, pady=2)
+
         info_frame = ttk.LabelFrame(self.master, text="Image Info", padding="10")
         info_frame.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
 
@@ -153,6 +161,7 @@ class ImageResizerApp:
     def load_image(self):
         file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png *.jpg *.jpeg *.gif *.bmp")])
         if file_path:
+            self.cancel_resize() # A running resize belongs to the previous image
             try:
                 self.original_image_pil = Image.open(file_path).convert("RGB")
                 self.original_image_np = np.array(self.original_image_pil)
@@ -216,23 +225,11 @@ class ImageResizerApp:
                     canvas_width = 800
                     canvas_height = 600
 
-            img_width, img_height = pil_image.size
-            
-            img_aspect = img_width / img_height
-            canvas_aspect = canvas_width / canvas_height
-
-            if img_aspect > canvas_aspect:
-                new_width = canvas_width
-                new_height = int(new_width / img_aspect)
-            else:
-                new_height = canvas_height
-                new_width = int(new_height * img_aspect)
-
-            if new_width < 10 or new_height < 10:
-                new_width, new_height = img_width, img_height
-
             try:
-                display_img_resized = pil_image.resize((max(1, new_width), max(1, new_height)), Image.LANCZOS)
+                # Fit from the nearest level of the cached pyramid instead of re-scaling the full image
+                if self.display_pyramid is None or self.display_pyramid.source is not pil_image:
+                    self.display_pyramid = DisplayPyramid(pil_image)
+                display_img_resized = self.display_pyramid.fit(canvas_width, canvas_height)
                 self.display_image_tk = ImageTk.PhotoImage(display_img_resized)
                 
                 if self.canvas_image_id:
@@ -380,53 +377,126 @@ class ImageResizerApp:
 
 
     def apply_resize(self):
+        """
+        Starts the resize on a background thread so the window stays responsive. Seam carving
+        reports seam-by-seam progress, which the Tk thread picks up with after() polling.
+        Applying again while a resize runs cancels it; seams already computed are kept by the
+        cached seam carver, so shrinking further continues from where the last run stopped.
+        """
         if self.original_image_np is None:
             messagebox.showwarning("No Image", "Please load an image first.")
             return
 
-        target_width = self.width_var.get()
-        target_height = self.height_var.get()
+        try:
+            target_width = self.width_var.get()
+            target_height = self.height_var.get()
+        except tk.TclError:
+            messagebox.showerror("Invalid Dimensions", "Width and Height must be positive integers.")
+            return
 
         if target_width <= 0 or target_height <= 0:
             messagebox.showerror("Invalid Dimensions", "Width and Height must be positive integers.")
             return
 
-        try:
-            processed_image_np = None
+        if self.preserve_total_pixels.get():
+            mode = 'preserve'
+        elif self.maintain_aspect_ratio.get():
+            mode = 'aspect'
+        else:
+            mode = 'direct'
 
-            if self.preserve_total_pixels.get():
-                print(f"Applying 'Preserve Total Pixels' mode. Target W:{target_width}, Target H:{target_height}")
-                
-                processed_image_np = perform_seam_carving(self.original_image_np, target_width, target_height)
-                
-                if processed_image_np.shape[0] < target_height:
-                    print(f"Adding white padding from {processed_image_np.shape[0]} to {target_height}")
-                    padded_img_np = np.full((target_height, target_width, 3), 255, dtype=np.uint8)
-                    padded_img_np[0:processed_image_np.shape[0], 0:processed_image_np.shape[1]] = processed_image_np
-                    processed_image_np = padded_img_np
-                
-                self.width_var.set(processed_image_np.shape[1])
-                self.height_var.set(processed_image_np.shape[0])
+        self.cancel_resize()
+        job = {"cancel": threading.Event(), "progress": (0, 0), "results": queue.Queue(maxsize=1)}
+        self.resize_job = job
 
-            elif self.maintain_aspect_ratio.get():
-                print(f"Applying 'Maintain Aspect Ratio' mode. Target W:{target_width}, Target H:{target_height}")
-                processed_image_np = np.array(self.original_image_pil.resize((target_width, target_height), Image.LANCZOS))
-            
-            else:
-                print(f"Applying Direct Resize mode. Target W:{target_width}, Target H:{target_height}")
-                processed_image_np = perform_seam_carving(self.original_image_np, target_width, target_height)
+        def report_progress(done, total):
+            job["progress"] = (done, total) # Read by _poll_resize_job on the Tk thread
 
-            self.display_image_pil = Image.fromarray(processed_image_np)
-            self.display_image(self.display_image_pil)
-            self.save_button.config(state=tk.NORMAL) # Enable save button after successful resize
-            messagebox.showinfo("Resize Complete", f"Image resized to {self.display_image_pil.width}x{self.display_image_pil.height} pixels.")
+        def worker():
+            try:
+                result = self._resize_worker(mode, target_width, target_height, report_progress, job["cancel"])
+                job["results"].put((result, None))
+            except Exception as e:
+                job["results"].put((None, e))
+
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(value=0, maximum=1)
+        self.status_label.config(text=f"Resizing to {target_width}x{target_height}...")
+        threading.Thread(target=worker, name="ResizeWorker", daemon=True).start()
+        self.master.after(RESIZE_POLL_MS, self._poll_resize_job, job)
+
+    def _resize_worker(self, mode, target_width, target_height, progress_callback, cancel_event):
+        """Runs on the resize thread: no Tk calls here, only NumPy / Pillow / seam carving."""
+        if mode == 'preserve':
+            print(f"Applying 'Preserve Total Pixels' mode. Target W:{target_width}, Target H:{target_height}")
+
+            processed_image_np = perform_seam_carving(self.original_image_np, target_width, target_height,
+                                                      progress_callback, cancel_event)
+
+            if processed_image_np.shape[0] < target_height:
+                print(f"Adding white padding from {processed_image_np.shape[0]} to {target_height}")
+                padded_img_np = np.full((target_height, target_width, 3), 255, dtype=np.uint8)
+                padded_img_np[0:processed_image_np.shape[0], 0:processed_image_np.shape[1]] = processed_image_np
+                processed_image_np = padded_img_np
+            return processed_image_np
+
+        if mode == 'aspect':
+            print(f"Applying 'Maintain Aspect Ratio' mode. Target W:{target_width}, Target H:{target_height}")
+            return np.array(self.original_image_pil.resize((target_width, target_height), Image.LANCZOS))
+
+        print(f"Applying Direct Resize mode. Target W:{target_width}, Target H:{target_height}")
+        return perform_seam_carving(self.original_image_np, target_width, target_height, progress_callback, cancel_event)
+
+    def _poll_resize_job(self, job):
+        if job is not self.resize_job:
+            return # Superseded by a newer resize
+        done, total = job["progress"]
+        if total:
+            self.progress_bar.config(value=done, maximum=total)
+            self.status_label.config(text=f"Seam carving: {done}/{total} seams")
+        try:
+            processed_image_np, error = job["results"].get_nowait()
+        except queue.Empty:
+            self.master.after(RESIZE_POLL_MS, self._poll_resize_job, job)
+            return
 
-        except Exception as e:
-            messagebox.showerror("Resize Error", f"An error occurred during resize: {e}")
+        self.resize_job = None
+        self.cancel_button.config(state=tk.DISABLED)
+        if isinstance(error, SeamCarvingCancelled):
+            self.progress_bar.config(value=0)
+            self.status_label.config(text="Resize cancelled (computed seams are kept for the next resize).")
+            return
+        if error is not None:
+            self.status_label.config(text="Resize failed.")
+            messagebox.showerror("Resize Error", f"An error occurred during resize: {error}")
             import traceback
-            traceback.print_exc()
+            traceback.print_exception(type(error), error, error.__traceback__)
+            return
+
+        self.display_image_pil = Image.fromarray(processed_image_np)
+        self.display_image(self.display_image_pil)
+        if self.preserve_total_pixels.get():
+            self.width_var.set(processed_image_np.shape[1])
+            self.height_var.set(processed_image_np.shape[0])
+        self.save_button.config(state=tk.NORMAL) # Enable save button after successful resize
+        self.progress_bar.config(value=self.progress_bar.cget("maximum"))
+        self.status_label.config(text=f"Image resized to {self.display_image_pil.width}x{self.display_image_pil.height} pixels.")
+
+    def cancel_resize(self):
+        """Asks the running resize to stop after the current seam."""
+        if self.resize_job is not None:
+            self.resize_job["cancel"].set()
+            self.resize_job = None
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_label.config(text="Resize cancelled (computed seams are kept for the next resize).")
 
     def on_canvas_resize(self, event):
+        # Throttled: while the window edge is dragged, redraw at most once per RESIZE_THROTTLE_MS
+        if self.resize_after_id is None:
+            self.resize_after_id = self.master.after(RESIZE_THROTTLE_MS, self._redraw_after_resize)
+
+    def _redraw_after_resize(self):
+        self.resize_after_id = None
         if self.display_image_pil:
             self.display_image(self.display_image_pil)
 
@@ -1,13 +1,29 @@
-import tkinter as tk
-from tkinter import filedialog, ttk, messagebox
-from PIL import Image, ImageTk
+try:
+    import tkinter as tk
+    from tkinter import filedialog, ttk, messagebox
+    from PIL import ImageTk
+except ImportError: # Headless server without Tk: only the batch command line is available
+    tk = None
+from PIL import Image
 import numpy as np
-import cv2 # Required for seam_carving
-import seam_carving as sc
+import cv2 # Required for seam carving energy (seamcarve.py)
+from seamcarve import get_seam_carver
+from displaycache import DisplayPyramid, RESIZE_THROTTLE_MS
 import sys
 import subprocess
 import os
 import traceback
+import threading
+import queue
+import glob
+import io
+import zlib
+import struct
+import argparse
+import contextlib
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 # from scipy.ndimage import shift # REMOVED: Reverting from scipy.ndimage.shift for offset due to misunderstanding of its "wrap" mode for this specific use case.
 
 # --- Package Installation Check ---
@@ -15,7 +31,6 @@ REQUIRED_PACKAGES_MAP = {
     "opencv-python": "cv2",
     "numpy": "numpy",
     "Pillow": "PIL",
-    "seam_carving": "seam_carving",
     # "scipy": "scipy" # Removed from required packages for now, unless needed elsewhere
 }
 
@@ -66,28 +81,238 @@ def check_and_install_packages(packages_map):
         return True
 
 # --- Seam Carving Logic ---
-def perform_seam_carving(image_np, target_width, target_height):
+def perform_seam_carving(image_np, target_width, target_height, exact=True):
     """
     Performs seam carving to resize the image while attempting to preserve content.
+    The seam order of each image is computed once and cached (see seamcarve.SeamCarver),
+    so nudging the target size only costs a mask-and-compact. exact=False (previews) also
+    reuses one height order for every width instead of searching it again per width.
     """
     current_height, current_width, _ = image_np.shape
-
-    if target_width != current_width:
-        print(f"Seam Carving: Adjusting width from {current_width} to {target_width}...")
-        image_np = sc.resize(image_np, size=(target_width, current_height), energy_mode="backward", order="width-first")
-        current_height, current_width, _ = image_np.shape # Update dimensions after width resize
-
-    if target_height != current_height:
-        print(f"Seam Carving: Adjusting height from {current_height} to {target_height}...")
-        image_np = sc.resize(image_np, size=(target_width, target_height), energy_mode="backward", order="height-first")
-    
-    return image_np
+    print(f"Seam Carving: {current_width}x{current_height} -> {target_width}x{target_height}...")
+    return get_seam_carver(image_np).resize(target_width, target_height, exact=exact)
 
 # --- Pixel Wrapping Logic ---
-def pixel_wrap_image(image_np, target_width):
+# --- Pixel Stream Orders ---
+# How the 2D image is walked when it is flattened into a 1D stream (and filled again when re-wrapped)
+STREAM_ORDERS = ('row', 'serpentine', 'column', 'hilbert', 'z-order')
+STREAM_ORDER_CACHE_SIZE = 4 # Permutations kept per cache (one per grid size); a 24 MP one takes ~96 MB
+
+HILBERT_LUT_BITS = 4 # Curve levels resolved per table lookup when computing Hilbert keys
+
+def _interleave_bits(values, bits):
+    """Spreads the low `bits` bits of values so a zero bit sits between each of them (for Z-order keys)."""
+    spread = np.zeros_like(values)
+    for bit in range(bits):
+        spread |= ((values >> bit) & 1) << (2 * bit)
+    return spread
+
+@lru_cache(maxsize=1)
+def _hilbert_lookup_table(levels):
+    """
+    State machine for the Hilbert curve, `levels` bits of x and y at a time. The state is the
+    (swap, complement) orientation accumulated by the levels above; for every state and pair of
+    x/y bit chunks the table holds the curve key chunk and the orientation for the next chunk.
+    """
+    size = 1 << levels
+    keys = np.zeros((4, size, size), dtype=np.uint32)
+    states = np.zeros((4, size, size), dtype=np.uint8)
+    for state in range(4):
+        for chunk_x in range(size):
+            for chunk_y in range(size):
+                swap, complement = state >> 1, state & 1
+                key = 0
+                for level in range(levels - 1, -1, -1):
+                    bit_x, bit_y = (chunk_x >> level) & 1, (chunk_y >> level) & 1
+                    if swap:
+                        bit_x, bit_y = bit_y, bit_x
+                    rx, ry = bit_x ^ complement, bit_y ^ complement
+                    key = (key << 2) | ((3 * rx) ^ ry)
+                    if ry == 0: # Lower-left/right quadrants are walked transposed (and mirrored)
+                        complement ^= rx
+                        swap ^= 1
+                keys[state, chunk_x, chunk_y] = key
+                states[state, chunk_x, chunk_y] = (swap << 1) | complement
+    return keys.ravel(), states.ravel()
+
+def _hilbert_grid_keys(height, width, bits):
+    """Hilbert curve distance of every pixel of a height x width grid (row-major), on a 2**bits square."""
+    levels = HILBERT_LUT_BITS
+    lut_keys, lut_states = _hilbert_lookup_table(levels)
+    bits = -(-bits // levels) * levels
+    keys = np.zeros((height, width), dtype=np.uint32 if 2 * bits <= 32 else np.uint64)
+    state = np.zeros((height, width), dtype=np.intp)
+    columns, rows = np.arange(width), np.arange(height)
+    mask = (1 << levels) - 1
+    for shift in range(bits - levels, -1, -levels):
+        # x only depends on the column and y on the row, so the chunks broadcast
+        lookup = (state << (2 * levels)) + ((columns >> shift) & mask)[None, :] * (1 << levels) \
+                 + ((rows >> shift) & mask)[:, None]
+        keys <<= 2 * levels
+        keys |= lut_keys[lookup]
+        state = lut_states[lookup].astype(np.intp)
+    return keys.ravel()
+
+def _stream_index_dtype(pixel_count):
+    """int32 indices halve the cache memory whenever the pixel count allows it."""
+    return np.int32 if pixel_count < 2 ** 31 else np.intp
+
+@lru_cache(maxsize=STREAM_ORDER_CACHE_SIZE)
+def stream_order_index(height, width, order):
+    """
+    Returns the (read-only, cached) permutation that walks a height x width grid in the given
+    stream order: element k is the row-major flat index of the k-th pixel of the stream.
+    Curves that need a power-of-two square (hilbert, z-order) are computed on the enclosing
+    square and the cells outside the grid are skipped.
+    The cache is keyed by grid size: flattening the same image again is a cache hit, but
+    every new wrap width is a new grid, so previews use stream_positions instead.
+    """
+    if order not in STREAM_ORDERS:
+        raise ValueError(f"Unknown stream order '{order}', expected one of {', '.join(STREAM_ORDERS)}")
+    if order == 'row':
+        index = np.arange(height * width, dtype=np.intp)
+    elif order == 'serpentine':
+        index = np.arange(height * width, dtype=np.intp).reshape(height, width)
+        index[1::2] = index[1::2, ::-1] # Every other row runs right to left
+        index = index.ravel()
+    elif order == 'column':
+        index = np.arange(height * width, dtype=np.intp).reshape(height, width).T.ravel()
+    else:
+        bits = max(1, int(np.ceil(np.log2(max(height, width)))))
+        if order == 'hilbert':
+            keys = _hilbert_grid_keys(height, width, bits)
+        else:
+            keys = (_interleave_bits(np.arange(width, dtype=np.uint64), bits)[None, :]
+                    | (_interleave_bits(np.arange(height, dtype=np.uint64), bits) << np.uint64(1))[:, None]).ravel()
+        index = np.argsort(keys) # Keys are unique, so no stable sort is needed
+    index = index.astype(_stream_index_dtype(height * width), copy=False)
+    index.flags.writeable = False
+    return index
+
+@lru_cache(maxsize=STREAM_ORDER_CACHE_SIZE)
+def stream_order_inverse(height, width, order):
+    """Cached inverse of stream_order_index: row-major flat index -> position in the stream."""
+    index = stream_order_index(height, width, order)
+    inverse = np.empty_like(index)
+    inverse[index] = np.arange(index.size, dtype=index.dtype)
+    inverse.flags.writeable = False
+    return inverse
+
+@lru_cache(maxsize=2)
+def _curve_quarter_tables(order):
+    """
+    One level of the Hilbert or Z-order curve as flat lookup tables, indexed by
+    state * 4 + x bit * 2 + y bit: the digit (how many quarters of the square the curve
+    visits before the pixel's quarter), the next state * 4, and earlier[x half, y half],
+    which is 1 where that quarter is one of the quarters visited before.
+    """
+    if order == 'hilbert':
+        digits, next_states = (table.reshape(4, 2, 2).astype(np.intp) for table in _hilbert_lookup_table(1))
+    else: # z-order: the x bit is the low bit of every key digit, the y bit the high one
+        digits = np.array([[[0, 2], [1, 3]]], dtype=np.intp)
+        next_states = np.zeros((1, 2, 2), dtype=np.intp)
+    earlier = np.zeros((2, 2, digits.size), dtype=np.int64)
+    for state in range(len(digits)):
+        for bit_x in (0, 1):
+            for bit_y in (0, 1):
+                earlier[bit_x, bit_y, state * 4:state * 4 + 4] = digits[state, bit_x, bit_y] < digits[state].ravel()
+    return digits.ravel(), next_states.ravel() * 4, earlier
+
+def stream_positions(height, width, order, rows, columns):
+    """
+    Stream position of the pixels (rows[i], columns[j]) of a height x width grid walked in
+    `order`, as a (len(rows), len(columns)) int64 array, without building the grid's
+    permutation. On the Hilbert and Z-order curves the position is the number of grid cells
+    the curve visits first, counted quarter by quarter down the levels, so the cost only
+    depends on how many pixels are asked for (e.g. a decimated preview).
+    """
+    rows = np.asarray(rows, dtype=np.int64)[:, None]
+    columns = np.asarray(columns, dtype=np.int64)[None, :]
+    if order == 'row':
+        return rows * width + columns
+    if order == 'serpentine':
+        return rows * width + np.where(rows % 2 == 1, width - 1 - columns, columns)
+    if order == 'column':
+        return columns * height + rows
+    if order not in STREAM_ORDERS:
+        raise ValueError(f"Unknown stream order '{order}', expected one of {', '.join(STREAM_ORDERS)}")
+
+    digits, next_states, earlier_quarters = _curve_quarter_tables(order)
+    bits = max(1, int(np.ceil(np.log2(max(height, width)))))
+    if order == 'hilbert':
+        bits = -(-bits // HILBERT_LUT_BITS) * HILBERT_LUT_BITS # Same enclosing square as _hilbert_grid_keys
+    shape = (rows.shape[0], columns.shape[1])
+    positions = np.zeros(shape, dtype=np.int64)
+    state = np.zeros(shape, dtype=np.intp) # Curve state * 4, the row offset into the flat tables
+    for shift in range(bits - 1, -1, -1):
+        size, block_size = 1 << shift, 2 << shift
+        lookup = state + (((columns >> shift) & 1) << 1) + ((rows >> shift) & 1) # Flat [state, x bit, y bit]
+        digit = digits.take(lookup)
+        positions += digit * (size * size) # The quarters walked first, if they lie inside the grid
+
+        # Only squares that cross the right or bottom edge of the grid hold quarters that are
+        # partly outside it; count the grid cells of their quarters one by one
+        origin_x, origin_y = columns // block_size * block_size, rows // block_size * block_size
+        grid_columns = [np.clip(width - origin_x - half * size, 0, size) for half in (0, 1)]
+        grid_rows = [np.clip(height - origin_y - half * size, 0, size) for half in (0, 1)]
+        edge_rows = rows[:, 0] >= height // block_size * block_size
+        edge_columns = columns[0] >= width // block_size * block_size
+        for row_mask, column_mask in ((edge_rows, np.ones_like(edge_columns)), (~edge_rows, edge_columns)):
+            if not (row_mask.any() and column_mask.any()):
+                continue
+            block = np.ix_(row_mask, column_mask)
+            block_lookup = lookup[block]
+            correction = -digits.take(block_lookup) * (size * size)
+            for half_y in (0, 1):
+                counts = sum(earlier_quarters[half_x, half_y].take(block_lookup) * grid_columns[half_x][:, column_mask]
+                             for half_x in (0, 1))
+                correction += counts * grid_rows[half_y][row_mask]
+            positions[block] += correction
+        state = next_states.take(lookup)
+    return positions
+
+def decimated_pixel_wrap(stream_np, total_pixels, target_width, step, order='row'):
+    """
+    What pixel_wrap_image(...)[::step, ::step] would be, gathered straight from a (N, C) pixel
+    stream whose first total_pixels entries are the image. Only the sampled pixels' stream
+    positions are computed (stream_positions), so no full-size wrap or permutation is built;
+    positions past the image are white padding.
+    """
+    height = -(-total_pixels // target_width)
+    positions = stream_positions(height, target_width, order,
+                                 np.arange(0, height, step), np.arange(0, target_width, step))
+    padding = positions >= total_pixels
+    sampled = stream_np.take(np.minimum(positions, total_pixels - 1), axis=0)
+    sampled[padding] = 255
+    return sampled
+
+def flatten_stream(image_np, order='row'):
+    """Flattens a (H, W, C) image into a (H*W, C) pixel stream walked in `order` (a view for 'row')."""
+    height, width, channels = image_np.shape
+    pixels = image_np.reshape(-1, channels)
+    if order == 'row':
+        return pixels
+    return pixels.take(stream_order_index(height, width, order), axis=0)
+
+def unflatten_stream(stream_np, height, width, order='row'):
+    """
+    Fills a height x width grid from a (height*width, C) pixel stream walked in `order`.
+    Other orders than 'row' use the cached inverse permutation of this grid size, which is
+    built (full size) the first time a size is seen; see decimated_pixel_wrap for previews.
+    """
+    channels = stream_np.shape[-1]
+    if order != 'row':
+        stream_np = stream_np.take(stream_order_inverse(height, width, order), axis=0)
+    return stream_np.reshape((height, width, channels))
+
+def pixel_wrap_image(image_np, target_width, order='row'):
     """
     Reshapes a 2D image into a 1D pixel stream and then wraps it into a new 2D image
     of the specified target_width, padding with white if necessary.
+    `order` is the stream order (see STREAM_ORDERS) used both to flatten the image
+    and to fill the new one; the white padding always lands at the end of the stream.
+    In 'row' order, when the pixel count divides evenly by target_width, the result
+    is a zero-copy view of image_np, so treat it as read-only.
     """
     if target_width <= 0:
         raise ValueError("Target width must be greater than 0 for pixel wrapping.")
@@ -95,28 +320,66 @@ def pixel_wrap_image(image_np, target_width):
     original_height, original_width, channels = image_np.shape
     total_pixels = original_height * original_width
 
-    flattened_pixels = image_np.reshape(-1, channels) # Convert 2D to 1D stream
+    flattened_pixels = flatten_stream(image_np, order) # Convert 2D to 1D stream (a view for contiguous row order)
 
     # Calculate new height based on target width
-    new_height = int(np.ceil(total_pixels / target_width))
+    full_rows, remainder = divmod(total_pixels, target_width)
+    new_height = full_rows + (1 if remainder else 0)
 
     print(f"Pixel Wrapping: Original total pixels: {total_pixels}")
     print(f"Pixel Wrapping: New dimensions: {target_width}x{new_height}")
 
-    # Create a new NumPy array for the wrapped image, initialized to white (255)
-    # This automatically handles padding if total_pixels is not a perfect multiple
-    wrapped_image_np = np.full((new_height * target_width, channels), 255, dtype=np.uint8)
-    
-    # Copy the flattened pixels into the new array
-    num_pixels_to_copy = min(total_pixels, new_height * target_width) # Should be just total_pixels
-    wrapped_image_np[:num_pixels_to_copy] = flattened_pixels[:num_pixels_to_copy]
+    # Common case: the stream fills every row exactly, so a reshape view is enough
+    if remainder == 0:
+        return unflatten_stream(flattened_pixels, new_height, target_width, order)
+
+    # Otherwise copy the stream once and pad only the tail of the final partial row with white
+    wrapped_image_np = np.empty((new_height * target_width, channels), dtype=image_np.dtype)
+    wrapped_image_np[:total_pixels] = flattened_pixels
+    wrapped_image_np[total_pixels:] = 255
 
     # Reshape the 1D array back into the new 2D dimensions
-    final_image = wrapped_image_np.reshape((new_height, target_width, channels))
+    final_image = unflatten_stream(wrapped_image_np, new_height, target_width, order)
     
     return final_image
 
-def apply_fractional_pixel_stream_shift(image_np, x_offset, y_offset):
+def padded_pixel_stream(image_np, max_width, order='row'):
+    """
+    Flattens image_np once into a read-only stream with enough white padding for any wrap
+    width up to max_width (the last partial row needs at most max_width - 1 pixels).
+    Returns (total_pixels, padded_stream).
+    """
+    total_pixels = image_np.shape[0] * image_np.shape[1]
+    padded_stream = np.empty((total_pixels + max_width - 1, image_np.shape[2]), dtype=image_np.dtype)
+    padded_stream[:total_pixels] = flatten_stream(image_np, order)
+    padded_stream[total_pixels:] = 255
+    padded_stream.flags.writeable = False
+    return total_pixels, padded_stream
+
+def iter_pixel_wrap_widths(image_np, widths, order='row'):
+    """
+    Generator yielding (width, wrapped_image) for every width in `widths` (e.g. a range).
+    The image is flattened and white-padded once, for the widest width, and every
+    result is a read-only reshape view into that one buffer, so sweeping hundreds of
+    widths costs almost nothing (other stream orders build a permutation and `take` per width).
+    """
+    widths = list(widths)
+    if not widths:
+        return
+    if min(widths) <= 0:
+        raise ValueError("Target width must be greater than 0 for pixel wrapping.")
+
+    channels = image_np.shape[2]
+    total_pixels, padded_stream = padded_pixel_stream(image_np, max(widths), order)
+
+    for width in widths:
+        new_height = -(-total_pixels // width) # Ceiling division
+        yield width, unflatten_stream(padded_stream[:new_height * width], new_height, width, order)
+
+# Pixels blended per chunk in apply_fractional_pixel_stream_shift (keeps the uint16 scratch small)
+STREAM_SHIFT_CHUNK_PIXELS = 1 << 18
+
+def apply_fractional_pixel_stream_shift(image_np, x_offset, y_offset, out=None):
     """
     Applies a fractional pixel offset to a 2D image *as if it were a 1D pixel stream*,
     and then re-wraps it. This simulates the "text flow" shift.
@@ -126,102 +389,377 @@ def apply_fractional_pixel_stream_shift(image_np, x_offset, y_offset):
         x_offset (float): Fractional horizontal offset (0.0 to 1.0).
         y_offset (float): Fractional vertical offset (0.0 to 1.0).
                            For pixel stream, Y offset means shifting entire "rows" of the stream.
+        out (np.array, optional): Reusable uint8 buffer with the same shape as image_np.
+                           Must not overlap image_np. Allocated if missing or mismatched.
     
     Returns:
         np.array: The image with the fractional pixel stream offset applied,
-                  reshaped to its original dimensions.
+                  reshaped to its original dimensions (this is `out` when it was usable).
     """
     if x_offset == 0.0 and y_offset == 0.0:
         return image_np # No offset, return original
 
     original_height, original_width, channels = image_np.shape
     total_pixels = original_height * original_width
-    
-    # Flatten the image into a 1D pixel stream
-    flattened_pixels = image_np.reshape(-1, channels).astype(np.float32) # Convert to float for interpolation
-
-    # Calculate total fractional shift in terms of 1D pixels
-    # A positive x_offset shifts content right (so the "start" of the stream shifts left)
-    # A positive y_offset shifts content down (so the "start" of the stream shifts up, effectively earlier in the stream)
-    # Combined, this is a linear shift on the flattened array.
-    # The actual shift amount for the 1D array needs to be relative to its total length.
-    
-    # Let's consider a simpler interpretation: The "offset" for a pixel stream
-    # means that the "first pixel" of the display moves to a new (x,y) location,
-    # and subsequent pixels wrap from there.
-    # This is handled by the `pixel_wrap_image` function's target_width.
-    
-    # For *fractional* offset on the already established pixel flow, we need to
-    # adjust the stream itself.
-    
-    # Calculate effective 1D shift. We assume x_offset and y_offset are
-    # relative to the original image's dimensions.
-    # A full X offset of 1.0 means shifting by 1 pixel horizontally.
-    # A full Y offset of 1.0 means shifting by 1 pixel vertically.
-    # In a 1D stream, a 1-pixel horizontal shift is 1 pixel.
-    # A 1-pixel vertical shift is `original_width` pixels.
-    
-    # Total 1D pixel shift
-    # Positive shift_1d means content moves to the right/down in the 1D stream.
-    # So, if x_offset is 0.5, we want to shift the content right by 0.5 pixels.
-    # If y_offset is 0.5, we want to shift content down by 0.5 rows.
-    
-    # The `np.roll` function shifts elements. A positive shift means elements move
-    # from left to right (or top to bottom).
-    
-    # The fractional part needs interpolation.
-    
-    # Total fractional shift along the 1D stream.
-    # The X-offset is a direct pixel shift.
-    # The Y-offset needs to be scaled by the original image's width to represent
-    # a shift in terms of 1D pixels.
-    
-    # For wrapping:
-    # Let's consider the new starting point of the original stream within a "padded" stream.
-    # A positive x_offset means the content moves right, so the *sampling origin* moves left.
-    # A positive y_offset means the content moves down, so the *sampling origin* moves up (earlier in stream).
-    
-    # Calculate the total fractional shift for the 1D stream
-    # A full X offset of 1.0 moves by 1 pixel.
-    # A full Y offset of 1.0 moves by `original_width` pixels.
-    
-    total_1d_shift_fractional = x_offset + (y_offset * original_width)
-    
-    # If the shift is negative, normalize it to be positive within the total_pixels range
-    # e.g., -0.5 shift on a 100-pixel array is equivalent to a 99.5 shift.
-    # It's more robust to work with positive shifts modulo length.
-    total_1d_shift_fractional = total_1d_shift_fractional % total_pixels
 
-    if total_1d_shift_fractional < 0:
-        total_1d_shift_fractional += total_pixels
+    # A full X offset of 1.0 moves the stream by 1 pixel, a full Y offset of 1.0 by one row
+    # (`original_width` pixels). Normalise the shift to a positive value modulo the stream length.
+    total_1d_shift_fractional = (x_offset + (y_offset * original_width)) % total_pixels
 
     integer_shift = int(total_1d_shift_fractional)
-    fractional_part = total_1d_shift_fractional - integer_shift
+    # Fractional part as an 8-bit fixed-point weight (0..256) for the uint16 blend below
+    weight = int(round((total_1d_shift_fractional - integer_shift) * 256))
+    if weight == 256:
+        integer_shift, weight = integer_shift + 1, 0
+    integer_shift %= total_pixels
+
+    if out is None or out.shape != image_np.shape or out.dtype != np.uint8 or np.shares_memory(out, image_np):
+        out = np.empty(image_np.shape, dtype=np.uint8)
+
+    src = image_np.reshape(-1, channels)
+    dst = out.reshape(-1, channels)
+
+    # Output pixel i samples the stream at (i - s) mod N and (i - s - 1) mod N, the same as
+    # blending np.roll(src, s) with np.roll(src, s + 1). Instead of materialising the rolls or an
+    # index array, the output is split into the runs where neither source index wraps, so every
+    # run is a pair of plain slices.
+    s = integer_shift
+    if weight == 0:
+        dst[s:] = src[:total_pixels - s]
+        dst[:s] = src[total_pixels - s:]
+        return out
+
+    runs = [(0, s, total_pixels - s),  # i in [0, s): a = i - s + N
+            (s, total_pixels, -s)]     # i in [s, N): a = i - s (b wraps to N - 1 when a == 0)
+
+    weight_a = np.uint16(256 - weight)
+    weight_b = np.uint16(weight)
+    scratch_a = np.empty((min(STREAM_SHIFT_CHUNK_PIXELS, total_pixels), channels), dtype=np.uint16)
+    scratch_b = np.empty_like(scratch_a)
+
+    for run_start, run_stop, a_delta in runs:
+        for start in range(run_start, run_stop, STREAM_SHIFT_CHUNK_PIXELS):
+            stop = min(start + STREAM_SHIFT_CHUNK_PIXELS, run_stop)
+            count = stop - start
+            a_start = start + a_delta
+            pixels_a = src[a_start:a_start + count]
+            if a_start == 0:
+                # b index is a - 1, which wraps to the last pixel for the first element
+                pixels_b = np.concatenate((src[-1:], src[:count - 1]))
+            else:
+                pixels_b = src[a_start - 1:a_start - 1 + count]
 
-    # Perform integer shift using np.roll (wrap mode built-in)
-    shifted_pixels_int = np.roll(flattened_pixels, integer_shift, axis=0)
+            acc = scratch_a[:count]
+            tmp = scratch_b[:count]
+            np.multiply(pixels_a, weight_a, out=acc)
+            np.multiply(pixels_b, weight_b, out=tmp)
+            acc += tmp
+            acc += 128 # Round to nearest
+            np.right_shift(acc, 8, out=dst[start:stop], casting="unsafe")
 
-    if fractional_part == 0:
-        return shifted_pixels_int.reshape((original_height, original_width, channels)).astype(np.uint8)
+    return out
 
-    # Perform fractional interpolation
-    # We need to blend the integer-shifted array with another array shifted by integer_shift + 1
+
+def apply_pixel_offset(mode, image_np, x_offset, y_offset, out=None, order='row'):
+    """
+    Applies the fine X/Y offset for the given mode ('pixel_wrap', 'preserve' or 'aspect').
+    Pixel Wrap shifts the 1D pixel stream (walked in `order`), the other modes use a
+    standard affine translation. Safe to call from a worker thread (no Tk access).
+    """
+    if x_offset == 0.0 and y_offset == 0.0:
+        return image_np
+
+    if mode == 'pixel_wrap':
+        print(f"Applying fractional pixel stream offset: X={x_offset:.2f}, Y={y_offset:.2f}")
+        # The `apply_fractional_pixel_stream_shift` function will take care of
+        # flattening, shifting, interpolating, and reshaping back to original DIMS.
+        # The `pixel_wrap_image` function (called by process_image_for_mode) will then
+        # re-wrap this potentially offset original-size image to the new target_width.
+        if order != 'row':
+            # Shift along the chosen stream: lay the stream out row by row, shift, then put it back
+            height, width = image_np.shape[:2]
+            stream_image = flatten_stream(image_np, order).reshape(image_np.shape)
+            shifted = apply_fractional_pixel_stream_shift(stream_image, x_offset, y_offset, out=out)
+            return unflatten_stream(shifted.reshape(-1, image_np.shape[2]), height, width, order)
+        return apply_fractional_pixel_stream_shift(image_np, x_offset, y_offset, out=out)
+
+    # Standard (non-wrapping) affine offset for other modes
+    print(f"Applying STANDARD (non-wrapping) pixel offset: X={x_offset:.2f}, Y={y_offset:.2f}")
+    pil_image_for_processing = Image.fromarray(image_np)
+    pil_image_after_offset = pil_image_for_processing.transform(
+        pil_image_for_processing.size, 
+        Image.AFFINE,
+        (1, 0, x_offset, 0, 1, y_offset), # Standard affine translation
+        resample=Image.BICUBIC
+    )
+    return np.array(pil_image_after_offset)
+
+def process_image_for_mode(mode, base_image_np, target_width, target_height, order='row', exact=True):
+    """
+    Processes the image for the given mode ('pixel_wrap', 'preserve' or 'aspect') and target dimensions.
+    `order` is the pixel stream order used by Pixel Wrap; exact=False allows the faster,
+    approximate seam carving used for previews.
+    Takes a base NumPy array (which has already had the fractional offset applied) as input.
+    Returns the processed NumPy array. Safe to call from a worker thread (no Tk access).
+    """
+    if base_image_np is None:
+        print("Error: No base image to process.")
+        return None
     
-    # shifted_pixels_int corresponds to the floor(total_1d_shift_fractional)
-    # shifted_pixels_int_plus_1 corresponds to ceil(total_1d_shift_fractional)
-    shifted_pixels_int_plus_1 = np.roll(flattened_pixels, integer_shift + 1, axis=0)
+    # Ensure valid dimensions
+    if target_width <= 0 or target_height <= 0:
+        print(f"Error: Invalid dimensions ({target_width}x{target_height}) for processing.")
+        # If dimensions are invalid, return the current base image (with offset, if any)
+        return base_image_np 
 
-    # Linear interpolation: result = (1 - f) * value_at_floor + f * value_at_ceil
-    interpolated_pixels = (1 - fractional_part) * shifted_pixels_int + fractional_part * shifted_pixels_int_plus_1
+    processed_image_np = None
+    
+    if mode == 'pixel_wrap':
+        print(f"Processing 'Pixel Wrap' mode. Target W:{target_width}, Calculated H:{target_height}")
+        processed_image_np = pixel_wrap_image(base_image_np, target_width, order)
+        
+    elif mode == 'preserve':
+        print(f"Processing 'Preserve Total Pixels' mode. Target W:{target_width}, Target H:{target_height}")
+        processed_image_np = perform_seam_carving(base_image_np, target_width, target_height, exact)
+        
+        # Add white padding if seam carving results in an image smaller than target_height
+        if processed_image_np.shape[0] < target_height:
+            print(f"Adding white padding from {processed_image_np.shape[0]} to {target_height}")
+            padded_img_np = np.full((target_height, target_width, 3), 255, dtype=np.uint8)
+            copy_height = min(processed_image_np.shape[0], target_height)
+            copy_width = min(processed_image_np.shape[1], target_width)
+            padded_img_np[0:copy_height, 0:copy_width] = processed_image_np[0:copy_height, 0:copy_width]
+            processed_image_np = padded_img_np
+
+    elif mode == 'aspect':
+        print(f"Processing 'Maintain Aspect Ratio' mode. Target W:{target_width}, Target H:{target_height}")
+        base_image_pil_for_resize = Image.fromarray(base_image_np) 
+        processed_image_np = np.array(base_image_pil_for_resize.resize((target_width, target_height), Image.LANCZOS))
     
-    # Clip and convert back to uint8
-    interpolated_pixels = np.clip(interpolated_pixels, 0, 255).astype(np.uint8)
+    return processed_image_np
+
+# --- Realtime Preview Pipeline ---
+PREVIEW_PROXY_MAX_SIDE = 1024  # Longest side of the cached proxy used for seam carve / aspect previews
+PREVIEW_DEBOUNCE_MS = 120      # Quiet time after the last spinbox change before a preview is rendered
+PREVIEW_POLL_MS = 30           # How often the Tk thread checks for finished previews
+
+def make_preview_proxy(image_np, max_side=PREVIEW_PROXY_MAX_SIDE):
+    """Returns (proxy_np, scale): a downscaled copy of image_np whose longest side is at most max_side."""
+    height, width = image_np.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    if scale == 1.0:
+        return image_np, 1.0
+    proxy_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return np.array(Image.fromarray(image_np).resize(proxy_size, Image.BILINEAR)), scale
+
+class PreviewWorker:
+    """
+    Single background thread for realtime previews. Only the newest submitted job is kept:
+    submitting replaces any job that has not started yet, and results of jobs that were
+    overtaken while running are dropped. Finished results are put on `results` for the Tk
+    thread to pick up with after() polling, since Tk must not be touched from the worker.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending_job = None
+        self._generation = 0
+        self.results = queue.Queue()
+        threading.Thread(target=self._run, name="PreviewWorker", daemon=True).start()
+
+    def submit(self, func, *args):
+        """Queues func(*args), replacing any job still waiting. Returns the job's generation."""
+        with self._condition:
+            self._generation += 1
+            self._pending_job = (self._generation, func, args)
+            self._condition.notify()
+            return self._generation
+
+    def invalidate(self):
+        """Drops the waiting job and marks any running job as stale."""
+        with self._condition:
+            self._generation += 1
+            self._pending_job = None
+
+    def is_current(self, generation):
+        with self._condition:
+            return generation == self._generation
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending_job is not None)
+                generation, func, args = self._pending_job
+                self._pending_job = None
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                traceback.print_exc()
+                result, error = None, e
+            if self.is_current(generation):
+                self.results.put((generation, result, error))
 
-    # Reshape back to original 2D dimensions for further processing
-    # Note: This function only applies the offset. The final reshape to target_width
-    # will happen later in `_process_image` (via pixel_wrap_image).
-    return interpolated_pixels.reshape((original_height, original_width, channels))
 
+# --- Undo/Redo History ---
+HISTORY_MEMORY_BUDGET = 512 * 1024 * 1024 # Bytes of image data the undo history may hold (raw + compressed)
+HISTORY_RAW_ENTRIES = 3        # Entries nearest the current position stay uncompressed for instant undo/redo
+HISTORY_COMPRESS_LEVEL = 1     # zlib level used for the older entries (fast; wrapped images compress well)
+
+class HistoryEntry:
+    """
+    One processed result plus the settings that produced it. The image is held by reference
+    (never copied) until it is compressed; `shared` entries point into a buffer owned by
+    someone else (e.g. a zero-copy wrap of the original) and are never compressed or counted.
+    """
+    def __init__(self, settings, image_np, shared=False):
+        self.settings = settings
+        self.shape, self.dtype = image_np.shape, image_np.dtype
+        self.shared = shared
+        self._image_np = image_np
+        self._compressed = None
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            if self.shared:
+                return 0
+            return len(self._compressed) if self._image_np is None else self._image_np.nbytes
+
+    @property
+    def compressible(self):
+        with self._lock:
+            return not self.shared and self._image_np is not None
+
+    def holds(self, buffer_np):
+        """True if the uncompressed image may live in buffer_np's memory."""
+        with self._lock:
+            return self._image_np is not None and np.may_share_memory(self._image_np, buffer_np)
+
+    def compress(self):
+        """Replaces the array with its zlib-compressed bytes (runs on the history worker; zlib releases the GIL)."""
+        with self._lock:
+            if self.shared or self._image_np is None:
+                return
+            image_np = self._image_np
+        compressed = zlib.compress(np.ascontiguousarray(image_np), HISTORY_COMPRESS_LEVEL)
+        with self._lock:
+            if self._image_np is image_np: # Not promoted back in the meantime
+                self._compressed, self._image_np = compressed, None
+
+    def image(self):
+        """Returns the image as an array, inflating (and keeping) it if it was compressed."""
+        with self._lock:
+            if self._image_np is None:
+                self._image_np = np.frombuffer(zlib.decompress(self._compressed), dtype=self.dtype).reshape(self.shape)
+                self._compressed = None
+            return self._image_np
+
+class EditHistory:
+    """
+    Linear undo/redo history of processed results. Pushing after an undo discards the redo
+    branch. Entries near the current position are kept as they are, older ones are compressed
+    on a background thread, and the entries farthest from the current position are dropped
+    when the total exceeds memory_budget.
+    """
+    def __init__(self, memory_budget=HISTORY_MEMORY_BUDGET, raw_entries=HISTORY_RAW_ENTRIES):
+        self.memory_budget = memory_budget
+        self.raw_entries = raw_entries
+        self.entries = []
+        self.index = -1
+        self._pinned = ()
+        self._pending_compressions = 0
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="HistoryCompress")
+
+    def reset(self, *pinned_buffers):
+        """Clears the history. Results that are views of a pinned buffer (e.g. the original) are stored for free."""
+        with self._lock:
+            self.entries = []
+            self.index = -1
+            self._pinned = pinned_buffers
+
+    def current(self):
+        with self._lock:
+            return self.entries[self.index] if self.entries else None
+
+    def push(self, settings, image_np):
+        """Records a new result after the current one. Re-pushing the current settings is a no-op."""
+        with self._lock:
+            current = self.current()
+            if current is not None and current.settings == settings:
+                return current
+            shared = any(np.may_share_memory(image_np, pinned) for pinned in self._pinned)
+            del self.entries[self.index + 1:]
+            entry = HistoryEntry(settings, image_np, shared)
+            self.entries.append(entry)
+            self.index = len(self.entries) - 1
+            self._rebalance()
+            return entry
+
+    def can_undo(self):
+        with self._lock:
+            return self.index > 0
+
+    def can_redo(self):
+        with self._lock:
+            return self.index < len(self.entries) - 1
+
+    def undo(self):
+        """Steps back and returns the now-current entry (None if there is nothing to undo)."""
+        with self._lock:
+            if not self.can_undo():
+                return None
+            self.index -= 1
+            self._rebalance()
+            return self.entries[self.index]
+
+    def redo(self):
+        with self._lock:
+            if not self.can_redo():
+                return None
+            self.index += 1
+            self._rebalance()
+            return self.entries[self.index]
+
+    def references(self, buffer_np):
+        """True if an uncompressed entry may still use buffer_np, so it must not be overwritten (copy on write)."""
+        with self._lock:
+            return any(entry.holds(buffer_np) for entry in self.entries)
+
+    def memory_usage(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self.entries)
+
+    def _rebalance(self):
+        """Queues compression of every entry outside the raw window, then trims to the budget."""
+        by_distance = sorted(range(len(self.entries)), key=lambda i: abs(i - self.index))
+        for i in by_distance[self.raw_entries:]:
+            if not self.entries[i].compressible:
+                continue
+            self._pending_compressions += 1
+            future = self._executor.submit(self.entries[i].compress)
+            future.add_done_callback(self._compression_done)
+        self._trim()
+
+    def _compression_done(self, future):
+        with self._lock:
+            self._pending_compressions -= 1
+            self._trim()
+
+    def _trim(self):
+        """
+        Drops the entries farthest from the current position while over budget (never the current one).
+        Waits for queued compressions first, so entries are not dropped for their uncompressed size.
+        """
+        with self._lock:
+            if self._pending_compressions:
+                return
+            while len(self.entries) > 1 and self.memory_usage() > self.memory_budget:
+                if self.index >= len(self.entries) - 1 - self.index:
+                    del self.entries[0]
+                    self.index -= 1
+                else:
+                    del self.entries[-1]
 
 class ImageResizerApp:
     def __init__(self, master):
@@ -231,10 +769,25 @@ class ImageResizerApp:
         self.original_image_pil = None # Stores the PIL image of the initially loaded image
         self.original_image_np = None  # Stores the NumPy array of the initially loaded image
         self.display_image_pil = None  # Stores the PIL image currently displayed on canvas
+        self.offset_buffer_np = None   # Reusable output buffer for the pixel stream shift
+
+        # Realtime preview state (see _schedule_preview)
+        self.proxy_image_np = None     # Downscaled copy of the original used for previews
+        self.proxy_scale = 1.0
+        self.preview_offset_buffer_np = None # Worker-owned stream shift buffer
+        self.preview_stream = (None, None, None) # Worker-owned (source, order, flattened stream) of the last preview
+        self.preview_image_pil = None  # Last preview drawn on the canvas
+        self.preview_dirty = False     # True while the canvas shows a preview, not the full-res result
+        self.preview_after_id = None
+        self.preview_worker = PreviewWorker()
+        self.display_pyramid = None    # Mip pyramid of the image currently on the canvas
+        self.resize_after_id = None    # Pending throttled redraw after a <Configure> event
+        self.history = EditHistory()   # Undo/redo of full-resolution results
 
         # Variables for fractional pixel offset (new feature)
         self.x_offset_var = tk.DoubleVar(value=0.0)
         self.y_offset_var = tk.DoubleVar(value=0.0)
+        self.stream_order_var = tk.StringVar(value='row') # Pixel stream order for Pixel Wrap
 
         # Trace IDs for spinbox synchronization, allowing removal
         self.width_trace_id = None
@@ -247,6 +800,8 @@ class ImageResizerApp:
         self.pixel_wrap_mode.set(True) 
         self._toggle_mode() # Initialize GUI state based on default mode
 
+        self.master.after(PREVIEW_POLL_MS, self._poll_preview_results)
+
     def create_widgets(self):
         # --- Controls Frame ---
         control_frame = ttk.LabelFrame(self.master, text="Controls", padding="10")
@@ -293,6 +848,24 @@ class ImageResizerApp:
         self.apply_button.grid(row=7, column=0, columnspan=2, pady=10)
         self.apply_button.config(state=tk.DISABLED)
 
+        self.export_sweep_button = ttk.Button(control_frame, text="Export Sweep Animation...", command=self.open_sweep_export_dialog)
+        self.export_sweep_button.grid(row=7, column=2, columnspan=2, pady=10, padx=10)
+        self.export_sweep_button.config(state=tk.DISABLED)
+
+        self.contact_sheet_button = ttk.Button(control_frame, text="Width Contact Sheet...", command=self.open_contact_sheet_dialog)
+        self.contact_sheet_button.grid(row=8, column=2, columnspan=2, pady=5, padx=10)
+        self.contact_sheet_button.config(state=tk.DISABLED)
+
+        # --- Undo / Redo (Ctrl+Z / Ctrl+Y) ---
+        self.undo_button = ttk.Button(control_frame, text="Undo", command=self.undo)
+        self.undo_button.grid(row=8, column=0, pady=5, sticky=tk.W)
+        self.redo_button = ttk.Button(control_frame, text="Redo", command=self.redo)
+        self.redo_button.grid(row=8, column=1, pady=5, sticky=tk.W)
+        self.master.bind("<Control-z>", lambda event: self.undo())
+        self.master.bind("<Control-y>", lambda event: self.redo())
+        self.master.bind("<Control-Shift-Z>", lambda event: self.redo())
+        self._update_history_buttons()
+
         # --- New: Fine Alignment / Pixel Offset Section ---
         align_frame = ttk.LabelFrame(self.master, text="Fine Pixel Offset (Interpolated)", padding="10")
         align_frame.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
@@ -309,6 +882,12 @@ class ImageResizerApp:
         self.y_offset_spinbox.grid(row=1, column=1, sticky=tk.W, pady=2)
         self.y_offset_spinbox.config(state=tk.DISABLED) # Initially disabled
 
+        ttk.Label(align_frame, text="Stream Order:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.stream_order_combobox = ttk.Combobox(align_frame, textvariable=self.stream_order_var, values=STREAM_ORDERS,
+                                                  state="readonly", width=10)
+        self.stream_order_combobox.grid(row=2, column=1, sticky=tk.W, pady=2)
+        self.stream_order_combobox.bind("<<ComboboxSelected>>", lambda event: self._on_offset_change())
+
         # --- Image Info Display Frame ---
         info_frame = ttk.LabelFrame(self.master, text="Image Info", padding="10")
         info_frame.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
@@ -420,7 +999,7 @@ class ImageResizerApp:
         if self.original_image_np is not None: 
             self._add_traces_for_current_mode() # Re-add traces based on new realtime state
             if self.realtime_update_enabled.get():
-                self._process_and_display_current_values() # Perform an immediate update
+                self._schedule_preview() # Preview the current values right away
 
     def _on_offset_change(self):
         """Called when the X or Y offset spinbox value changes."""
@@ -430,7 +1009,7 @@ class ImageResizerApp:
                 # Attempt to get values to ensure they are valid numbers
                 _ = self.x_offset_var.get()
                 _ = self.y_offset_var.get()
-                self._process_and_display_current_values()
+                self._schedule_preview()
             except tk.TclError:
                 print("Invalid value for offset. Please enter a number.")
                 # Optionally, reset to last valid value or 0.0
@@ -442,6 +1021,9 @@ class ImageResizerApp:
             try:
                 self.original_image_pil = Image.open(file_path).convert("RGB") # Ensure RGB format
                 self.original_image_np = np.array(self.original_image_pil)
+                self.proxy_image_np, self.proxy_scale = make_preview_proxy(self.original_image_np)
+                self.preview_offset_buffer_np = None
+                self.history.reset(self.original_image_np) # Unshifted wraps are views of the original: stored for free
                 
                 # Set initial dimensions to original image's dimensions
                 self.width_var.set(self.original_image_pil.width)
@@ -458,6 +1040,8 @@ class ImageResizerApp:
                 self.update_info_display() # Update info labels
                 self.apply_button.config(state=tk.NORMAL) # Enable apply button
                 self.save_button.config(state=tk.NORMAL) # Enable save button
+                self.export_sweep_button.config(state=tk.NORMAL)
+                self.contact_sheet_button.config(state=tk.NORMAL)
                 self.x_offset_spinbox.config(state=tk.NORMAL) # Enable offset controls
                 self.y_offset_spinbox.config(state=tk.NORMAL)
                 
@@ -473,13 +1057,17 @@ class ImageResizerApp:
                 self.original_image_np = None
                 self.apply_button.config(state=tk.DISABLED)
                 self.save_button.config(state=tk.DISABLED)
+                self.export_sweep_button.config(state=tk.DISABLED)
+                self.contact_sheet_button.config(state=tk.DISABLED)
                 self.width_spinbox.config(state=tk.DISABLED)
                 self.height_spinbox.config(state=tk.DISABLED)
                 self.x_offset_spinbox.config(state=tk.DISABLED)
                 self.y_offset_spinbox.config(state=tk.DISABLED)
 
     def save_image(self):
-        """Saves the currently displayed image."""
+        """Saves the currently displayed image (rendered at full resolution first if a preview is showing)."""
+        if self.preview_dirty:
+            self._process_and_display_current_values()
         if self.display_image_pil is None:
             messagebox.showinfo("Save Image", "No image to save.")
             return
@@ -507,56 +1095,10 @@ class ImageResizerApp:
     def display_image(self, pil_image):
         """Displays a PIL image on the Tkinter canvas, scaling it to fit."""
         if pil_image:
-            canvas_width = self.canvas.winfo_width()
-            canvas_height = self.canvas.winfo_height()
-
-            # Ensure canvas has actual dimensions if it hasn't been rendered yet
-            if canvas_width == 0 or canvas_height == 0:
-                self.canvas.update_idletasks() # Force update
-                canvas_width = self.canvas.winfo_width()
-                canvas_height = self.canvas.winfo_height()
-                # Fallback if canvas still has no dimensions (e.g., very early in startup)
-                if canvas_width == 0 or canvas_height == 0:
-                    canvas_width = 800
-                    canvas_height = 600
-
-            img_width, img_height = pil_image.size
-            
-            # Calculate scaling to fit image within canvas while maintaining aspect ratio
-            img_aspect = img_width / img_height
-            canvas_aspect = canvas_width / canvas_height
-
-            if img_aspect > canvas_aspect:
-                new_width = canvas_width
-                new_height = int(new_width / img_aspect)
-            else:
-                new_height = canvas_height
-                new_width = int(new_height * img_aspect)
-
-            # Prevent extremely small resize if canvas is tiny
-            if new_width < 10 or new_height < 10:
-                new_width, new_height = img_width, img_height # Don't scale if it makes it too small
-
-            try:
-                # Resize image for display using high-quality LANCZOS filter
-                display_img_resized = pil_image.resize((max(1, new_width), max(1, new_height)), Image.LANCZOS)
-                self.display_image_tk = ImageTk.PhotoImage(display_img_resized)
-                
-                # Clear previous image on canvas and draw new one
-                if self.canvas_image_id:
-                    self.canvas.delete(self.canvas_image_id)
-                
-                # Center the image on the canvas
-                x_center = canvas_width / 2
-                y_center = canvas_height / 2
-                self.canvas_image_id = self.canvas.create_image(x_center, y_center, image=self.display_image_tk, anchor=tk.CENTER)
-                
+            if self._draw_on_canvas(pil_image):
                 self.display_image_pil = pil_image # Store the actual (unscaled) image being displayed
                 self.update_info_display()
-
-            except Exception as e:
-                print(f"Error displaying image: {e}")
-                traceback.print_exc()
+            else:
                 self.display_image_pil = None
         else:
             # Clear canvas if no image to display
@@ -565,8 +1107,48 @@ class ImageResizerApp:
             self.display_image_pil = None
             self.update_info_display()
 
-    def update_info_display(self):
-        """Updates the labels displaying image dimensions and pixel counts."""
+    def _draw_on_canvas(self, pil_image):
+        """Scales a PIL image to fit the canvas and draws it centered. Returns True on success."""
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+
+        # Ensure canvas has actual dimensions if it hasn't been rendered yet
+        if canvas_width == 0 or canvas_height == 0:
+            self.canvas.update_idletasks() # Force update
+            canvas_width = self.canvas.winfo_width()
+            canvas_height = self.canvas.winfo_height()
+            # Fallback if canvas still has no dimensions (e.g., very early in startup)
+            if canvas_width == 0 or canvas_height == 0:
+                canvas_width = 800
+                canvas_height = 600
+
+        try:
+            # Fit from the nearest level of the cached pyramid instead of re-scaling the full image
+            if self.display_pyramid is None or self.display_pyramid.source is not pil_image:
+                self.display_pyramid = DisplayPyramid(pil_image)
+            display_img_resized = self.display_pyramid.fit(canvas_width, canvas_height)
+            self.display_image_tk = ImageTk.PhotoImage(display_img_resized)
+            
+            # Clear previous image on canvas and draw new one
+            if self.canvas_image_id:
+                self.canvas.delete(self.canvas_image_id)
+            
+            # Center the image on the canvas
+            x_center = canvas_width / 2
+            y_center = canvas_height / 2
+            self.canvas_image_id = self.canvas.create_image(x_center, y_center, image=self.display_image_tk, anchor=tk.CENTER)
+            return True
+
+        except Exception as e:
+            print(f"Error displaying image: {e}")
+            traceback.print_exc()
+            return False
+
+    def update_info_display(self, current_size=None):
+        """
+        Updates the labels displaying image dimensions and pixel counts.
+        current_size overrides the "Current" values (used while a preview stands in for the full render).
+        """
         if self.original_image_pil is not None:
             original_w, original_h = self.original_image_pil.size
             original_pixels = original_w * original_h
@@ -576,8 +1158,8 @@ class ImageResizerApp:
             self.original_dims_label.config(text="Original Dims: N/A")
             self.original_pixel_count_label.config(text="Original Pixels: N/A")
 
-        if self.display_image_pil is not None:
-            current_w, current_h = self.display_image_pil.size
+        if current_size is not None or self.display_image_pil is not None:
+            current_w, current_h = current_size or self.display_image_pil.size
             current_pixels = current_w * current_h
             self.current_dims_label.config(text=f"Current Dims: {current_w}x{current_h} pixels")
             self.current_pixel_count_label.config(text=f"Current Pixels: {current_pixels}")
@@ -659,7 +1241,7 @@ class ImageResizerApp:
         self.height_trace_id = self.height_var.trace_add("write", self._on_spinbox_change_realtime_aspect)
         
         if self.realtime_update_enabled.get():
-            self._process_and_display_current_values()
+            self._schedule_preview()
 
     def _on_spinbox_change_realtime_preserve(self, *args):
         """Handles realtime updates for preserve total pixels mode."""
@@ -673,7 +1255,7 @@ class ImageResizerApp:
         self.height_trace_id = self.height_var.trace_add("write", self._on_spinbox_change_realtime_preserve)
 
         if self.realtime_update_enabled.get():
-            self._process_and_display_current_values()
+            self._schedule_preview()
 
     def _on_spinbox_change_realtime_pixel_wrap(self, *args):
         """Handles realtime updates for pixel wrap mode."""
@@ -681,105 +1263,350 @@ class ImageResizerApp:
 
         self._sync_spinboxes_pixel_wrap_width() # Only width changes height in this mode
         if self.realtime_update_enabled.get():
-            self._process_and_display_current_values()
+            self._schedule_preview()
     # --- End Realtime Spinbox Change Handlers ---
 
+    def _current_mode(self):
+        """Returns the active resize mode as 'pixel_wrap', 'preserve' or 'aspect'."""
+        if self.pixel_wrap_mode.get():
+            return 'pixel_wrap'
+        if self.preserve_total_pixels.get():
+            return 'preserve'
+        if self.maintain_aspect_ratio.get():
+            return 'aspect'
+        return None
+
     def _process_image(self, base_image_np, target_width, target_height):
         """
         Processes the image based on the currently active mode and given target dimensions.
         Takes a base NumPy array (which has already had the fractional offset applied) as input.
         Returns the processed NumPy array.
         """
-        if base_image_np is None:
-            print("Error: No base image to process.")
-            return None
-        
-        # Ensure valid dimensions
-        if target_width <= 0 or target_height <= 0:
-            print(f"Error: Invalid dimensions ({target_width}x{target_height}) for processing.")
-            # If dimensions are invalid, return the current base image (with offset, if any)
-            return base_image_np 
-
-        processed_image_np = None
-        
-        if self.pixel_wrap_mode.get():
-            print(f"Processing 'Pixel Wrap' mode. Target W:{target_width}, Calculated H:{target_height}")
-            processed_image_np = pixel_wrap_image(base_image_np, target_width)
-            
-        elif self.preserve_total_pixels.get():
-            print(f"Processing 'Preserve Total Pixels' mode. Target W:{target_width}, Target H:{target_height}")
-            processed_image_np = perform_seam_carving(base_image_np, target_width, target_height)
-            
-            # Add white padding if seam carving results in an image smaller than target_height
-            if processed_image_np.shape[0] < target_height:
-                print(f"Adding white padding from {processed_image_np.shape[0]} to {target_height}")
-                padded_img_np = np.full((target_height, target_width, 3), 255, dtype=np.uint8)
-                copy_height = min(processed_image_np.shape[0], target_height)
-                copy_width = min(processed_image_np.shape[1], target_width)
-                padded_img_np[0:copy_height, 0:copy_width] = processed_image_np[0:copy_height, 0:copy_width]
-                processed_image_np = padded_img_np
-
-        elif self.maintain_aspect_ratio.get():
-            print(f"Processing 'Maintain Aspect Ratio' mode. Target W:{target_width}, Target H:{target_height}")
-            base_image_pil_for_resize = Image.fromarray(base_image_np) 
-            processed_image_np = np.array(base_image_pil_for_resize.resize((target_width, target_height), Image.LANCZOS))
-        
-        return processed_image_np
+        return process_image_for_mode(self._current_mode(), base_image_np, target_width, target_height,
+                                      self.stream_order_var.get())
 
 
     def _process_and_display_current_values(self):
         """
         Retrieves current spinbox values, applies the fractional pixel offset,
-        processes the image using the selected mode, and displays the result.
+        processes the full-resolution image using the selected mode, and displays the result.
         """
         if self.original_image_np is None:
             print("Warning: No image loaded for processing.")
             return
 
+        # A full render supersedes any queued or running preview
+        self.preview_worker.invalidate()
+        self._cancel_scheduled_preview()
+
         target_width = self.width_var.get()
         target_height = self.height_var.get()
 
         try:
             x_offset = self.x_offset_var.get()
             y_offset = self.y_offset_var.get()
+            mode = self._current_mode()
 
-            np_image_after_offset = self.original_image_np
-            
-            # --- Apply Fractional Pixel Offset with Wrapping Logic (ONLY for Pixel Wrap Mode) ---
-            if self.pixel_wrap_mode.get() and (x_offset != 0.0 or y_offset != 0.0):
-                print(f"Applying fractional pixel stream offset: X={x_offset:.2f}, Y={y_offset:.2f}")
-                # The `apply_fractional_pixel_stream_shift` function will take care of
-                # flattening, shifting, interpolating, and reshaping back to original DIMS.
-                # The `pixel_wrap_image` function (called by _process_image) will then
-                # re-wrap this potentially offset original-size image to the new target_width.
-                np_image_after_offset = apply_fractional_pixel_stream_shift(
-                    self.original_image_np, x_offset, y_offset
-                )
-            elif x_offset != 0.0 or y_offset != 0.0:
-                 # Standard (non-wrapping) affine offset for other modes
-                print(f"Applying STANDARD (non-wrapping) pixel offset: X={x_offset:.2f}, Y={y_offset:.2f}")
-                pil_image_for_processing = Image.fromarray(self.original_image_np)
-                pil_image_after_offset = pil_image_for_processing.transform(
-                    pil_image_for_processing.size, 
-                    Image.AFFINE,
-                    (1, 0, x_offset, 0, 1, y_offset), # Standard affine translation
-                    resample=Image.BICUBIC
-                )
-                np_image_after_offset = np.array(pil_image_after_offset)
-            # Else: np_image_after_offset remains self.original_image_np (no offset applied)
+            # --- Step 1: Apply Fractional Pixel Offset (stream wrapping only in Pixel Wrap mode) ---
+            order = self.stream_order_var.get()
+            if self.offset_buffer_np is not None and self.history.references(self.offset_buffer_np):
+                self.offset_buffer_np = None # Copy on write: a history entry still holds the old buffer
+            np_image_after_offset = apply_pixel_offset(mode, self.original_image_np, x_offset, y_offset,
+                                                       out=self.offset_buffer_np, order=order)
+            if mode == 'pixel_wrap' and np_image_after_offset is not self.original_image_np:
+                self.offset_buffer_np = np_image_after_offset # Reused on the next offset tick
 
             # --- Step 2: Process Image based on selected mode, passing the OFFSETTED NumPy array ---
-            processed_image_np = self._process_image(np_image_after_offset, target_width, target_height)
+            processed_image_np = process_image_for_mode(mode, np_image_after_offset, target_width, target_height, order)
             
             # --- Step 3: Display the Result ---
             if processed_image_np is not None:
+                self.preview_image_pil = None
+                self.preview_dirty = False
                 self.display_image_pil = Image.fromarray(processed_image_np)
                 self.display_image(self.display_image_pil)
+                self.history.push(self._current_settings(target_width, target_height, x_offset, y_offset, order),
+                                  processed_image_np)
+                self._update_history_buttons()
         except Exception as e:
             messagebox.showerror("Processing Error", f"An error occurred during image processing: {e}")
             print(f"Error during image processing for display: {e}")
             traceback.print_exc()
 
+    # --- Undo / Redo ---
+    def _current_settings(self, target_width, target_height, x_offset, y_offset, order):
+        return {"mode": self._current_mode(), "width": target_width, "height": target_height,
+                "x_offset": x_offset, "y_offset": y_offset, "order": order}
+
+    def _update_history_buttons(self):
+        self.undo_button.config(state=tk.NORMAL if self.history.can_undo() else tk.DISABLED)
+        self.redo_button.config(state=tk.NORMAL if self.history.can_redo() else tk.DISABLED)
+
+    def undo(self):
+        self._restore_history_entry(self.history.undo())
+
+    def redo(self):
+        self._restore_history_entry(self.history.redo())
+
+    def _restore_history_entry(self, entry):
+        """Shows a stored result and puts the controls back to the settings that produced it (no re-render)."""
+        if entry is None:
+            return
+        settings = entry.settings
+
+        self.maintain_aspect_ratio.set(settings["mode"] == 'aspect')
+        self.preserve_total_pixels.set(settings["mode"] == 'preserve')
+        self.pixel_wrap_mode.set(settings["mode"] == 'pixel_wrap')
+        self._toggle_mode()
+        self._remove_all_traces() # Setting the spinboxes must not trigger sync or realtime renders
+        self.width_var.set(settings["width"])
+        self.height_var.set(settings["height"])
+        self.x_offset_var.set(settings["x_offset"])
+        self.y_offset_var.set(settings["y_offset"])
+        self.stream_order_var.set(settings["order"])
+        self._add_traces_for_current_mode()
+        self.preview_worker.invalidate() # Drop any preview the mode switch may have queued
+        self._cancel_scheduled_preview()
+
+        self.preview_image_pil = None
+        self.preview_dirty = False
+        self.display_image_pil = Image.fromarray(entry.image())
+        self.display_image(self.display_image_pil)
+        self._update_history_buttons()
+        print(f"History: step {self.history.index + 1}/{len(self.history.entries)}, "
+              f"{self.history.memory_usage() / 2**20:.1f} MB held")
+    # --- End Undo / Redo ---
+
+    # --- Realtime Preview (proxy resolution, debounced, background worker) ---
+    def _schedule_preview(self):
+        """Restarts the debounce timer; the preview is rendered once the spinboxes stop changing."""
+        if self.original_image_np is None:
+            return
+        self.preview_dirty = True # The full-resolution result no longer matches the controls
+        self._cancel_scheduled_preview()
+        self.preview_after_id = self.master.after(PREVIEW_DEBOUNCE_MS, self._submit_preview)
+
+    def _cancel_scheduled_preview(self):
+        if self.preview_after_id is not None:
+            self.master.after_cancel(self.preview_after_id)
+            self.preview_after_id = None
+
+    def _submit_preview(self):
+        """Snapshots the current settings on the Tk thread and hands the render to the worker."""
+        self.preview_after_id = None
+        try:
+            params = (self._current_mode(), self.width_var.get(), self.height_var.get(),
+                      self.x_offset_var.get(), self.y_offset_var.get(), self.stream_order_var.get(),
+                      max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height()))
+        except tk.TclError:
+            return # Spinbox holds a partial/invalid value, wait for the next change
+        self.preview_worker.submit(self._render_preview, *params)
+
+    def _render_preview(self, mode, target_width, target_height, x_offset, y_offset, order, canvas_width, canvas_height):
+        """
+        Runs on the preview worker. Renders at roughly canvas resolution and returns
+        (preview PIL image, full-resolution (width, height) it stands in for).
+        """
+        if mode == 'pixel_wrap':
+            # Wrapping does not commute with scaling, so wrap the full-resolution stream (a cheap
+            # view) and decimate it to canvas size by striding instead of resampling.
+            shifted = apply_pixel_offset(mode, self.original_image_np, x_offset, y_offset,
+                                         out=self.preview_offset_buffer_np, order=order)
+            if shifted is not self.original_image_np:
+                self.preview_offset_buffer_np = shifted
+            total_pixels = shifted.shape[0] * shifted.shape[1]
+            full_width, full_height = target_width, -(-total_pixels // target_width)
+            step = max(1, int(np.ceil(max(full_width / canvas_width, full_height / canvas_height))))
+            if order == 'row':
+                preview_np = np.ascontiguousarray(pixel_wrap_image(shifted, target_width, order)[::step, ::step])
+            else:
+                # The source stream is flattened once per image and order (every frame while an
+                # offset is set), and for each width only the decimated pixels are placed
+                source_np, stream_order, stream_np = self.preview_stream
+                if source_np is not shifted or stream_order != order:
+                    stream_np = flatten_stream(shifted, order)
+                    self.preview_stream = (shifted, order, stream_np)
+                preview_np = decimated_pixel_wrap(stream_np, total_pixels, target_width, step, order)
+        else:
+            # Seam carve / aspect resize run on the cached proxy at proportionally scaled dimensions
+            scale = self.proxy_scale
+            full_width, full_height = target_width, target_height
+            proxy_after_offset = apply_pixel_offset(mode, self.proxy_image_np, x_offset * scale, y_offset * scale)
+            preview_np = process_image_for_mode(mode, proxy_after_offset,
+                                                max(1, round(target_width * scale)), max(1, round(target_height * scale)),
+                                                exact=False)
+        return Image.fromarray(preview_np), (full_width, full_height)
+
+    def _poll_preview_results(self):
+        """Picks up finished previews from the worker (Tk is only touched on this thread)."""
+        try:
+            while True:
+                generation, result, error = self.preview_worker.results.get_nowait()
+                if not self.preview_worker.is_current(generation):
+                    continue # Stale: the settings changed while it was rendering
+                if error is not None:
+                    print(f"Error rendering preview: {error}")
+                elif self.preview_dirty:
+                    self.preview_image_pil, preview_full_size = result
+                    self._draw_on_canvas(self.preview_image_pil)
+                    self.update_info_display(current_size=preview_full_size)
+        except queue.Empty:
+            pass
+        self.master.after(PREVIEW_POLL_MS, self._poll_preview_results)
+    # --- End Realtime Preview ---
+
+    # --- Sweep Animation Export Dialog ---
+    def open_sweep_export_dialog(self):
+        """Dialog for exporting an animation that sweeps the wrap width and/or the X/Y stream offset."""
+        if self.original_image_np is None:
+            return
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Export Sweep Animation")
+        dialog.transient(self.master)
+        frame = ttk.Frame(dialog, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        current_width = self.width_var.get()
+        fields = [
+            ("Start Width:", tk.IntVar(value=max(1, current_width // 2)), 1, 100000, 1, None),
+            ("End Width:", tk.IntVar(value=current_width), 1, 100000, 1, None),
+            ("Start X Offset:", tk.DoubleVar(value=0.0), -100000.0, 100000.0, 0.05, "%.2f"),
+            ("End X Offset:", tk.DoubleVar(value=0.0), -100000.0, 100000.0, 0.05, "%.2f"),
+            ("Start Y Offset:", tk.DoubleVar(value=0.0), -100000.0, 100000.0, 0.05, "%.2f"),
+            ("End Y Offset:", tk.DoubleVar(value=0.0), -100000.0, 100000.0, 0.05, "%.2f"),
+            ("Frames:", tk.IntVar(value=120), 1, 100000, 1, None),
+            ("FPS:", tk.IntVar(value=30), 1, 240, 1, None),
+        ]
+        for row, (label, var, low, high, step, fmt) in enumerate(fields):
+            ttk.Label(frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=2)
+            options = {"format": fmt} if fmt else {}
+            ttk.Spinbox(frame, from_=low, to_=high, increment=step, textvariable=var, width=10, **options).grid(
+                row=row, column=1, sticky=tk.W, pady=2)
+        values = [field[1] for field in fields]
+
+        status_label = ttk.Label(frame, text="")
+        status_label.grid(row=len(fields) + 1, column=0, columnspan=2, sticky=tk.W, pady=5)
+        export_button = ttk.Button(frame, text="Export...")
+        export_button.grid(row=len(fields), column=0, pady=10)
+        cancel_event = threading.Event()
+        ttk.Button(frame, text="Cancel", command=lambda: (cancel_event.set(), dialog.destroy())).grid(
+            row=len(fields), column=1, pady=10)
+
+        def start_export():
+            try:
+                start_w, end_w, start_x, end_x, start_y, end_y, frame_count, fps = [var.get() for var in values]
+            except tk.TclError:
+                messagebox.showerror("Export Sweep", "Please enter valid numbers.", parent=dialog)
+                return
+            file_path = filedialog.asksaveasfilename(parent=dialog, defaultextension=".mp4", title="Save Animation As",
+                                                     filetypes=[("MP4 video", "*.mp4"), ("MKV video", "*.mkv"),
+                                                                ("Animated GIF", "*.gif")])
+            if not file_path:
+                return
+            export_button.config(state=tk.DISABLED)
+            progress = {"done": 0, "total": frame_count, "error": None, "finished": False}
+
+            def worker():
+                try:
+                    export_sweep_animation(self.original_image_np, file_path, frame_count, fps, (start_w, end_w),
+                                           (start_x, end_x), (start_y, end_y),
+                                           order=self.stream_order_var.get(),
+                                           progress_callback=lambda done, total: progress.update(done=done),
+                                           cancel_event=cancel_event)
+                except Exception as e:
+                    traceback.print_exc()
+                    progress["error"] = e
+                progress["finished"] = True
+
+            def poll():
+                if not dialog.winfo_exists():
+                    return
+                if progress["finished"]:
+                    if progress["error"] is not None:
+                        status_label.config(text=f"Failed: {progress['error']}")
+                        export_button.config(state=tk.NORMAL)
+                    else:
+                        status_label.config(text=f"Saved {progress['done']} frames to {os.path.basename(file_path)}")
+                    return
+                status_label.config(text=f"Rendering frame {progress['done']}/{progress['total']}...")
+                dialog.after(100, poll)
+
+            threading.Thread(target=worker, name="SweepExport", daemon=True).start()
+            poll()
+
+        export_button.config(command=start_export)
+    # --- End Sweep Animation Export Dialog ---
+
+    # --- Width Contact Sheet Dialog ---
+    def open_contact_sheet_dialog(self):
+        """Shows a grid of candidate wrap widths; clicking a cell picks that width, the sheet can be saved."""
+        if self.original_image_np is None:
+            return
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Width Contact Sheet")
+        dialog.transient(self.master)
+        settings_frame = ttk.Frame(dialog, padding="10")
+        settings_frame.pack(side=tk.TOP, fill=tk.X)
+
+        image_width = self.original_image_np.shape[1]
+        start_var = tk.IntVar(value=max(1, image_width // 4))
+        end_var = tk.IntVar(value=image_width)
+        step_var = tk.IntVar(value=max(1, image_width // 16))
+        for column, (label, var) in enumerate((("Start Width:", start_var), ("End Width:", end_var), ("Step:", step_var))):
+            ttk.Label(settings_frame, text=label).grid(row=0, column=column * 2, sticky=tk.W, padx=(0, 2))
+            ttk.Spinbox(settings_frame, from_=1, to_=100000, textvariable=var, width=8).grid(
+                row=0, column=column * 2 + 1, sticky=tk.W, padx=(0, 10))
+
+        canvas = tk.Canvas(dialog, bg="gray", width=900, height=650, borderwidth=0, highlightthickness=0)
+        canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        status_label = ttk.Label(dialog, text="Click a cell to use that width.")
+        status_label.pack(side=tk.BOTTOM, anchor=tk.W, padx=10, pady=(0, 10))
+        sheet_state = {"sheet": None, "columns": 1, "widths": [], "scale": 1.0, "photo": None}
+
+        def render():
+            try:
+                widths = contact_sheet_widths(start_var.get(), end_var.get(), step_var.get())
+                sheet, columns = build_contact_sheet(self.original_image_np, widths,
+                                                     order=self.stream_order_var.get())
+            except (tk.TclError, ValueError) as e:
+                messagebox.showerror("Contact Sheet", f"Could not render the contact sheet: {e}", parent=dialog)
+                return
+            sheet_pil = Image.fromarray(sheet)
+            canvas_width, canvas_height = max(1, canvas.winfo_width()), max(1, canvas.winfo_height())
+            scale = min(1.0, canvas_width / sheet_pil.width, canvas_height / sheet_pil.height)
+            if scale < 1.0:
+                sheet_pil = sheet_pil.resize((max(1, int(sheet_pil.width * scale)), max(1, int(sheet_pil.height * scale))),
+                                             Image.LANCZOS)
+            sheet_state.update(sheet=sheet, columns=columns, widths=widths, scale=scale,
+                               photo=ImageTk.PhotoImage(sheet_pil)) # Keep a reference or Tk drops the image
+            canvas.delete("all")
+            canvas.create_image(0, 0, anchor=tk.NW, image=sheet_state["photo"])
+            status_label.config(text=f"{len(widths)} widths. Click a cell to use that width.")
+
+        def pick_width(event):
+            if sheet_state["sheet"] is None:
+                return
+            index = contact_sheet_cell_at(event.x / sheet_state["scale"], event.y / sheet_state["scale"],
+                                          sheet_state["columns"], len(sheet_state["widths"]))
+            if index is not None:
+                self.width_var.set(sheet_state["widths"][index]) # Spinbox traces sync the height / preview
+                status_label.config(text=f"Width set to {sheet_state['widths'][index]}.")
+
+        def save_sheet():
+            if sheet_state["sheet"] is None:
+                return
+            file_path = filedialog.asksaveasfilename(parent=dialog, defaultextension=".png", title="Save Contact Sheet As",
+                                                     filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg")])
+            if file_path:
+                Image.fromarray(sheet_state["sheet"]).save(file_path)
+                status_label.config(text=f"Saved {os.path.basename(file_path)}")
+
+        ttk.Button(settings_frame, text="Render", command=render).grid(row=0, column=6, padx=5)
+        ttk.Button(settings_frame, text="Save Sheet...", command=save_sheet).grid(row=0, column=7, padx=5)
+        canvas.bind("<Button-1>", pick_width)
+        dialog.after(50, render)
+    # --- End Width Contact Sheet Dialog ---
+
     def apply_resize(self):
         """Called when the 'Apply Resize' button is clicked."""
         self._process_and_display_current_values()
@@ -791,12 +1618,503 @@ class ImageResizerApp:
 
 
     def on_canvas_resize(self, event):
-        """Callback for when the canvas is resized, to redraw the image."""
-        if self.display_image_pil is not None:
+        """
+        Callback for when the canvas is resized. Redraws are throttled: while the window edge
+        is dragged at most one redraw runs per RESIZE_THROTTLE_MS, and it uses the latest size.
+        """
+        if self.resize_after_id is None:
+            self.resize_after_id = self.master.after(RESIZE_THROTTLE_MS, self._redraw_after_resize)
+
+    def _redraw_after_resize(self):
+        self.resize_after_id = None
+        if self.preview_dirty and self.preview_image_pil is not None:
+            self._draw_on_canvas(self.preview_image_pil)
+        elif self.display_image_pil is not None:
             self.display_image(self.display_image_pil)
 
+# --- Streaming Pixel Wrap (images larger than RAM) ---
+STREAM_STRIP_PIXELS = 1 << 22 # Output pixels produced per strip (~12 MB for RGB)
+STREAM_INPUT_EXTENSIONS = (".npy", ".ppm", ".pgm", ".pnm") # Formats open_image_rows can memory-map
+
+def open_image_rows(path):
+    """
+    Memory-maps an image as an (H, W, C) uint8 array, so rows are only paged in as they are
+    sliced: .npy files and binary PPM/PGM (P6/P5). Compressed formats (PNG, TIFF, JPEG, ...)
+    would have to be decoded whole, so they raise ValueError instead.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        image_np = np.load(path, mmap_mode="r")
+        if image_np.dtype != np.uint8 or image_np.ndim not in (2, 3):
+            raise ValueError(f"Only 8-bit (H, W) or (H, W, C) arrays are supported: {path}")
+        return image_np if image_np.ndim == 3 else image_np[:, :, None]
+    if extension in (".ppm", ".pgm", ".pnm"):
+        with open(path, "rb") as f:
+            magic = f.read(2)
+            fields = []
+            while len(fields) < 3: # width, height, maxval (skipping # comments)
+                line = f.readline()
+                if not line:
+                    raise ValueError(f"Truncated PNM header in {path}")
+                fields += line.split(b"#")[0].split()
+            offset = f.tell()
+        if magic not in (b"P6", b"P5") or int(fields[2]) != 255:
+            raise ValueError(f"Only 8-bit binary PPM/PGM can be memory-mapped: {path}")
+        width, height = int(fields[0]), int(fields[1])
+        channels = 3 if magic == b"P6" else 1
+        return np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(height, width, channels))
+    raise ValueError(f"Streaming needs a .npy or binary PPM/PGM input, {extension or 'this file'} cannot be memory-mapped: {path}")
+
+def load_image_rgb(path):
+    """Reads any batch input (Pillow formats, .npy, PPM/PGM) fully into memory as an RGB array."""
+    if not path.lower().endswith(STREAM_INPUT_EXTENSIONS):
+        return np.array(Image.open(path).convert("RGB"))
+    image_np = open_image_rows(path)
+    if image_np.shape[2] == 1:
+        return np.repeat(image_np, 3, axis=2)
+    return np.array(image_np[:, :, :3]) # Drops alpha, like convert("RGB")
+
+class PngStripWriter:
+    """
+    Writes a PNG row strip by row strip: rows are Sub-filtered with numpy and fed through one
+    streaming zlib compressor, so only the current strip is ever held in memory.
+    """
+    COLOR_TYPES = {1: 0, 3: 2, 4: 6} # channels -> PNG colour type (gray, RGB, RGBA)
+
+    def __init__(self, path, width, height, channels, compress_level=6):
+        self.width, self.height, self.channels = width, height, channels
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._file = open(path, "wb")
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, self.COLOR_TYPES[channels], 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack(">I", len(data)) + kind + data)
+        self._file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write_rows(self, rows_np):
+        rows_np = rows_np.reshape(len(rows_np), self.width * self.channels)
+        filtered = np.empty((len(rows_np), 1 + rows_np.shape[1]), dtype=np.uint8)
+        filtered[:, 0] = 1 # Filter type "Sub": each byte minus the byte one pixel to the left
+        filtered[:, 1:] = rows_np
+        filtered[:, 1 + self.channels:] -= rows_np[:, :-self.channels]
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows_written += len(rows_np)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._chunk(b"IDAT", self._compressor.flush())
+        self._chunk(b"IEND", b"")
+        self._file.close()
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG declared {self.height} rows but {self.rows_written} were written")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class PpmStripWriter:
+    """Writes a binary PPM/PGM (uncompressed) row strip by row strip."""
+    def __init__(self, path, width, height, channels):
+        if channels not in (1, 3):
+            raise ValueError("PPM/PGM output supports gray or RGB images only.")
+        self._file = open(path, "wb")
+        self._file.write(b"%s\n%d %d\n255\n" % (b"P6" if channels == 3 else b"P5", width, height))
+
+    def write_rows(self, rows_np):
+        self._file.write(np.ascontiguousarray(rows_np).tobytes())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def stream_pixel_wrap(source_np, target_width, writer, strip_pixels=STREAM_STRIP_PIXELS):
+    """
+    Pixel wraps `source_np` (typically a memory map) into `writer` strip by strip. Output
+    row r holds stream pixels [r * target_width, (r + 1) * target_width), so each strip's
+    source span is computed arithmetically and only the source rows it touches are read.
+    Memory stays at roughly two strips regardless of image size.
+    """
+    source_height, source_width, channels = source_np.shape
+    total_pixels = source_height * source_width
+    new_height = -(-total_pixels // target_width)
+    rows_per_strip = max(1, strip_pixels // target_width)
+
+    for first_row in range(0, new_height, rows_per_strip):
+        last_row = min(first_row + rows_per_strip, new_height)
+        stream_start = first_row * target_width
+        stream_stop = min(last_row * target_width, total_pixels)
+
+        # Source rows covering [stream_start, stream_stop), flattened to a pixel stream
+        source_first = stream_start // source_width
+        source_last = (stream_stop - 1) // source_width + 1
+        span = np.asarray(source_np[source_first:source_last]).reshape(-1, channels)
+        span_offset = stream_start - source_first * source_width
+
+        strip = np.empty(((last_row - first_row) * target_width, channels), dtype=np.uint8)
+        pixel_count = stream_stop - stream_start
+        strip[:pixel_count] = span[span_offset:span_offset + pixel_count]
+        strip[pixel_count:] = 255 # White padding in the final partial row
+        writer.write_rows(strip.reshape(last_row - first_row, target_width, channels))
+
+    return target_width, new_height
+
+def pixel_wrap_file(input_path, output_path, target_width, strip_pixels=STREAM_STRIP_PIXELS):
+    """
+    Low-memory pixel wrap from file to file. Output format follows the extension of
+    output_path: .png (streamed zlib) or .ppm/.pgm (raw). Returns the output size.
+    """
+    if target_width <= 0:
+        raise ValueError("Target width must be greater than 0 for pixel wrapping.")
+    source_np = open_image_rows(input_path)
+    source_height, source_width, channels = source_np.shape
+    new_height = -(-(source_height * source_width) // target_width)
+    print(f"Streaming Pixel Wrap: {source_width}x{source_height} -> {target_width}x{new_height}")
+
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension == ".png":
+        writer = PngStripWriter(output_path, target_width, new_height, channels)
+    elif extension in (".ppm", ".pgm", ".pnm"):
+        writer = PpmStripWriter(output_path, target_width, new_height, channels)
+    else:
+        raise ValueError(f"Streaming output must be .png or .ppm/.pgm, got {extension}")
+    with writer:
+        return stream_pixel_wrap(source_np, target_width, writer, strip_pixels)
+
+# --- Sweep Animation Export ---
+# Make sure ffmpeg is in your system's PATH, or provide the full path, e.g. "C:/ffmpeg/bin/ffmpeg.exe"
+FFMPEG_PATH = 'ffmpeg'
+SWEEP_QUEUE_FRAMES = 4 # Frames buffered between the generator and the encoder thread
+
+def sweep_frame_parameters(frame_count, width_range, x_range=(0.0, 0.0), y_range=(0.0, 0.0)):
+    """Yields (wrap width, x offset, y offset) for every frame, linearly interpolated from start to end."""
+    for frame in range(frame_count):
+        t = frame / (frame_count - 1) if frame_count > 1 else 0.0
+        yield (max(1, round(width_range[0] + (width_range[1] - width_range[0]) * t)),
+               x_range[0] + (x_range[1] - x_range[0]) * t,
+               y_range[0] + (y_range[1] - y_range[0]) * t)
+
+def fit_frame(image_np, frame_width, frame_height, background=255):
+    """Scales image_np to fit inside a fixed video frame (keeping its aspect ratio) and centers it."""
+    height, width = image_np.shape[:2]
+    if (width, height) == (frame_width, frame_height):
+        return np.ascontiguousarray(image_np)
+    scale = min(frame_width / width, frame_height / height)
+    fit_width, fit_height = max(1, int(width * scale)), max(1, int(height * scale))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_NEAREST # Nearest keeps enlarged pixels crisp
+    resized = cv2.resize(np.ascontiguousarray(image_np), (fit_width, fit_height), interpolation=interpolation)
+    frame = np.full((frame_height, frame_width, 3), background, dtype=np.uint8)
+    top, left = (frame_height - fit_height) // 2, (frame_width - fit_width) // 2
+    frame[top:top + fit_height, left:left + fit_width] = resized
+    return frame
+
+def export_sweep_animation(image_np, output_path, frame_count, fps, width_range, x_range=(0.0, 0.0), y_range=(0.0, 0.0),
+                           frame_size=None, order='row', progress_callback=None, cancel_event=None):
+    """
+    Renders a pixel wrap animation where the wrap width and/or the X/Y stream offset sweep
+    linearly over time, and pipes raw RGB frames straight into ffmpeg (no intermediate files).
+    Frames are generated on the calling thread while a worker thread feeds the encoder.
+
+    frame_size defaults to the wrapped size when the width is constant, otherwise to the
+    original image size; every frame is fitted into it. Returns the number of frames written.
+    """
+    total_pixels = image_np.shape[0] * image_np.shape[1]
+    if frame_size is None:
+        if width_range[0] == width_range[1]:
+            frame_size = (width_range[0], -(-total_pixels // width_range[0]))
+        else:
+            frame_size = (image_np.shape[1], image_np.shape[0])
+    # yuv420p needs even dimensions
+    frame_width, frame_height = max(2, frame_size[0] // 2 * 2), max(2, frame_size[1] // 2 * 2)
+
+    cmd = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{frame_width}x{frame_height}", "-r", str(fps), "-i", "-",
+           "-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", "18", "-preset", "medium"]
+    if output_path.lower().endswith(".gif"):
+        cmd = cmd[:cmd.index("-c:v")]
+    cmd.append(output_path)
+    print(f"Sweep Export: {frame_count} frames at {frame_width}x{frame_height} -> {os.path.basename(output_path)}")
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    frames = queue.Queue(maxsize=SWEEP_QUEUE_FRAMES)
+    writer_errors = []
+
+    def encoder_feeder():
+        # Worker thread: writes frames to ffmpeg while the next ones are being generated.
+        # After a pipe error it keeps draining the queue so the generator never blocks.
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            if writer_errors:
+                continue
+            try:
+                process.stdin.write(frame)
+            except OSError as e:
+                writer_errors.append(e)
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+    feeder = threading.Thread(target=encoder_feeder, name="SweepEncoderFeeder", daemon=True)
+    feeder.start()
+
+    frames_written = 0
+    offset_buffer = None
+    log = io.StringIO()
+    try:
+        for width, x_offset, y_offset in sweep_frame_parameters(frame_count, width_range, x_range, y_range):
+            if (cancel_event is not None and cancel_event.is_set()) or writer_errors:
+                break
+            with contextlib.redirect_stdout(log): # Keep the per-frame processing log quiet
+                shifted = apply_pixel_offset('pixel_wrap', image_np, x_offset, y_offset, out=offset_buffer, order=order)
+                if shifted is not image_np:
+                    offset_buffer = shifted
+                wrapped = pixel_wrap_image(shifted, width, order)
+            frames.put(fit_frame(wrapped, frame_width, frame_height).tobytes())
+            frames_written += 1
+            if progress_callback is not None:
+                progress_callback(frames_written, frame_count)
+    finally:
+        frames.put(None)
+        feeder.join()
+        stderr = process.stderr.read().decode(errors="replace")
+        return_code = process.wait()
+
+    if return_code != 0 or writer_errors:
+        raise RuntimeError(f"ffmpeg failed: {stderr.strip() or writer_errors}")
+    return frames_written
+
+# --- Multi-Width Contact Sheet ---
+CONTACT_SHEET_CELL = 192        # Longest side of every thumbnail
+CONTACT_SHEET_LABEL = 18        # Height of the width caption under each thumbnail
+CONTACT_SHEET_GAP = 6           # Space between cells
+CONTACT_SHEET_BACKGROUND = 64   # Dark gray, so the white wrap padding stays visible
+CONTACT_SHEET_MAX_CELLS = 400
+
+def contact_sheet_widths(start_width, end_width, step):
+    """Candidate widths from start_width to end_width (inclusive) every `step` pixels."""
+    if min(start_width, end_width, step) <= 0:
+        raise ValueError("Widths and step must be greater than 0.")
+    start_width, end_width = sorted((start_width, end_width))
+    widths = list(range(start_width, end_width + 1, step))
+    if len(widths) > CONTACT_SHEET_MAX_CELLS:
+        raise ValueError(f"{len(widths)} widths requested, the contact sheet is limited to {CONTACT_SHEET_MAX_CELLS}.")
+    return widths
+
+def contact_sheet_cell_at(x, y, columns, cell_count, cell_size=CONTACT_SHEET_CELL):
+    """Maps a pixel position on the sheet to a cell index, or None when it falls on a gap or past the last cell."""
+    pitch_x, pitch_y = cell_size + CONTACT_SHEET_GAP, cell_size + CONTACT_SHEET_LABEL + CONTACT_SHEET_GAP
+    column, row = int(x - CONTACT_SHEET_GAP) // pitch_x, int(y - CONTACT_SHEET_GAP) // pitch_y
+    if x < CONTACT_SHEET_GAP or y < CONTACT_SHEET_GAP or column >= columns:
+        return None
+    index = row * columns + column
+    return index if index < cell_count else None
+
+def _render_contact_cell(sheet, padded_stream, total_pixels, width, top, left, cell_size, order):
+    """Thread-pool worker: wraps the shared stream at `width` and writes a strided thumbnail into its own cell."""
+    height = -(-total_pixels // width)
+    step = max(1, -(-max(width, height) // cell_size)) # Decimate by striding, like the realtime preview
+    if order == 'row':
+        thumbnail = padded_stream[:height * width].reshape(height, width, -1)[::step, ::step]
+    else:
+        # Only the thumbnail's pixels are placed, no full-size permutation per width
+        thumbnail = decimated_pixel_wrap(padded_stream, total_pixels, width, step, order)
+    thumb_height, thumb_width = thumbnail.shape[:2]
+    y, x = top + (cell_size - thumb_height) // 2, left + (cell_size - thumb_width) // 2
+    sheet[y:y + thumb_height, x:x + thumb_width] = thumbnail
+    cv2.putText(sheet, f"{width} x {height}", (left + 2, top + cell_size + CONTACT_SHEET_LABEL - 5),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+
+def build_contact_sheet(image_np, widths, cell_size=CONTACT_SHEET_CELL, columns=None, order='row', max_workers=None):
+    """
+    Renders one thumbnail per candidate wrap width into a single grid image.
+    The image is flattened once into a shared read-only stream; thread-pool workers wrap it
+    (a reshape view in row order, decimated_pixel_wrap otherwise) and decimate straight
+    into their cell of the sheet.
+    Returns (sheet, columns).
+    """
+    widths = list(widths)
+    if not widths:
+        raise ValueError("No widths to render.")
+    if min(widths) <= 0:
+        raise ValueError("Target width must be greater than 0 for pixel wrapping.")
+    start_time = time.perf_counter()
+    columns = columns or int(np.ceil(np.sqrt(len(widths))))
+    rows = -(-len(widths) // columns)
+    pitch_x, pitch_y = cell_size + CONTACT_SHEET_GAP, cell_size + CONTACT_SHEET_LABEL + CONTACT_SHEET_GAP
+    sheet = np.full((rows * pitch_y + CONTACT_SHEET_GAP, columns * pitch_x + CONTACT_SHEET_GAP, 3),
+                    CONTACT_SHEET_BACKGROUND, dtype=np.uint8)
+
+    total_pixels, padded_stream = padded_pixel_stream(image_np, max(widths), order)
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(_render_contact_cell, sheet, padded_stream, total_pixels, width,
+                                   CONTACT_SHEET_GAP + (index // columns) * pitch_y,
+                                   CONTACT_SHEET_GAP + (index % columns) * pitch_x, cell_size, order)
+                   for index, width in enumerate(widths)]
+        for future in futures:
+            future.result() # Re-raise worker errors
+
+    print(f"Contact Sheet: {len(widths)} widths rendered in {time.perf_counter() - start_time:.2f}s")
+    return sheet, columns
+
+# --- Headless Batch Command Line ---
+BATCH_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp", ".ppm", ".pgm", ".npy")
+BATCH_MODES = ('pixel_wrap', 'preserve', 'aspect')
+
+def collect_batch_inputs(patterns):
+    """Expands directories and glob patterns into a sorted list of image files."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        files.update(path for path in candidates
+                     if os.path.isfile(path) and path.lower().endswith(BATCH_IMAGE_EXTENSIONS))
+    return sorted(files)
+
+def batch_output_paths(inputs, output_dir, extension):
+    """
+    Pairs every input with output_dir/<path relative to the inputs' common folder>.<extension>,
+    so same-named files from different folders do not overwrite each other. Inputs that only
+    differ by extension (big.npy, big.ppm) keep it in the name (big_npy.png, big_ppm.png).
+    Raises ValueError if two inputs would still end up in the same output file.
+    """
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in inputs])
+    stems = [os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] for path in inputs]
+    stem_counts = {}
+    for stem in stems:
+        stem_counts[os.path.normcase(stem)] = stem_counts.get(os.path.normcase(stem), 0) + 1
+
+    pairs = []
+    claimed = {} # Normalized output path -> input that writes it
+    for input_path, stem in zip(inputs, stems):
+        if stem_counts[os.path.normcase(stem)] > 1:
+            stem += "_" + os.path.splitext(input_path)[1].lstrip(".").lower()
+        output_path = os.path.join(output_dir, f"{stem}.{extension}")
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in claimed:
+            raise ValueError(f"{claimed[key]} and {input_path} would both be written to {output_path}")
+        claimed[key] = input_path
+        pairs.append((input_path, output_path))
+    return pairs
+
+def batch_target_size(mode, image_width, image_height, target_width, target_height):
+    """Resolves the output size for a mode, deriving the height the same way the GUI spinboxes do."""
+    if mode == 'pixel_wrap' or (mode == 'preserve' and not target_height):
+        return target_width, int(np.ceil(image_width * image_height / target_width))
+    if mode == 'aspect' and not target_height:
+        return target_width, max(1, int(target_width / (image_width / image_height)))
+    return target_width, target_height
+
+def process_batch_file(input_path, output_path, mode, target_width, target_height, x_offset, y_offset, verbose=False,
+                       streaming=False, order='row'):
+    """
+    Process-pool worker: loads one image, applies the offset and the selected mode, saves the result.
+    Returns (input_path, output size). Only module-level functions are used, so it pickles cleanly.
+    """
+    log = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with log:
+        if streaming:
+            return input_path, pixel_wrap_file(input_path, output_path, target_width)
+        image_np = load_image_rgb(input_path)
+        height, width = image_np.shape[:2]
+        target_width, target_height = batch_target_size(mode, width, height, target_width, target_height)
+        image_after_offset = apply_pixel_offset(mode, image_np, x_offset, y_offset, order=order)
+        processed_image_np = process_image_for_mode(mode, image_after_offset, target_width, target_height, order)
+        Image.fromarray(processed_image_np).save(output_path)
+    return input_path, processed_image_np.shape[1::-1]
+
+def run_batch_cli(argv):
+    """Applies pixel wrap / stream shift / seam carving / aspect resize to many images without a display."""
+    parser = argparse.ArgumentParser(prog="pixelwrap.py",
+                                     description="Headless batch mode. Run without arguments for the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns (quote globs)")
+    parser.add_argument("-o", "--output-dir", required=True, help="Folder for the processed images")
+    parser.add_argument("--mode", choices=BATCH_MODES, default='pixel_wrap',
+                        help="pixel_wrap (text flow), preserve (seam carve) or aspect (scale)")
+    parser.add_argument("--width", type=int, required=True, help="Target width")
+    parser.add_argument("--height", type=int, default=0,
+                        help="Target height (ignored for pixel_wrap, derived from the pixel count or aspect ratio if omitted)")
+    parser.add_argument("--x-offset", type=float, default=0.0, help="Fractional X offset")
+    parser.add_argument("--y-offset", type=float, default=0.0, help="Fractional Y offset")
+    parser.add_argument("--order", choices=STREAM_ORDERS, default='row', help="Pixel stream order for pixel_wrap")
+    parser.add_argument("--format", default="png", help="Output file extension (default: png)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Low-memory strip-by-strip pixel wrap for images larger than RAM "
+                             "(pixel_wrap without offsets, .npy/.ppm/.pgm inputs, .png/.ppm output)")
+    parser.add_argument("--force", action="store_true", help="Reprocess even if the output is newer than the input")
+    parser.add_argument("--verbose", action="store_true", help="Show the per-image processing log")
+    args = parser.parse_args(argv)
+
+    if args.width <= 0:
+        parser.error("--width must be greater than 0")
+    if args.stream and (args.mode != 'pixel_wrap' or args.x_offset or args.y_offset or args.order != 'row'):
+        parser.error("--stream only supports --mode pixel_wrap in row order without offsets")
+    inputs = collect_batch_inputs(args.inputs)
+    if not inputs:
+        print("No input images found.")
+        return 1
+    if args.stream:
+        unmappable = [path for path in inputs if not path.lower().endswith(STREAM_INPUT_EXTENSIONS)]
+        if unmappable:
+            print(f"--stream reads inputs without decoding them whole, which only works for "
+                  f"{'/'.join(STREAM_INPUT_EXTENSIONS)} files. Convert or leave out: {', '.join(unmappable)}")
+            return 1
+    try:
+        pairs = batch_output_paths(inputs, args.output_dir, args.format.lstrip('.'))
+    except ValueError as e: # Name clash, or inputs on different drives
+        print(f"Cannot map the inputs to output files: {e}")
+        return 1
+
+    jobs = []
+    skipped = 0
+    for input_path, output_path in pairs:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        # Skip inputs whose output is already up to date, so interrupted runs can be resumed
+        if (not args.force and os.path.exists(output_path)
+                and os.path.getmtime(output_path) >= os.path.getmtime(input_path)):
+            skipped += 1
+            continue
+        jobs.append((input_path, output_path))
+
+    print(f"{len(jobs)} image(s) to process, {skipped} up to date, {args.workers} worker(s)")
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_batch_file, input_path, output_path, args.mode, args.width, args.height,
+                                   args.x_offset, args.y_offset, args.verbose, args.stream, args.order): input_path
+                   for input_path, output_path in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                input_path, (out_width, out_height) = future.result()
+                print(f"[{done}/{len(jobs)}] {os.path.basename(input_path)} -> {out_width}x{out_height}")
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(jobs)}] FAILED {os.path.basename(futures[future])}: {e}")
+
+    print(f"Done: {len(jobs) - failed} written, {skipped} skipped, {failed} failed.")
+    return 1 if failed else 0
+
 # --- Main execution ---
 if __name__ == "__main__":
+    # Any command line arguments select the headless batch mode
+    if len(sys.argv) > 1:
+        sys.exit(run_batch_cli(sys.argv[1:]))
+
     root = tk.Tk()
     
     # Check and install necessary packages before running the app
@@ -0,0 +1,503 @@
+import threading
+import time
+import argparse
+import numpy as np
+import cv2
+
+# Rank given to pixels that no computed seam has removed yet
+NOT_REMOVED = np.iinfo(np.int32).max
+
+# Extra energy for protected pixels / removed objects (same values as the seam_carving package)
+KEEP_MASK_ENERGY = 1e3
+DROP_MASK_ENERGY = 1e5
+
+ENERGY_MODES = ("backward", "forward")
+
+# Largest enlargement done in one go, as a fraction of the width (seam_carving's step_ratio);
+# bigger ones continue on the enlarged image with a freshly computed seam order
+INSERT_STEP_RATIO = 0.5
+
+# Widths whose horizontal seam order is kept when both dimensions change (e.g. while a slider moves)
+HORIZONTAL_CACHE_WIDTHS = 4
+
+class SeamCarvingCancelled(Exception):
+    """Raised when a cancel_event is set while seams are being computed."""
+
+# --- Energy and Seam Search ---
+def rgb_to_gray(image_np):
+    """Luma as float32, computed like the seam_carving package (including its cast back to the input dtype)."""
+    if image_np.ndim == 2:
+        return image_np.astype(np.float32)
+    gray = image_np @ np.array([0.2125, 0.7154, 0.0721], dtype=np.float32)
+    return gray.astype(image_np.dtype).astype(np.float32)
+
+def backward_energy(gray):
+    """
+    Gradient magnitude |dx| + |dy| (Sobel), the seam_carving package's "backward" energy.
+    OpenCV runs the filters multi-threaded and without holding the GIL.
+    """
+    grad_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3, borderType=cv2.BORDER_REFLECT)
+    grad_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3, borderType=cv2.BORDER_REFLECT)
+    return np.abs(grad_x) + np.abs(grad_y)
+
+def update_backward_energy(energy, gray, seam):
+    """
+    Recomputes the backward energy only in the column band around a seam that was just
+    removed from `energy` and `gray` (both already compacted). The 3x3 Sobel support means
+    pixels further than two columns from the seam keep their energy.
+    """
+    width = gray.shape[1]
+    lo = max(0, int(seam.min()) - 2)
+    hi = min(width, int(seam.max()) + 2)
+    if lo >= hi:
+        return energy
+    # One extra column on each side gives the filters their real neighbours instead of a reflected border
+    pad_lo = 1 if lo > 0 else 0
+    pad_hi = 1 if hi < width else 0
+    band = backward_energy(np.ascontiguousarray(gray[:, lo - pad_lo:hi + pad_hi]))
+    energy[:, lo:hi] = band[:, pad_lo:band.shape[1] - pad_hi]
+    return energy
+
+def find_vertical_seam(energy):
+    """
+    Minimum-cost vertical seam through an energy map (H, W).
+    Returns an int array with the seam's column in every row.
+    """
+    height, width = energy.shape
+    # Cost row padded with +inf on both sides so the left/right neighbours are plain slices
+    cost = np.full(width + 2, np.inf, dtype=np.float32)
+    cost[1:-1] = energy[0]
+    parent_offset = np.zeros((height, width), dtype=np.int8)
+
+    for row in range(1, height):
+        left, mid, right = cost[:-2], cost[1:-1], cost[2:]
+        best = np.minimum(left, mid)
+        offset = np.where(left <= mid, -1, 0) # Ties resolve left, mid, right like np.argmin
+        offset = np.where(right < best, 1, offset)
+        np.minimum(best, right, out=best)
+        parent_offset[row] = offset
+        cost[1:-1] = best + energy[row]
+
+    return _backtrack_seam(parent_offset, cost[1:-1])
+
+def find_vertical_seam_forward(gray, aux_energy=None):
+    """
+    Minimum vertical seam using "forward" energy (Rubinstein et al.): the cost of a step is
+    the new gradient its removal would create between the pixels that become neighbours.
+    Each row is one set of vectorized numpy ops over the whole width.
+    """
+    height, width = gray.shape
+    padded = np.empty((height, width + 2), dtype=np.float32)
+    padded[:, 1:-1] = gray
+    padded[:, 0] = gray[:, 0]
+    padded[:, -1] = gray[:, -1]
+
+    cost = np.full(width + 2, np.inf, dtype=np.float32)
+    cost[1:-1] = np.abs(padded[0, 2:] - padded[0, :-2])
+    if aux_energy is not None:
+        cost[1:-1] += aux_energy[0]
+    parent_offset = np.zeros((height, width), dtype=np.int8)
+
+    for row in range(1, height):
+        current_left, current_right = padded[row, :-2], padded[row, 2:]
+        previous_mid = padded[row - 1, 1:-1]
+        cost_mid = np.abs(current_right - current_left)
+        if aux_energy is not None:
+            cost_mid += aux_energy[row]
+        from_left = cost[:-2] + cost_mid + np.abs(previous_mid - current_left)
+        from_mid = cost[1:-1] + cost_mid
+        from_right = cost[2:] + cost_mid + np.abs(previous_mid - current_right)
+
+        best = np.minimum(from_left, from_mid)
+        offset = np.where(from_left <= from_mid, -1, 0) # Ties resolve left, mid, right like np.argmin
+        offset = np.where(from_right < best, 1, offset)
+        np.minimum(best, from_right, out=best)
+        parent_offset[row] = offset
+        cost[1:-1] = best
+
+    return _backtrack_seam(parent_offset, cost[1:-1])
+
+def _backtrack_seam(parent_offset, last_row_cost):
+    height = parent_offset.shape[0]
+    seam = np.empty(height, dtype=np.intp)
+    column = int(np.argmin(last_row_cost))
+    for row in range(height - 1, -1, -1):
+        seam[row] = column
+        column += int(parent_offset[row, column])
+    return seam
+
+# --- Seam Order (rank map) ---
+class SeamOrder:
+    """
+    Vertical seam removal order of one image, stored as an integer rank map:
+    rank[y, x] is the index of the seam that removes pixel (y, x), or NOT_REMOVED.
+    Seams are computed on demand and never recomputed, so any width up to the
+    number of computed seams is one mask-and-compact away.
+    aux_energy (e.g. from keep/drop masks) is added to the energy of every pixel.
+    """
+    def __init__(self, gray, energy_mode="backward", aux_energy=None):
+        if energy_mode not in ENERGY_MODES:
+            raise ValueError(f"energy_mode must be one of {ENERGY_MODES}, got {energy_mode!r}")
+        self.energy_mode = energy_mode
+        self.height, self.width = gray.shape
+        self.aux_energy = aux_energy
+        self.rank = np.full((self.height, self.width), NOT_REMOVED, dtype=np.int32)
+        self.seams_computed = 0
+        # Carving state: the current (partially carved) gray image and, for each of its
+        # pixels, the column it came from in the original
+        self._gray = np.ascontiguousarray(gray, dtype=np.float32)
+        self._columns = np.broadcast_to(np.arange(self.width, dtype=np.int32), (self.height, self.width))
+        self._aux = None if aux_energy is None else np.ascontiguousarray(aux_energy, dtype=np.float32)
+        self._energy = None # Backward energy of the current state, updated locally after each seam
+        self._lock = threading.Lock()
+
+    @property
+    def max_seams(self):
+        """A row always keeps at least one pixel."""
+        return self.width - 1
+
+    def ensure(self, seam_count, progress_callback=None, cancel_event=None):
+        """
+        Computes seams until at least seam_count (capped at max_seams) are ranked.
+        progress_callback(seams_computed) is called after every new seam. Setting cancel_event
+        raises SeamCarvingCancelled between seams; the seams computed so far are kept and reused.
+        """
+        seam_count = min(seam_count, self.max_seams)
+        with self._lock:
+            rows = np.arange(self.height)
+            while self.seams_computed < seam_count:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise SeamCarvingCancelled(f"Cancelled after {self.seams_computed} of {seam_count} seams")
+                current_width = self._gray.shape[1]
+                seam = self._find_seam()
+                self.rank[rows, self._columns[rows, seam]] = self.seams_computed
+
+                keep = np.ones((self.height, current_width), dtype=bool)
+                keep[rows, seam] = False
+                new_shape = (self.height, current_width - 1)
+                self._gray = self._gray[keep].reshape(new_shape)
+                self._columns = self._columns[keep].reshape(new_shape)
+                if self._aux is not None:
+                    self._aux = self._aux[keep].reshape(new_shape)
+                if self._energy is not None:
+                    self._energy = self._energy[keep].reshape(new_shape)
+                    self._update_energy(seam)
+                self.seams_computed += 1
+                if progress_callback is not None:
+                    progress_callback(self.seams_computed)
+
+    def _find_seam(self):
+        if self.energy_mode == "forward":
+            return find_vertical_seam_forward(self._gray, self._aux)
+        if self._energy is None:
+            self._energy = backward_energy(self._gray)
+            if self._aux is not None:
+                self._energy += self._aux
+        return find_vertical_seam(self._energy)
+
+    def _update_energy(self, seam):
+        update_backward_energy(self._energy, self._gray, seam)
+        if self._aux is not None:
+            lo = max(0, int(seam.min()) - 2)
+            hi = min(self._gray.shape[1], int(seam.max()) + 2)
+            self._energy[:, lo:hi] += self._aux[:, lo:hi]
+
+    def carve(self, image_np, target_width):
+        """
+        Removes or inserts vertical seams in image_np (which must be the image this order
+        was computed for, or an array aligned with it) to reach target_width, using one
+        vectorized mask. Insertion is limited to one step, see carve_width for more.
+        """
+        delta = target_width - self.width
+        if delta == 0:
+            return image_np
+        if target_width <= 0:
+            raise ValueError("Target width must be greater than 0 for seam carving.")
+
+        if delta < 0:
+            self.ensure(-delta)
+            keep = self.rank >= -delta # Exactly target_width pixels per row survive
+            return image_np[keep].reshape((self.height, target_width) + image_np.shape[2:])
+
+        if delta > expansion_step(self.width, delta):
+            raise ValueError(f"Cannot insert {delta} seams into width {self.width} in one step.")
+        self.ensure(delta)
+        return insert_seams(image_np, self.rank < delta)
+
+def expansion_step(width, delta):
+    """Seams inserted in the next enlargement step (all of delta if it fits in one)."""
+    return min(delta, max(1, round(INSERT_STEP_RATIO * width)))
+
+def insert_seams(image_np, seam_mask):
+    """
+    Inserts a pixel left of every seam pixel in seam_mask (H, W), averaged from that pixel
+    and its left neighbour, the way seam_carving enlarges images (float32, then truncated).
+    """
+    height, width = seam_mask.shape
+    repeats = 1 + seam_mask.ravel().astype(np.intp)
+    flat = image_np.reshape((height * width,) + image_np.shape[2:])
+    result = np.repeat(flat, repeats, axis=0)
+
+    rows, columns = np.nonzero(seam_mask)
+    seam_pixels = rows * width + columns
+    left_pixels = rows * width + np.maximum(columns - 1, 0)
+    inserted_at = np.cumsum(repeats)[seam_pixels] - 2 # First of the two copies
+    average = (flat[left_pixels].astype(np.float32) + flat[seam_pixels].astype(np.float32)) / 2
+    result[inserted_at] = average.astype(image_np.dtype)
+    return result.reshape((height, width + int(seam_mask[0].sum())) + image_np.shape[2:])
+
+def carve_width(order, image_np, aux_energy, target_width, cancel_event=None):
+    """
+    Carves image_np (and its aux energy, which may be None) to target_width with `order`.
+    Enlargements bigger than one step go on with a new order of the enlarged image.
+    Returns (image, aux_energy).
+    """
+    while True:
+        step_width = target_width
+        if target_width > order.width:
+            step_width = order.width + expansion_step(order.width, target_width - order.width)
+        order.ensure(abs(step_width - order.width), cancel_event=cancel_event)
+        image_np = order.carve(image_np, step_width)
+        if aux_energy is not None:
+            aux_energy = order.carve(aux_energy, step_width)
+        if step_width == target_width:
+            return image_np, aux_energy
+        order = SeamOrder(rgb_to_gray(image_np), order.energy_mode, aux_energy)
+
+# --- Seam Carving Engine ---
+class SeamCarver:
+    """
+    Seam-carving engine for one image. The vertical and horizontal seam removal orders
+    are computed once (incrementally, as far as requested) and cached as rank maps;
+    after that any target size is produced by mask-and-compact in milliseconds.
+
+    Like sc.resize "width-first", the height is carved on the width-carved image, so its
+    horizontal seam order depends on the target width; the orders of the last
+    HORIZONTAL_CACHE_WIDTHS widths are kept.
+    resize(..., exact=False) is the interactive preview path: it uses one horizontal order
+    of the original image for every width instead (see approximate_horizontal_order).
+
+    keep_mask protects its pixels from removal, drop_mask makes seams go through its
+    pixels first (both are (H, W) boolean arrays).
+    """
+    def __init__(self, image_np, energy_mode="backward", keep_mask=None, drop_mask=None):
+        self.image_np = image_np
+        self.energy_mode = energy_mode
+        self.aux_energy = mask_energy(image_np.shape[:2], keep_mask, drop_mask)
+        self.vertical = SeamOrder(rgb_to_gray(image_np), energy_mode, self.aux_energy)
+        self._horizontal = {} # target width -> (carved image, its aux energy, horizontal SeamOrder), oldest first
+        self._horizontal_lock = threading.Lock()
+        self._original_horizontal = None # Horizontal SeamOrder of the uncarved image, for previews
+
+    def seams_needed(self, target_width, target_height):
+        """(vertical, horizontal) number of seams a resize to this size needs ranked (first enlargement step only)."""
+        height, width = self.image_np.shape[:2]
+        vertical = target_width - width
+        horizontal = target_height - height
+        return (expansion_step(width, vertical) if vertical > 0 else min(-vertical, width - 1),
+                expansion_step(height, horizontal) if horizontal > 0 else min(-horizontal, height - 1))
+
+    def horizontal_order(self, target_width, cancel_event=None):
+        """
+        (width-carved image, its aux energy, SeamOrder of the image's rows) for target_width.
+        The order is computed on the carved image itself, the way sc.resize carves the height.
+        """
+        with self._horizontal_lock:
+            cached = self._horizontal.pop(target_width, None)
+            if cached is None:
+                carved, aux = carve_width(self.vertical, self.image_np, self.aux_energy, target_width, cancel_event)
+                carved_t = carved.swapaxes(0, 1)
+                aux_t = None if aux is None else aux.T
+                cached = (carved_t, aux_t, SeamOrder(rgb_to_gray(carved_t), self.energy_mode, aux_t))
+            self._horizontal[target_width] = cached
+            while len(self._horizontal) > HORIZONTAL_CACHE_WIDTHS:
+                del self._horizontal[next(iter(self._horizontal))]
+            return cached
+
+    def approximate_horizontal_order(self):
+        """
+        SeamOrder of the original image's rows, computed once for all target widths.
+        Its ranks are carried through the width carve, which only approximates carving the
+        height on the width-carved image, but a new width costs no new seam search.
+        """
+        with self._horizontal_lock:
+            if self._original_horizontal is None:
+                aux_t = None if self.aux_energy is None else self.aux_energy.T
+                self._original_horizontal = SeamOrder(rgb_to_gray(self.image_np).T, self.energy_mode, aux_t)
+            return self._original_horizontal
+
+    def _is_approximable(self, target_width, target_height):
+        """The preview path needs a single width carve and a single height step."""
+        height, width = self.image_np.shape[:2]
+        return (target_width <= width and target_height != height and
+                target_height - height <= expansion_step(height, target_height - height))
+
+    def prepare(self, target_width, target_height, progress_callback=None, cancel_event=None, exact=True):
+        """
+        Computes (only) the seams that are still missing for a resize to this size.
+        progress_callback(done, total) counts seams over both directions, including the
+        ones already cached, so a further shrink starts from where the last one stopped.
+        """
+        vertical_needed, horizontal_needed = self.seams_needed(target_width, target_height)
+        total = vertical_needed + horizontal_needed
+
+        def report_vertical(done):
+            progress_callback(min(done, vertical_needed), total)
+
+        def report_horizontal(done):
+            progress_callback(vertical_needed + min(done, horizontal_needed), total)
+
+        self.vertical.ensure(vertical_needed, progress_callback and report_vertical, cancel_event)
+        if target_height != self.image_np.shape[0]:
+            if not exact and self._is_approximable(target_width, target_height):
+                horizontal = self.approximate_horizontal_order()
+            else:
+                horizontal = self.horizontal_order(target_width, cancel_event)[2]
+            if progress_callback is not None:
+                report_horizontal(horizontal.seams_computed)
+            horizontal.ensure(horizontal_needed, progress_callback and report_horizontal, cancel_event)
+        if progress_callback is not None:
+            progress_callback(total, total)
+
+    def resize(self, target_width, target_height, progress_callback=None, cancel_event=None, exact=True):
+        """
+        Seam carves the image to target_width x target_height. exact=False trades accuracy for
+        speed when both dimensions change (for previews): the height is carved with
+        approximate_horizontal_order instead of a seam search on every new width.
+        """
+        height, width = self.image_np.shape[:2]
+        if target_width <= 0 or target_height <= 0:
+            raise ValueError("Target dimensions must be greater than 0 for seam carving.")
+        self.prepare(target_width, target_height, progress_callback, cancel_event, exact)
+
+        # Width first, then height (same order as the old "width-first" sc.resize call)
+        if target_height == height:
+            return carve_width(self.vertical, self.image_np, self.aux_energy, target_width, cancel_event)[0]
+        if not exact and self._is_approximable(target_width, target_height):
+            return self._approximate_resize(target_width, target_height)
+        carved_t, aux_t, horizontal = self.horizontal_order(target_width, cancel_event)
+        result = carve_width(horizontal, carved_t, aux_t, target_height, cancel_event)[0]
+        return np.ascontiguousarray(result.swapaxes(0, 1))
+
+    def _approximate_resize(self, target_width, target_height):
+        """
+        Carves the width exactly, then removes (or duplicates) the pixels of each carved
+        column with the lowest ranks in the original image's horizontal order.
+        """
+        height = self.image_np.shape[0]
+        delta = target_height - height
+        carved_t = self.vertical.carve(self.image_np, target_width).swapaxes(0, 1)
+        ranks_t = self.vertical.carve(self.approximate_horizontal_order().rank.T, target_width).T
+
+        # A carved column mixes pixels of several original columns, so take its |delta| lowest
+        # ranks instead of rank < |delta| to change every column by the same amount
+        lowest = np.argpartition(ranks_t, abs(delta) - 1, axis=1)[:, :abs(delta)]
+        seam_mask = np.zeros(ranks_t.shape, dtype=bool)
+        np.put_along_axis(seam_mask, lowest, True, axis=1)
+        if delta > 0:
+            result = insert_seams(carved_t, seam_mask)
+        else:
+            result = carved_t[~seam_mask].reshape((target_width, target_height) + carved_t.shape[2:])
+        return np.ascontiguousarray(result.swapaxes(0, 1))
+
+def mask_energy(shape, keep_mask=None, drop_mask=None):
+    """Builds the auxiliary energy for keep/drop masks, or None when there are no masks."""
+    if keep_mask is None and drop_mask is None:
+        return None
+    aux_energy = np.zeros(shape, dtype=np.float32)
+    for mask, energy in ((keep_mask, KEEP_MASK_ENERGY), (drop_mask, -DROP_MASK_ENERGY)):
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != tuple(shape):
+                raise ValueError(f"Mask shape {mask.shape} does not match the image {tuple(shape)}")
+            aux_energy[mask] += energy
+    return aux_energy
+
+def remove_object(image_np, drop_mask, keep_mask=None, energy_mode="backward"):
+    """
+    Removes the drop_mask region by carving vertical seams through it until none of its
+    pixels remain, then inserts seams to restore the original width.
+    """
+    drop_mask = np.asarray(drop_mask, dtype=bool)
+    height, width = image_np.shape[:2]
+    order = SeamOrder(rgb_to_gray(image_np), energy_mode, mask_energy((height, width), keep_mask, drop_mask))
+
+    seam_count = int(drop_mask.sum(axis=1).max())
+    order.ensure(seam_count)
+    while seam_count < order.max_seams and (order.rank[drop_mask] >= seam_count).any():
+        seam_count += 1
+        order.ensure(seam_count)
+    print(f"Seam Carving: removed object with {seam_count} seams")
+
+    carved = order.carve(image_np, width - seam_count)
+    carved_keep = None if keep_mask is None else order.carve(np.asarray(keep_mask, dtype=bool), width - seam_count)
+    return SeamCarver(carved, energy_mode, keep_mask=carved_keep).resize(width, height)
+
+_carver_cache = []
+_carver_cache_lock = threading.Lock()
+CARVER_CACHE_SIZE = 2 # e.g. the full-resolution image and a preview proxy
+
+def get_seam_carver(image_np, energy_mode="backward"):
+    """Returns the cached SeamCarver for this exact array object, creating it if needed."""
+    with _carver_cache_lock:
+        for cached in _carver_cache:
+            if cached.image_np is image_np and cached.energy_mode == energy_mode:
+                _carver_cache.remove(cached)
+                _carver_cache.insert(0, cached)
+                return cached
+        carver = SeamCarver(image_np, energy_mode)
+        _carver_cache.insert(0, carver)
+        del _carver_cache[CARVER_CACHE_SIZE:]
+        return carver
+
+# --- Benchmark ---
+def make_benchmark_image(megapixels, seed=0):
+    """Smooth random 3:2 RGB test image of roughly the given size."""
+    width = int(np.sqrt(megapixels * 1e6 * 1.5))
+    height = int(width / 1.5)
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (max(2, height // 32), max(2, width // 32), 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+def benchmark(megapixels=(4, 12, 24), seams=20, energy_mode="backward"):
+    """
+    Times removing `seams` vertical seams with SeamCarver and with sc.resize (when the
+    seam_carving package is installed), plus a second, cached SeamCarver resize.
+    """
+    try:
+        import seam_carving as sc
+    except ImportError:
+        sc = None
+        print("seam_carving package not installed, timing the in-house carver only")
+
+    print(f"{'size':>12} {'seams':>6} {'SeamCarver':>11} {'cached':>8} {'sc.resize':>10}")
+    for mp in megapixels:
+        image_np = make_benchmark_image(mp)
+        height, width = image_np.shape[:2]
+
+        start = time.perf_counter()
+        carver = SeamCarver(image_np, energy_mode)
+        ours = carver.resize(width - seams, height)
+        ours_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        carver.resize(width - seams // 2, height)
+        cached_time = time.perf_counter() - start
+
+        sc_text = "n/a"
+        if sc is not None:
+            start = time.perf_counter()
+            theirs = sc.resize(image_np, (width - seams, height), energy_mode=energy_mode, order="width-first")
+            sc_text = f"{time.perf_counter() - start:9.2f}s"
+            if theirs.shape != ours.shape or not np.array_equal(theirs, ours):
+                sc_text += " (differs)"
+
+        print(f"{f'{width}x{height}':>12} {seams:>6} {ours_time:10.2f}s {cached_time * 1000:6.1f}ms {sc_text:>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the in-house seam carver against seam_carving.resize")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[4, 12, 24])
+    parser.add_argument("--seams", type=int, default=20)
+    parser.add_argument("--energy-mode", choices=ENERGY_MODES, default="backward")
+    args = parser.parse_args()
+    benchmark(args.megapixels, args.seams, args.energy_mode)
@@ -1,11 +1,15 @@
 import os
 import sys
+import math
+import glob
 import shutil
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import Tk, StringVar, filedialog, messagebox, Frame, Canvas, BooleanVar
-from tkinter.ttk import Button, Entry, Progressbar, Checkbutton, Label # Import Label from ttk
+from tkinter.ttk import Button, Entry, Progressbar, Checkbutton, Label, Treeview, Scrollbar # Import Label from ttk
 
-from threading import Thread
 import time
 from tkinter import font # Import the font module
 
@@ -25,6 +29,99 @@ except ImportError:
 FFMPEG_PATH = 'ffmpeg'
 FFPROBE_PATH = 'ffprobe'
 
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+# --- Batch Queue ---
+# x264 already spreads one encode over several threads, so the pool runs one job per
+# BATCH_THREADS_PER_JOB cores and each ffmpeg gets an equal share of the cores.
+BATCH_THREADS_PER_JOB = 4
+CPU_COUNT = os.cpu_count() or 1
+BATCH_MAX_WORKERS = max(1, CPU_COUNT // BATCH_THREADS_PER_JOB)
+FFMPEG_THREADS_PER_JOB = max(1, CPU_COUNT // BATCH_MAX_WORKERS)
+JOB_POLL_MS = 200 # How often the job list is refreshed while jobs run
+AUDIO_BITRATE = 128000 # Assuming a standard audio bitrate of 128 kbps
+
+# --- Fast Mode ---
+# Instead of a full analysis pass, a few short segments spread over the video are encoded
+# at two trial CRFs. x264's bitrate falls roughly exponentially as the CRF rises, so
+# log(bitrate) is fitted as a line in CRF and solved for the bitrate the target allows.
+FAST_SAMPLE_COUNT = 4
+FAST_SAMPLE_SECONDS = 2.0
+FAST_TRIAL_CRFS = (20, 30)
+FAST_SIZE_MARGIN = 0.95 # Aim this far under the target to leave room for prediction error
+FAST_MAXRATE_RATIO = 1.5 # Peak bitrate cap relative to the average the target allows
+FAST_BUFSIZE_SECONDS = 2.0 # VBV buffer, in seconds at the maxrate
+FAST_CRF_RANGE = (12.0, 51.0)
+FAST_SAMPLING_PROGRESS = 10 # Share of the job progress bar used by the sample encodes
+
+class CompressionCancelled(Exception):
+    """Raised in a worker instead of starting another ffmpeg once the window is closing."""
+
+def probe_duration(source_path):
+    """Use ffprobe to get the video duration in seconds (raises ValueError if it cannot)."""
+    cmd = [
+        FFPROBE_PATH,
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        source_path
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return float(result.stdout.decode('utf-8').strip())
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
+        raise ValueError(f"Could not get video duration with ffprobe. Is FFmpeg installed and in your PATH? ({e})")
+
+def parse_ffmpeg_time(line):
+    """Seconds encoded so far from an ffmpeg stats line ('... time=00:01:02.50 ...'), or None."""
+    if 'time=' not in line:
+        return None
+    try:
+        h, m, s = map(float, line.split('time=')[1].split(' ')[0].split(':'))
+    except ValueError:
+        return None # 'time=N/A' at the start of a run
+    return h * 3600 + m * 60 + s
+
+def sample_segments(duration):
+    """(start, seconds) of FAST_SAMPLE_COUNT segments spread evenly over the video, or [] if it is too short to sample."""
+    if duration < FAST_SAMPLE_COUNT * FAST_SAMPLE_SECONDS * 2:
+        return [] # Samples would cover most of the video, two-pass is just as quick
+    return [((i + 0.5) * duration / FAST_SAMPLE_COUNT - FAST_SAMPLE_SECONDS / 2, FAST_SAMPLE_SECONDS)
+            for i in range(FAST_SAMPLE_COUNT)]
+
+def predict_crf(trial_bitrates, target_bitrate):
+    """
+    Fits log(bitrate) = a + b * crf through {crf: bits per second} of the trial encodes and
+    returns (crf, predicted bitrate) for target_bitrate, or None if the CRF range cannot reach it.
+    """
+    (crf_low, rate_low), (crf_high, rate_high) = sorted(trial_bitrates.items())
+    if rate_low <= 0 or rate_high <= 0:
+        return None
+    slope = (math.log(rate_high) - math.log(rate_low)) / (crf_high - crf_low)
+    if slope >= 0:
+        slope = -math.log(2) / 6 # Flat samples (e.g. a still image), use x264's rule of thumb: +6 CRF halves the bitrate
+    crf = crf_low + (math.log(target_bitrate) - math.log(rate_low)) / slope
+    if crf > FAST_CRF_RANGE[1]:
+        return None # Even the highest CRF would be too big, let two-pass force the bitrate
+    crf = round(max(FAST_CRF_RANGE[0], crf), 1)
+    return crf, rate_low * math.exp(slope * (crf - crf_low))
+
+def collect_video_files(paths):
+    """Video files among paths; folders are searched recursively (earlier Shrunk_ outputs are skipped)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files.extend(os.path.join(directory, name) for name in sorted(names)
+                             if name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith("Shrunk_"))
+        elif os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS):
+            files.append(path)
+    return files
+
+def default_output_path(source_path):
+    dir_name, file_name = os.path.split(source_path)
+    return os.path.join(dir_name, f"Shrunk_{file_name}")
+
 class MP4CompressorGUI(TkinterDnD.Tk if is_ttkbootstrap_available else Tk):
     def __init__(self):
         # Initialize the Tkinter window
@@ -35,24 +132,30 @@ class MP4CompressorGUI(TkinterDnD.Tk if is_ttkbootstrap_available else Tk):
             super().__init__()
             
         self.title("Video Compressor (.mp4, .mov, .avi, .mkv, .webm)")
-        self.geometry("600x450") # Increased window height to accommodate new widgets
+        self.geometry("600x650") # Single-file controls on top, batch queue list below
         self.resizable(False, False)
 
         # Class variables
         self.source_file_path = None
-        self.compression_process = None
+        self.jobs = [] # One dict per queued file, see enqueue_files
+        self.executor = None # ThreadPoolExecutor of BATCH_MAX_WORKERS, created on first use
+        self.polling_jobs = False
+        # Set by on_close; checked (under the lock) before every ffmpeg is started
+        self.cancelled = threading.Event()
+        self.process_lock = threading.Lock()
         self.delete_logs_var = BooleanVar(value=True)
         # --- NEW: BooleanVar for the Pop-up Checkbox ---
         self.display_popup_var = BooleanVar(value=False)
+        self.fast_mode_var = BooleanVar(value=False)
 
         # Create GUI elements
         self.create_widgets()
 
-        # Check for a command-line argument (a file path)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Check for command-line arguments (file or folder paths)
         if len(sys.argv) > 1:
-            file_path = sys.argv[1]
-            if os.path.isfile(file_path):
-                self.set_file_path(file_path)
+            self.enqueue_files(sys.argv[1:])
 
     def create_widgets(self):
         # Define fonts for conditional display
@@ -68,8 +171,12 @@ class MP4CompressorGUI(TkinterDnD.Tk if is_ttkbootstrap_available else Tk):
         self.style.configure('Normal.TEntry', foreground='black', font=self.entry_normal_font_style)
         self.style.configure('Warning.TEntry', foreground='red', font=self.entry_warning_font_style)
 
+        # The single-file controls keep their 600x450 layout in this frame, the job list goes below it
+        main_area = Frame(self, height=450)
+        main_area.place(x=0, y=0, relwidth=1, height=450)
+
         # --- Drag and Drop Area ---
-        dnd_canvas = Canvas(self, relief="groove", borderwidth=8)
+        dnd_canvas = Canvas(main_area, relief="groove", borderwidth=8)
         dnd_canvas.configure(bg="#d0d0d0")
         dnd_canvas.place(relx=0.5, rely=0.21, anchor="center", relwidth=0.97, relheight=0.38)
         
@@ -84,48 +191,48 @@ class MP4CompressorGUI(TkinterDnD.Tk if is_ttkbootstrap_available else Tk):
         dnd_canvas.dnd_bind('<<Drop>>', self.on_drop)
 
         # --- File Selection Button ---
-        select_button = Button(self, text="Select mp4, mov, avi, mkv, or webm File", command=self.browse_file)
+        select_button = Button(main_area, text="Select mp4, mov, avi, mkv, or webm Files", command=self.browse_file)
         select_button.place(relx=0.05, rely=0.43, anchor="w", relwidth=0.62)
 
         # --- Remove Metadata Button ---
-        remove_meta_button = Button(self, text="Remove Meta Data", command=self.remove_metadata)
+        remove_meta_button = Button(main_area, text="Remove Meta Data", command=self.remove_metadata)
         remove_meta_button.place(relx=0.95, rely=0.43, anchor="e", relwidth=0.26)
 
         # --- File Path Display ---
-        file_label = Label(self, text="Source File:", style='Normal.TLabel') # Using ttk.Label
+        file_label = Label(main_area, text="Source File:", style='Normal.TLabel') # Using ttk.Label
         file_label.place(relx=0.05, rely=0.45)
         
-        self.source_entry = Entry(self, state='readonly', width=70, style='Normal.TEntry') # Using ttk.Entry
+        self.source_entry = Entry(main_area, state='readonly', width=70, style='Normal.TEntry') # Using ttk.Entry
         self.source_entry.place(relx=0.05, rely=0.5, relwidth=0.9)
         
         # --- Output File Path Display ---
-        output_label = Label(self, text="Output File:", style='Normal.TLabel') # Using ttk.Label
+        output_label = Label(main_area, text="Output File:", style='Normal.TLabel') # Using ttk.Label
         output_label.place(relx=0.05, rely=0.6)
         
-        self.output_entry = Entry(self, width=70, style='Normal.TEntry') # Using ttk.Entry
+        self.output_entry = Entry(main_area, width=70, style='Normal.TEntry') # Using ttk.Entry
         self.output_entry.place(relx=0.05, rely=0.65, relwidth=0.9)
         
         # --- Target Size Input ---
-        size_label = Label(self, text="Target Size (MB):", style='Normal.TLabel') # Using ttk.Label
+        size_label = Label(main_area, text="Target Size (MB):", style='Normal.TLabel') # Using ttk.Label
         size_label.place(relx=0.05, rely=0.75)
         
         self.size_var = StringVar(value="7.9")
         # Applying ttk style to Entry
-        self.size_entry = Entry(self, textvariable=self.size_var, width=5, style='Normal.TEntry')
+        self.size_entry = Entry(main_area, textvariable=self.size_var, width=5, style='Normal.TEntry')
         self.size_entry.place(relx=0.30, rely=0.75)
         
         # This line ensures the calculation updates when the size_var changes
         self.size_var.trace_add("write", lambda *args: self.calculate_compression_percentage())
 
         # --- NEW: Display Pop-up Checkbox ---
-        self.display_popup_checkbox = Checkbutton(self, 
+        self.display_popup_checkbox = Checkbutton(main_area, 
                                                   text="Display Pop-up on completion", 
                                                   variable=self.display_popup_var)
         # Place it right below the "Target Size (MB)" input
         self.display_popup_checkbox.place(relx=0.05, rely=0.82) 
 
         # --- File Size Information ---
-        size_info_canvas = Canvas(self, relief="groove", borderwidth=0)
+        size_info_canvas = Canvas(main_area, relief="groove", borderwidth=0)
         size_info_canvas.configure(bg='white')
         # Adjusted rely to not conflict with new checkbox
         size_info_canvas.place(relx=0.45, rely=0.82, relwidth=0.25, relheight=0.08) 
@@ -139,37 +246,69 @@ class MP4CompressorGUI(TkinterDnD.Tk if is_ttkbootstrap_available else Tk):
         self.compression_label.place(relx=0.02, rely=0.8, anchor="w")
 
         # --- Delete Logs Checkbox ---
-        self.delete_logs_checkbox = Checkbutton(self, text="Delete Both Temp Log Files", 
+        self.delete_logs_checkbox = Checkbutton(main_area, text="Delete Both Temp Log Files", 
                                                 variable=self.delete_logs_var)
         self.delete_logs_checkbox.place(relx=0.95, rely=0.75, anchor="e")
 
+        # --- Fast Mode Checkbox (sampled CRF instead of two full passes) ---
+        self.fast_mode_checkbox = Checkbutton(main_area, text="Fast Mode",
+                                              variable=self.fast_mode_var)
+        self.fast_mode_checkbox.place(relx=0.42, rely=0.75)
+
         # --- Compress Button ---
-        self.compress_button = Button(self, 
-                                      text="Compress Video", 
+        self.compress_button = Button(main_area, 
+                                      text="Compress Queue", 
                                       command=self.start_compression_thread)
         self.compress_button.place(relx=0.95, rely=0.86, anchor="e", relwidth=0.25, relheight=0.15)
         
         # Initialize status label with default style
-        self.status_label = Label(self, text="Status: Ready", style='Normal.TLabel') # Using ttk.Label
+        self.status_label = Label(main_area, text="Status: Ready", style='Normal.TLabel') # Using ttk.Label
         self.status_label.place(relx=0.05, rely=0.90)
 
         # --- Progress Bar ---
-        self.progress_bar = Progressbar(self, orient="horizontal", length=540, mode="determinate")
+        self.progress_bar = Progressbar(main_area, orient="horizontal", length=540, mode="determinate")
         self.progress_bar.place(relx=0.5, rely=0.97, anchor="center")
+
+        # --- Batch Queue List (per-job progress) ---
+        self.job_list = Treeview(self, columns=("file", "target", "status", "progress"), show="headings", height=8)
+        for column, heading, width in (("file", "File", 300), ("target", "Target", 60),
+                                       ("status", "Status", 120), ("progress", "Progress", 60)):
+            self.job_list.heading(column, text=heading)
+            self.job_list.column(column, width=width, stretch=(column == "file"))
+        job_scrollbar = Scrollbar(self, orient="vertical", command=self.job_list.yview)
+        self.job_list.configure(yscrollcommand=job_scrollbar.set)
+        self.job_list.place(x=15, y=462, width=555, height=175)
+        job_scrollbar.place(x=570, y=462, width=16, height=175)
         
     def on_drop(self, event):
-        """Handle a file being dropped onto the GUI."""
-        file_path = event.data
-        if "{" in file_path and "}" in file_path:
-            file_path = file_path.strip("{}")
-            
-        self.set_file_path(file_path)
+        """Handle files and/or folders being dropped onto the GUI."""
+        # splitlist understands the {braced paths with spaces} of a multi-file drop
+        self.enqueue_files(self.tk.splitlist(event.data))
 
     def browse_file(self):
-        """Open a file dialog to select the video."""
-        file_path = filedialog.askopenfilename(filetypes = [("Video files", "*.mp4 *.mov *.avi *.mkv *.webm"), ("All files", "*.*")])
-        if file_path:
-            self.set_file_path(file_path)
+        """Open a file dialog to select one or more videos."""
+        file_paths = filedialog.askopenfilenames(filetypes = [("Video files", "*.mp4 *.mov *.avi *.mkv *.webm"), ("All files", "*.*")])
+        if file_paths:
+            self.enqueue_files(file_paths)
+
+    def enqueue_files(self, paths):
+        """Adds the video files among paths (folders included) to the queue and shows the last one."""
+        files = collect_video_files(paths)
+        if not files:
+            # Not a video (or an empty folder): show it anyway, as before, so the status explains why
+            if len(paths) == 1 and os.path.isfile(paths[0]):
+                self.set_file_path(paths[0])
+            return
+
+        waiting = {job['source'] for job in self.jobs if job['state'] in ('queued', 'running')}
+        for file_path in files:
+            if file_path in waiting:
+                continue
+            job = {'source': file_path, 'output': default_output_path(file_path), 'target_mb': None,
+                   'state': 'queued', 'progress': 0.0, 'message': "Queued", 'process': None}
+            job['item'] = self.job_list.insert("", "end", values=(os.path.basename(file_path), "", "Queued", "0%"))
+            self.jobs.append(job)
+        self.set_file_path(files[-1])
 
     def set_file_path(self, path):
         """Update the GUI with the selected file path."""
@@ -297,177 +436,308 @@ class MP4CompressorGUI(TkinterDnD.Tk if is_ttkbootstrap_available else Tk):
             self.status_label.config(text="Status: Error stripping metadata", style='Warning.TLabel')
             messagebox.showerror("Error", f"An error occurred while stripping metadata:\n{e}")
 
-    def get_video_info(self):
-        """Use ffprobe to get the video duration."""
-        try:
-            cmd = [
-                FFPROBE_PATH,
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                self.source_file_path
-            ]
-            
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            duration_str = result.stdout.decode('utf-8').strip()
-            return float(duration_str)
-        except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
-            messagebox.showerror("Error", f"Could not get video duration with ffprobe.\nIs FFmpeg installed and in your PATH?\nError: {e}")
-            return None
-
     def start_compression_thread(self):
-        """Starts the compression in a separate thread to prevent GUI freeze."""
+        """Starts every queued job on the worker pool, which keeps the GUI responsive."""
         # Perform a final check before starting compression
         try:
             target_size_mb = float(self.size_var.get())
-            
-            # Get original size for pre-compression check
-            original_size_mb = 0
-            if self.source_file_path and os.path.exists(self.source_file_path):
-                original_size_bytes = os.path.getsize(self.source_file_path)
-                original_size_mb = original_size_bytes / (1024 * 1024)
-
-            if not self.source_file_path or not os.path.exists(self.source_file_path) or not self.source_file_path.lower().endswith(('.mp4', '.mov', '.avi', '.mkv', '.webm')):
-                messagebox.showerror("Error", "Please select a valid MP4 file.")
-                return
-            
-            if target_size_mb <= 0:
-                messagebox.showerror("Error", "Target size must be greater than 0 MB.")
-                return
-            
-            if target_size_mb >= original_size_mb:
-                messagebox.showerror("Error", "Target size cannot be larger than or equal to the source file size.")
-                return
+        except ValueError:
+            messagebox.showerror("Error", "Please ensure the target size is a valid positive number.")
+            return
 
-        except (ValueError, OSError):
-            messagebox.showerror("Error", "Please ensure a valid file is selected and target size is a valid positive number.")
+        if target_size_mb <= 0:
+            messagebox.showerror("Error", "Target size must be greater than 0 MB.")
             return
 
-        # Disable button to prevent multiple compressions
-        self.compress_button.config(state='disabled')
-        # Ensure status is black/normal when compression starts
-        self.status_label.config(text="Status: Starting...", style='Normal.TLabel')
-        
-        # Start the compression in a new thread
-        compression_thread = Thread(target=self.compress_video)
-        compression_thread.start()
+        current_is_video = bool(self.source_file_path) and os.path.isfile(self.source_file_path) \
+            and self.source_file_path.lower().endswith(VIDEO_EXTENSIONS)
+        if not current_is_video and not any(job['state'] == 'queued' for job in self.jobs):
+            messagebox.showerror("Error", "Please select or drop valid video files first.")
+            return
 
-    def compress_video(self):
-        """Performs the video compression using FFmpeg."""
+        # The file on display is compressed to the output path in the entry box
+        if current_is_video:
+            current = [job for job in self.jobs if job['source'] == self.source_file_path and job['state'] == 'queued']
+            if not current:
+                self.enqueue_files([self.source_file_path])
+                current = [job for job in self.jobs if job['source'] == self.source_file_path and job['state'] == 'queued']
+            if current:
+                current[-1]['output'] = self.output_entry.get()
+
+        # Every queued job gets the current target size; files already smaller are skipped
+        started = 0
+        for job in self.jobs:
+            if job['state'] != 'queued' or job.get('future') is not None:
+                continue
+            try:
+                source_size_mb = os.path.getsize(job['source']) / (1024 * 1024)
+            except OSError as e:
+                job['error'] = str(e)
+                self.finish_job(job, 'failed', f"Error: {e}")
+                # A finished future puts the job in this batch, so finish_batch reports it
+                job['future'] = Future()
+                job['future'].set_result(None)
+                continue
+            job['target_mb'] = target_size_mb
+            job['fast'] = self.fast_mode_var.get()
+            job['delete_logs'] = self.delete_logs_var.get() # Tk variables are only read on the GUI thread
+            if target_size_mb >= source_size_mb:
+                self.finish_job(job, 'skipped', "Skipped (already small)")
+                continue
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="compress")
+            job['future'] = self.executor.submit(self.compress_video, job)
+            started += 1
+
+        if started:
+            self.status_label.config(text=f"Status: Starting {started} job(s), {BATCH_MAX_WORKERS} at a time...", style='Normal.TLabel')
+        if not self.polling_jobs:
+            self.polling_jobs = True
+            self._poll_jobs()
+
+    def compress_video(self, job):
+        """Performs one two-pass compression with FFmpeg (runs on a pool worker, does not touch the GUI)."""
+        job['state'] = 'running'
+        # Own pass log per job, next to its output, so concurrent runs do not share ffmpeg2pass-0.log
+        passlog = job['output'] + ".2pass"
         try:
-            # Get video duration using ffprobe
-            duration = self.get_video_info()
-            if duration is None:
+            job['message'] = "Probing"
+            duration = probe_duration(job['source'])
+            if duration <= 0:
                 raise ValueError("Could not determine video duration.")
 
-            # Get target size from GUI input
-            target_size_mb = float(self.size_var.get())
-            target_size_bits = target_size_mb * 1024 * 1024 * 8
-
-            # Assuming a standard audio bitrate of 128 kbps
-            audio_bitrate = 128000
-            target_video_bitrate = (target_size_bits - audio_bitrate * duration) / duration
-            
-            if target_video_bitrate < 100000:
-                messagebox.showwarning("Warning", "Calculated bitrate is very low. Output quality may be poor.")
-            
+            target_size_bits = job['target_mb'] * 1024 * 1024 * 8
+            target_video_bitrate = (target_size_bits - AUDIO_BITRATE * duration) / duration
+            if target_video_bitrate <= 0:
+                raise ValueError("Target size is too small for the audio track alone.")
+            low_bitrate = target_video_bitrate < 100000
             target_video_bitrate_k = int(target_video_bitrate / 1000)
-
-            # Get output path from the entry box
-            output_path = self.output_entry.get()
+            target_bytes = job['target_mb'] * 1024 * 1024
+
+            fast_report = ""
+            if job.get('fast'):
+                predicted_bytes = self.compress_fast(job, duration, target_video_bitrate)
+                if predicted_bytes is not None:
+                    actual_bytes = os.path.getsize(job['output'])
+                    fast_report = self.report_prediction(job, predicted_bytes, actual_bytes)
+                    if actual_bytes <= target_bytes:
+                        self.finish_job(job, 'done', f"Done, {fast_report}")
+                        return
+                    fast_report = f"overshot {fast_report}, re-encoded in two passes"
+                job['progress'] = 0.0
 
             # --- Two-pass encoding command ---
             # Pass 1: Analysis Pass
-            self.status_label.config(text="Status: Pass 1 (Analyzing video)...", style='Normal.TLabel')
+            job['message'] = "Pass 1 (Analyzing)"
             pass1_command = [
                 FFMPEG_PATH, '-y', '-nostdin',
-                '-i', self.source_file_path,
+                '-i', job['source'],
                 '-c:v', 'libx264',
+                '-threads', str(FFMPEG_THREADS_PER_JOB),
                 '-b:v', f'{target_video_bitrate_k}k',
                 '-pass', '1',
+                '-passlogfile', passlog,
                 '-an',
                 '-f', 'mp4',
                 os.devnull
             ]
-            
-            subprocess.run(pass1_command, check=True)
-            self.update_progress(50)
+            self.run_ffmpeg_pass(job, pass1_command, duration, 0)
 
             # Pass 2: Encoding Pass
-            self.status_label.config(text="Status: Pass 2 (Encoding video)...", style='Normal.TLabel')
+            job['message'] = "Pass 2 (Encoding)"
             pass2_command = [
                 FFMPEG_PATH, '-y', '-nostdin',
-                '-i', self.source_file_path,
+                '-i', job['source'],
                 '-c:v', 'libx264',
+                '-threads', str(FFMPEG_THREADS_PER_JOB),
                 '-b:v', f'{target_video_bitrate_k}k',
                 '-pass', '2',
+                '-passlogfile', passlog,
                 '-c:a', 'aac',
                 '-b:a', '128k',
-                output_path
+                job['output']
             ]
-
-            process = subprocess.Popen(pass2_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-            
-            for line in process.stderr:
-                self.update_progress_from_ffmpeg(line, duration)
-            
-            process.wait()
-            
-            if process.returncode == 0:
-                self.status_label.config(text="Status: Compression Complete!", style='Normal.TLabel')
-                self.progress_bar['value'] = 100
-                # --- NEW: Conditional Pop-up ---
-                if self.display_popup_var.get():
-                    messagebox.showinfo("Success", "Video compressed successfully!")
-            else:
-                stderr_output = process.stderr.read()
-                raise subprocess.CalledProcessError(process.returncode, pass2_command, stderr=stderr_output)
-
-        except (ValueError, FileNotFoundError, subprocess.CalledProcessError) as e:
-            self.status_label.config(text="Status: Error during compression", style='Warning.TLabel')
-            error_message = f"An error occurred during compression:\n{e}"
-            messagebox.showerror("Compression Error", error_message)
+            self.run_ffmpeg_pass(job, pass2_command, duration, 50)
+
+            actual_mb = os.path.getsize(job['output']) / (1024 * 1024)
+            status = "Done (low bitrate)" if low_bitrate else "Done"
+            self.finish_job(job, 'done', f"{status}, {actual_mb:.2f} MB" + (f" ({fast_report})" if fast_report else ""))
+
+        except CompressionCancelled:
+            self.finish_job(job, 'failed', "Cancelled")
+        except (ValueError, OSError, subprocess.CalledProcessError) as e:
+            details = (getattr(e, 'stderr', None) or str(e)).strip() or str(e)
+            job['error'] = details
+            self.finish_job(job, 'failed', f"Error: {details.splitlines()[-1]}")
         finally:
-            self.compress_button.config(state='normal')
-            
-            # Clean up the log files only if the checkbox is checked
-            if self.delete_logs_var.get():
-                try:
-                    log_file = "ffmpeg2pass-0.log"
-                    mbtree_file = "ffmpeg2pass-0.log.mbtree"
-                    if os.path.exists(log_file):
+            # Clean up this job's log files only if the checkbox was checked when the job started
+            if job.get('delete_logs'):
+                for log_file in glob.glob(glob.escape(passlog) + "-*.log*"):
+                    try:
                         os.remove(log_file)
-                    if os.path.exists(mbtree_file):
-                        os.remove(mbtree_file)
-                except OSError as e:
-                    print(f"Error removing log files: {e}")
-            # Ensure status and other labels are correctly updated after compression attempt
-            self.calculate_compression_percentage()
-            
-    def update_progress(self, value):
-        """Update progress bar value on the main thread."""
-        self.progress_bar['value'] = value
-        self.update_idletasks()
+                    except OSError as e:
+                        print(f"Error removing log files: {e}")
+
+    def compress_fast(self, job, duration, target_video_bitrate):
+        """
+        Single-pass CRF encode with the CRF predicted from sampled segments, capped with
+        maxrate/bufsize. Returns the predicted output size in bytes, or None when the video
+        cannot be sampled or the target is out of CRF range (the caller then runs two-pass).
+        """
+        segments = sample_segments(duration)
+        if not segments:
+            return None
 
-    def update_progress_from_ffmpeg(self, line, duration):
-        """Parse FFmpeg output to update the progress bar."""
-        if 'time=' in line:
-            parts = line.split('time=')[1].split(' ')[0]
-            try:
-                h, m, s = map(float, parts.split(':'))
-                current_time = h * 3600 + m * 60 + s
-                
-                # Progress is 50% for pass 1, 50% for pass 2
-                progress_val = 50 + (current_time / duration) * 50
-                self.progress_bar['value'] = progress_val
-                
-                # Only update status text if no critical error state (red status) is active
-                current_status_style = self.status_label.cget("style")
-                if current_status_style != 'Warning.TLabel': 
-                    self.status_label.config(text=f"Status: Encoding... ({int(progress_val)}%)", style='Normal.TLabel')
-                self.update_idletasks()
-            except ValueError:
-                pass
+        trial_bitrates = {}
+        for index, crf in enumerate(FAST_TRIAL_CRFS):
+            job['message'] = f"Sampling (CRF {crf})"
+            trial_bitrates[crf] = self.measure_sample_bitrate(job, crf, segments, index)
+
+        prediction = predict_crf(trial_bitrates, target_video_bitrate * FAST_SIZE_MARGIN)
+        if prediction is None:
+            return None
+        crf, predicted_video_bitrate = prediction
+        predicted_bytes = (predicted_video_bitrate + AUDIO_BITRATE) * duration / 8
+        maxrate_k = int(target_video_bitrate * FAST_MAXRATE_RATIO / 1000)
+
+        job['message'] = f"Encoding (CRF {crf:g})"
+        command = [
+            FFMPEG_PATH, '-y', '-nostdin',
+            '-i', job['source'],
+            '-c:v', 'libx264',
+            '-threads', str(FFMPEG_THREADS_PER_JOB),
+            '-crf', f'{crf:g}',
+            '-maxrate', f'{maxrate_k}k',
+            '-bufsize', f'{int(maxrate_k * FAST_BUFSIZE_SECONDS)}k',
+            '-c:a', 'aac',
+            '-b:a', '128k',
+            job['output']
+        ]
+        self.run_ffmpeg_pass(job, command, duration, FAST_SAMPLING_PROGRESS, 100 - FAST_SAMPLING_PROGRESS)
+        return predicted_bytes
+
+    def measure_sample_bitrate(self, job, crf, segments, trial_index):
+        """Average video bitrate (bits per second) of the segments encoded at crf."""
+        total_bytes = 0
+        total_seconds = 0.0
+        steps = len(FAST_TRIAL_CRFS) * len(segments)
+        for index, (start, seconds) in enumerate(segments):
+            # Raw H.264 to a pipe: only the byte count is needed, no temp files or container overhead
+            command = [
+                FFMPEG_PATH, '-nostdin', '-v', 'error',
+                '-ss', f'{start:.3f}', '-t', f'{seconds:.3f}',
+                '-i', job['source'],
+                '-an',
+                '-c:v', 'libx264',
+                '-threads', str(FFMPEG_THREADS_PER_JOB),
+                '-crf', str(crf),
+                '-f', 'h264', 'pipe:1'
+            ]
+            process = self.start_process(job, command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, stderr = process.communicate()
+            job['process'] = None
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, command,
+                                                    stderr=stderr.decode('utf-8', errors='replace'))
+            total_bytes += len(stdout)
+            total_seconds += seconds
+            step = trial_index * len(segments) + index + 1
+            job['progress'] = FAST_SAMPLING_PROGRESS * step / steps
+        return total_bytes * 8 / total_seconds
+
+    def report_prediction(self, job, predicted_bytes, actual_bytes):
+        """Logs how close the fast mode size prediction was and returns it as short text."""
+        predicted_mb = predicted_bytes / (1024 * 1024)
+        actual_mb = actual_bytes / (1024 * 1024)
+        error = (actual_bytes - predicted_bytes) / predicted_bytes * 100
+        print(f"Fast mode: {os.path.basename(job['source'])} predicted {predicted_mb:.2f} MB, "
+              f"actual {actual_mb:.2f} MB ({error:+.1f}%), target {job['target_mb']:g} MB")
+        return f"{actual_mb:.2f} MB, predicted {predicted_mb:.2f} MB"
+
+    def start_process(self, job, command, **popen_args):
+        """
+        Starts ffmpeg as the job's current process, or raises CompressionCancelled once the
+        window is closing. The lock makes sure on_close sees every process that does start.
+        """
+        with self.process_lock:
+            if self.cancelled.is_set():
+                raise CompressionCancelled()
+            job['process'] = subprocess.Popen(command, **popen_args)
+            return job['process']
+
+    def run_ffmpeg_pass(self, job, command, duration, progress_start, progress_span=50):
+        """Runs one ffmpeg pass, mapping its time= output onto progress_span % of the job progress."""
+        process = self.start_process(job, command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                     universal_newlines=True)
+        stderr_tail = deque(maxlen=20) # For the error message
+        for line in process.stderr:
+            stderr_tail.append(line)
+            current_time = parse_ffmpeg_time(line)
+            if current_time is not None:
+                job['progress'] = progress_start + min(1.0, current_time / duration) * progress_span
+        process.wait()
+        job['process'] = None
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, stderr="".join(stderr_tail))
+        job['progress'] = progress_start + progress_span
+
+    def finish_job(self, job, state, message):
+        job['message'] = message
+        job['progress'] = 100.0 if state == 'done' else job['progress']
+        job['state'] = state
+
+    def _poll_jobs(self):
+        """Refreshes the job list and the overall progress bar while jobs are queued or running."""
+        for job in self.jobs:
+            self.job_list.item(job['item'], values=(
+                os.path.basename(job['source']),
+                f"{job['target_mb']:g} MB" if job['target_mb'] else "",
+                job['message'], f"{int(job['progress'])}%"))
+
+        batch = [job for job in self.jobs if job.get('future') is not None]
+        active = [job for job in batch if job['state'] in ('queued', 'running')]
+        if batch:
+            self.progress_bar['value'] = sum(job['progress'] for job in batch) / len(batch)
+        if active:
+            running = sum(1 for job in active if job['state'] == 'running')
+            self.status_label.config(text=f"Status: {running} running, {len(active) - running} waiting, "
+                                          f"{len(batch) - len(active)} finished", style='Normal.TLabel')
+            self.after(JOB_POLL_MS, self._poll_jobs)
+            return
+
+        self.polling_jobs = False
+        self.finish_batch(batch)
+
+    def finish_batch(self, batch):
+        failed = [job for job in batch if job['state'] == 'failed']
+        for job in batch:
+            job['future'] = None # Only jobs of a later Compress Queue press count towards the next batch
+
+        # Ensure status and other labels are correctly updated after the batch
+        self.calculate_compression_percentage()
+        if failed:
+            self.status_label.config(text=f"Status: {len(failed)} of {len(batch)} job(s) failed", style='Warning.TLabel')
+            error_message = "\n\n".join(f"{os.path.basename(job['source'])}:\n{job.get('error', job['message'])[-400:]}"
+                                        for job in failed[:5])
+            messagebox.showerror("Compression Error", f"An error occurred during compression:\n\n{error_message}")
+        elif batch:
+            self.status_label.config(text="Status: Compression Complete!", style='Normal.TLabel')
+            self.progress_bar['value'] = 100
+            # --- Conditional Pop-up ---
+            if self.display_popup_var.get():
+                messagebox.showinfo("Success", f"{len(batch)} video(s) compressed successfully!")
+
+    def on_close(self):
+        """Stops queued and running jobs before closing, so no ffmpeg keeps running in the background."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.process_lock:
+            self.cancelled.set() # Running jobs stop before their next ffmpeg (pass 2, next sample)
+            for job in self.jobs:
+                process = job.get('process')
+                if process is not None and process.poll() is None:
+                    process.terminate()
+        self.destroy()
 
 
 if __name__ == "__main__":